@@ -0,0 +1,50 @@
+"""inventory as-of index and daily snapshots
+
+Revision ID: 1f3c9a7b2d41
+Revises: d3eb80bfaa19
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1f3c9a7b2d41'
+down_revision: Union[str, None] = 'd3eb80bfaa19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Seek index for "last movement before T" lookups
+    existing_indexes = {ix['name'] for ix in inspector.get_indexes('inventory_movements')}
+    if 'ix_inventory_movements_shop_product_created' not in existing_indexes:
+        op.create_index(
+            'ix_inventory_movements_shop_product_created',
+            'inventory_movements',
+            ['shop_id', 'product_id', 'created_at']
+        )
+
+    # Daily stock checkpoints for shop-wide as-of queries
+    if not inspector.has_table('inventory_snapshots'):
+        op.create_table(
+            'inventory_snapshots',
+            sa.Column('snapshot_id', sa.String(length=36), primary_key=True, nullable=False),
+            sa.Column('shop_id', sa.String(length=36), sa.ForeignKey('shopkeepers.shop_id', ondelete='CASCADE'), nullable=False),
+            sa.Column('product_id', sa.String(length=36), sa.ForeignKey('products.product_id', ondelete='CASCADE'), nullable=False),
+            sa.Column('snapshot_date', sa.Date(), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+            sa.UniqueConstraint('shop_id', 'snapshot_date', 'product_id', name='uq_inventory_snapshot_shop_date_product'),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('inventory_snapshots')
+    op.drop_index('ix_inventory_movements_shop_product_created', table_name='inventory_movements')
@@ -0,0 +1,36 @@
+"""product barcode/SKU, unique per shop
+
+Revision ID: 2e6b9d4f8a17
+Revises: c7e5a2d94f16
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e6b9d4f8a17'
+down_revision: Union[str, None] = 'c7e5a2d94f16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    existing_columns = {col['name'] for col in inspector.get_columns('products')}
+    if 'barcode' not in existing_columns:
+        op.add_column('products', sa.Column('barcode', sa.String(length=64), nullable=True))
+
+    # Unique index doubles as the scan lookup index; NULL barcodes don't clash
+    existing_indexes = {ix['name'] for ix in inspector.get_indexes('products')}
+    if 'uq_products_shop_barcode' not in existing_indexes:
+        op.create_index('uq_products_shop_barcode', 'products', ['shop_id', 'barcode'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_products_shop_barcode', table_name='products')
+    op.drop_column('products', 'barcode')
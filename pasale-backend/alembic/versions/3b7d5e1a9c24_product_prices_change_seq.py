@@ -0,0 +1,30 @@
+"""product_prices.change_seq breaking effective_from ties
+
+Revision ID: 3b7d5e1a9c24
+Revises: 6e2a9c4f7b13
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d5e1a9c24'
+down_revision: Union[str, None] = '6e2a9c4f7b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing_columns = {col['name'] for col in inspector.get_columns('product_prices')}
+    if 'change_seq' not in existing_columns:
+        # Existing rows keep 0; every later price change sorts after them
+        op.add_column('product_prices', sa.Column('change_seq', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('product_prices', 'change_seq')
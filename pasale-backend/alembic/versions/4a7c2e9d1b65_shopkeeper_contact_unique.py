@@ -0,0 +1,43 @@
+"""unique shopkeeper contact for single-query login and constraint-checked registration
+
+Revision ID: 4a7c2e9d1b65
+Revises: 8d1f4b6c2e39
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a7c2e9d1b65'
+down_revision: Union[str, None] = '8d1f4b6c2e39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    unique_names = {uc['name'] for uc in inspector.get_unique_constraints('shopkeepers')}
+    if 'uq_shopkeepers_contact' in unique_names:
+        return
+
+    # Registration used to check contact with a racy SELECT; refuse to guess which duplicate wins
+    duplicates = bind.execute(sa.text(
+        "SELECT contact, COUNT(*) FROM shopkeepers GROUP BY contact HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        raise RuntimeError(
+            f"{len(duplicates)} contact numbers are shared by several shopkeepers "
+            f"(e.g. {duplicates[0][0]}); merge or fix them before upgrading"
+        )
+
+    op.create_unique_constraint('uq_shopkeepers_contact', 'shopkeepers', ['contact'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_shopkeepers_contact', 'shopkeepers', type_='unique')
@@ -0,0 +1,29 @@
+"""products (shop_id, updated_at) index for delta sync
+
+Revision ID: 5b8e2f0c6a93
+Revises: 1f3c9a7b2d41
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e2f0c6a93'
+down_revision: Union[str, None] = '1f3c9a7b2d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing_indexes = {ix['name'] for ix in inspector.get_indexes('products')}
+    if 'ix_products_shop_updated' not in existing_indexes:
+        op.create_index('ix_products_shop_updated', 'products', ['shop_id', 'updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_shop_updated', table_name='products')
@@ -0,0 +1,42 @@
+"""products.change_seq ordering the delta sync feed
+
+Revision ID: 6e2a9c4f7b13
+Revises: 4a7c2e9d1b65
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2a9c4f7b13'
+down_revision: Union[str, None] = '4a7c2e9d1b65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing_columns = {col['name'] for col in inspector.get_columns('products')}
+    if 'change_seq' not in existing_columns:
+        op.add_column('products', sa.Column('change_seq', sa.Integer(), server_default='0', nullable=False))
+        # Existing rows sort before any later write, and after watermark 0
+        op.execute(
+            "UPDATE products SET change_seq = "
+            "(SELECT catalog_version FROM shopkeepers WHERE shopkeepers.shop_id = products.shop_id)"
+        )
+
+    existing_indexes = {ix['name'] for ix in inspector.get_indexes('products')}
+    if 'ix_products_shop_change_seq' not in existing_indexes:
+        op.create_index('ix_products_shop_change_seq', 'products', ['shop_id', 'change_seq', 'product_id'])
+    if 'ix_products_shop_updated' in existing_indexes:
+        op.drop_index('ix_products_shop_updated', table_name='products')
+
+
+def downgrade() -> None:
+    op.create_index('ix_products_shop_updated', 'products', ['shop_id', 'updated_at'])
+    op.drop_index('ix_products_shop_change_seq', table_name='products')
+    op.drop_column('products', 'change_seq')
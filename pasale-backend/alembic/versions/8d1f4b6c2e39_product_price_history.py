@@ -0,0 +1,67 @@
+"""effective-dated product price history
+
+Revision ID: 8d1f4b6c2e39
+Revises: 2e6b9d4f8a17
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d1f4b6c2e39'
+down_revision: Union[str, None] = '2e6b9d4f8a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if inspector.has_table('product_prices'):
+        return
+
+    op.create_table(
+        'product_prices',
+        sa.Column('price_id', sa.String(length=36), primary_key=True, nullable=False),
+        sa.Column('shop_id', sa.String(length=36), sa.ForeignKey('shopkeepers.shop_id', ondelete='CASCADE'), nullable=False),
+        sa.Column('product_id', sa.String(length=36), sa.ForeignKey('products.product_id', ondelete='CASCADE'), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('effective_from', sa.TIMESTAMP(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    )
+    op.create_index('ix_product_prices_product_effective', 'product_prices', ['product_id', 'effective_from'])
+
+    # Earlier price changes were overwritten, so the current price is the best
+    # known value and is treated as effective since the product was created
+    products = bind.execute(sa.text(
+        "SELECT product_id, shop_id, price, created_at FROM products"
+    )).fetchall()
+    if products:
+        prices = sa.table(
+            'product_prices',
+            sa.column('price_id', sa.String),
+            sa.column('shop_id', sa.String),
+            sa.column('product_id', sa.String),
+            sa.column('price', sa.Float),
+            sa.column('effective_from', sa.TIMESTAMP(timezone=True)),
+        )
+        op.bulk_insert(prices, [
+            {
+                'price_id': str(uuid.uuid4()),
+                'shop_id': shop_id,
+                'product_id': product_id,
+                'price': price,
+                'effective_from': created_at
+            }
+            for product_id, shop_id, price, created_at in products
+        ])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_prices_product_effective', table_name='product_prices')
+    op.drop_table('product_prices')
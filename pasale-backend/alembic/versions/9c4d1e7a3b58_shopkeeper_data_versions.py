@@ -0,0 +1,32 @@
+"""per-shop catalog and inventory version counters
+
+Revision ID: 9c4d1e7a3b58
+Revises: 5b8e2f0c6a93
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4d1e7a3b58'
+down_revision: Union[str, None] = '5b8e2f0c6a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing_columns = {col['name'] for col in inspector.get_columns('shopkeepers')}
+    if 'catalog_version' not in existing_columns:
+        op.add_column('shopkeepers', sa.Column('catalog_version', sa.Integer(), server_default='1', nullable=False))
+    if 'inventory_version' not in existing_columns:
+        op.add_column('shopkeepers', sa.Column('inventory_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('shopkeepers', 'inventory_version')
+    op.drop_column('shopkeepers', 'catalog_version')
@@ -0,0 +1,74 @@
+"""maintained category index with product counts
+
+Revision ID: c7e5a2d94f16
+Revises: 9c4d1e7a3b58
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e5a2d94f16'
+down_revision: Union[str, None] = '9c4d1e7a3b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    existing_columns = {col['name'] for col in inspector.get_columns('categories')}
+    if 'product_count' not in existing_columns:
+        op.add_column('categories', sa.Column('product_count', sa.Integer(), server_default='0', nullable=False))
+
+    categories = sa.table(
+        'categories',
+        sa.column('category_id', sa.String),
+        sa.column('shop_id', sa.String),
+        sa.column('category_name', sa.String),
+        sa.column('product_count', sa.Integer),
+    )
+
+    # Keep one row per (shop, name) so the unique constraint can be added
+    seen = set()
+    for category_id, shop_id, category_name in bind.execute(
+        sa.select(categories.c.category_id, categories.c.shop_id, categories.c.category_name)
+    ).fetchall():
+        if (shop_id, category_name) in seen:
+            bind.execute(categories.delete().where(categories.c.category_id == category_id))
+        seen.add((shop_id, category_name))
+
+    # Backfill counts from active products
+    counts = bind.execute(sa.text(
+        "SELECT shop_id, category, COUNT(*) FROM products "
+        "WHERE is_active = :active AND category IS NOT NULL GROUP BY shop_id, category"
+    ), {"active": True}).fetchall()
+    for shop_id, category_name, product_count in counts:
+        if (shop_id, category_name) in seen:
+            bind.execute(
+                categories.update()
+                .where(sa.and_(categories.c.shop_id == shop_id, categories.c.category_name == category_name))
+                .values(product_count=product_count)
+            )
+        else:
+            bind.execute(categories.insert().values(
+                category_id=str(uuid.uuid4()),
+                shop_id=shop_id,
+                category_name=category_name,
+                product_count=product_count
+            ))
+
+    unique_names = {uc['name'] for uc in inspector.get_unique_constraints('categories')}
+    if 'uq_categories_shop_name' not in unique_names:
+        op.create_unique_constraint('uq_categories_shop_name', 'categories', ['shop_id', 'category_name'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_categories_shop_name', 'categories', type_='unique')
+    op.drop_column('categories', 'product_count')
@@ -1,9 +1,15 @@
 from fastapi import APIRouter
 from app.api.v1 import shopkeeper, product, transaction, reward, inventory
+from app.config import settings
 
 api_router = APIRouter()
 api_router.include_router(shopkeeper.router, prefix="/v1")
 api_router.include_router(product.router, prefix="/v1")
 api_router.include_router(transaction.router, prefix="/v1")
 api_router.include_router(reward.router, prefix="/v1")
-api_router.include_router(inventory.router, prefix="/v1")
\ No newline at end of file
+api_router.include_router(inventory.router, prefix="/v1")
+
+# Admin routes only exist when a key is configured (they would 404 anyway)
+if settings.ADMIN_API_KEY:
+    from app.api.v1 import admin
+    api_router.include_router(admin.router, prefix="/v1")
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from app.schemas.admin import DatabasePoolResponse
+from app.utils.dependencies import require_admin_key
+from app.utils.pool_metrics import get_pool_stats, get_threadpool_stats
+from app.config import settings
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin_key)])
+
+@router.get("/db-pool", response_model=DatabasePoolResponse)
+async def get_database_pool_stats():
+    """Get live connection pool and threadpool usage for sizing"""
+    return {
+        "database_mode": "async" if settings.DB_ASYNC else "sync",
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "threadpool": get_threadpool_stats(),
+        "engines": get_pool_stats()
+    }
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from typing import Optional
-from app.database import get_db
+from datetime import datetime, date
+from app.database import DBRunner, get_db_runner, get_read_db_runner
 from app.schemas.inventory import (
     InventoryResponse,
     InventoryListResponse,
@@ -9,31 +9,52 @@ from app.schemas.inventory import (
     ReorderLevelUpdate,
     InventoryMovementResponse,
     InventoryMovementListResponse,
-    StockAlert
+    StockAlert,
+    StockAsOfResponse,
+    ShopStockAsOfResponse,
+    InventorySnapshotBuildResponse,
+    StocktakeRequest,
+    StocktakeResponse,
+    ReorderSuggestion,
+    ReorderTuneResponse,
+    InventoryReconciliationResponse
 )
 from app.crud import inventory as crud_inventory
-from app.utils.dependencies import get_current_shopkeeper
-from app.models.shopkeeper import Shopkeeper
+from app.crud import reorder as crud_reorder
+from app.crud import reconciliation as crud_reconciliation
+from app.crud import shopkeeper as crud_shopkeeper
+from app.utils.etag import make_etag, is_not_modified, not_modified_response, set_etag
+from app.utils.dependencies import get_current_shopkeeper, get_current_shop_id
+from app.utils.fast_json import fast_response
+from app.utils.content_negotiation import NegotiatedRoute
+from app.schemas.shopkeeper import ShopkeeperResponse
 
-router = APIRouter(prefix="/inventory", tags=["Inventory"])
+router = APIRouter(prefix="/inventory", tags=["Inventory"], route_class=NegotiatedRoute)
 
 @router.get("/", response_model=InventoryListResponse)
-def list_inventory(
+async def list_inventory(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
     low_stock_only: bool = Query(False),
     out_of_stock_only: bool = Query(False),
     search: Optional[str] = Query(None),
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
 ):
     """List inventory with filters"""
     
-    shop_id = str(current_shopkeeper.shop_id)
+    # Answer revalidation before running the listing and statistics queries
+    etag = make_etag(request, shop_id, *await db.run(crud_shopkeeper.get_data_versions, shop_id))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
     skip = (page - 1) * page_size
     
-    inventory_items, total = crud_inventory.get_inventory_for_shop(
-        db,
+    inventory_items, total = await db.run(
+        crud_inventory.get_inventory_for_shop,
         shop_id,
         skip=skip,
         limit=page_size,
@@ -42,52 +63,106 @@ def list_inventory(
         search=search
     )
     
-    stats = crud_inventory.get_inventory_statistics(db, shop_id)
+    stats = await db.run(crud_inventory.get_inventory_statistics, shop_id)
     
-    return {
+    return fast_response({
         "total": total,
         "page": page,
         "page_size": page_size,
-        "total_stock_value": stats["total_stock_value"],
+        "total_stock_value": float(stats["total_stock_value"]),
         "low_stock_count": stats["low_stock_count"],
         "out_of_stock_count": stats["out_of_stock_count"],
         "inventory_items": inventory_items
-    }
+    }, response)
 
 @router.get("/alerts", response_model=list[StockAlert])
-def get_stock_alerts(
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+async def get_stock_alerts(
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
 ):
     """Get stock alerts (low stock and out of stock items)"""
     
-    shop_id = str(current_shopkeeper.shop_id)
-    alerts = crud_inventory.get_stock_alerts(db, shop_id)
+    alerts = await db.run(crud_inventory.get_stock_alerts, shop_id)
     
     return alerts
 
+@router.get("/reorder-suggestions", response_model=list[ReorderSuggestion])
+async def get_reorder_suggestions(
+    only_due: bool = Query(False, description="Only products at or below the suggested reorder level"),
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
+):
+    """Get sales-velocity based reorder suggestions"""
+    
+    return await db.run(crud_reorder.get_reorder_suggestions, shop_id, only_due=only_due)
+
+@router.post("/reorder-levels/auto-tune", response_model=ReorderTuneResponse)
+async def auto_tune_reorder_levels(
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
+):
+    """Set reorder levels from sales velocity"""
+    
+    updated_count = await db.run(crud_reorder.auto_tune_reorder_levels, shop_id)
+    
+    return {"updated_count": updated_count}
+
+@router.post("/reconcile", response_model=InventoryReconciliationResponse)
+async def reconcile_inventory(
+    include_transactions: bool = Query(False, description="Also rebuild expected stock from transactions"),
+    repair: bool = Query(False, description="Write correcting movements and fix quantities"),
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
+):
+    """Report (and optionally repair) drift between stock, movements and transactions"""
+    
+    return await db.run(
+        crud_reconciliation.reconcile_shop_inventory,
+        shop_id,
+        include_transactions=include_transactions,
+        repair=repair
+    )
+
 @router.get("/stats")
-def get_inventory_stats(
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+async def get_inventory_stats(
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
 ):
     """Get inventory statistics"""
     
-    shop_id = str(current_shopkeeper.shop_id)
-    stats = crud_inventory.get_inventory_statistics(db, shop_id)
+    stats = await db.run(crud_inventory.get_inventory_statistics, shop_id)
     
     return stats
 
+@router.get("/as-of", response_model=ShopStockAsOfResponse)
+async def get_shop_stock_as_of(
+    ts: datetime = Query(..., description="Point in time to report stock for"),
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
+):
+    """Get stock levels and valuation for all products at a point in time"""
+    
+    return await db.run(crud_inventory.get_shop_stock_as_of, shop_id, ts)
+
+@router.post("/snapshots", response_model=InventorySnapshotBuildResponse)
+async def build_inventory_snapshots(
+    until: Optional[date] = Query(None, description="Last day to checkpoint (default: yesterday)"),
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
+):
+    """Build daily stock checkpoints used by shop-wide as-of queries"""
+    
+    return await db.run(crud_inventory.build_inventory_snapshots, shop_id, until)
+
 @router.get("/{product_id}", response_model=InventoryResponse)
-def get_product_inventory(
+async def get_product_inventory(
     product_id: str,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Get inventory for specific product"""
     
-    shop_id = str(current_shopkeeper.shop_id)
-    inventory = crud_inventory.get_product_inventory(db, shop_id, product_id)
+    inventory = await db.run(crud_inventory.get_product_inventory, shop_id, product_id)
     
     if not inventory:
         raise HTTPException(
@@ -97,7 +172,7 @@ def get_product_inventory(
     
     # Get product details
     from app.crud.product import get_product_by_id
-    product = get_product_by_id(db, product_id, shop_id)
+    product = await db.run(get_product_by_id, product_id, shop_id)
     
     stock_value = inventory.current_quantity * product.price if product else 0
     is_low_stock = inventory.current_quantity <= inventory.reorder_level
@@ -114,17 +189,40 @@ def get_product_inventory(
         "stock_value": round(stock_value, 2)
     }
 
+@router.get("/{product_id}/as-of", response_model=StockAsOfResponse)
+async def get_product_stock_as_of(
+    product_id: str,
+    ts: datetime = Query(..., description="Point in time to report stock for"),
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
+):
+    """Get stock level of a product at a point in time"""
+    
+    from app.crud.product import get_product_by_id
+    product = await db.run(get_product_by_id, product_id, shop_id)
+    
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    
+    stock = await db.run(crud_inventory.get_product_stock_as_of, shop_id, product_id, ts)
+    stock["product_name"] = product.product_name
+    
+    return stock
+
 @router.post("/adjust", response_model=InventoryResponse)
-def adjust_inventory(
+async def adjust_inventory(
     adjustment: InventoryAdjustment,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    current_shopkeeper: ShopkeeperResponse = Depends(get_current_shopkeeper),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Manually adjust inventory"""
     
     shop_id = str(current_shopkeeper.shop_id)
-    inventory = crud_inventory.adjust_inventory_manually(
-        db,
+    inventory = await db.run(
+        crud_inventory.adjust_inventory_manually,
         shop_id,
         adjustment,
         current_shopkeeper.email or current_shopkeeper.contact
@@ -132,7 +230,7 @@ def adjust_inventory(
     
     # Get product details for response
     from app.crud.product import get_product_by_id
-    product = get_product_by_id(db, adjustment.product_id, shop_id)
+    product = await db.run(get_product_by_id, adjustment.product_id, shop_id)
     
     stock_value = inventory.current_quantity * product.price if product else 0
     is_low_stock = inventory.current_quantity <= inventory.reorder_level
@@ -149,18 +247,33 @@ def adjust_inventory(
         "stock_value": round(stock_value, 2)
     }
 
+@router.post("/stocktake", response_model=StocktakeResponse)
+async def apply_stocktake(
+    stocktake: StocktakeRequest,
+    current_shopkeeper: ShopkeeperResponse = Depends(get_current_shopkeeper),
+    db: DBRunner = Depends(get_db_runner)
+):
+    """Apply a full physical count and return the variance report"""
+    
+    shop_id = str(current_shopkeeper.shop_id)
+    return await db.run(
+        crud_inventory.apply_stocktake,
+        shop_id,
+        stocktake,
+        current_shopkeeper.email or current_shopkeeper.contact
+    )
+
 @router.put("/{product_id}/reorder-level", response_model=InventoryResponse)
-def update_reorder_level(
+async def update_reorder_level(
     product_id: str,
     update_data: ReorderLevelUpdate,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Update reorder level for a product"""
     
-    shop_id = str(current_shopkeeper.shop_id)
-    inventory = crud_inventory.update_reorder_level(
-        db,
+    inventory = await db.run(
+        crud_inventory.update_reorder_level,
         shop_id,
         product_id,
         update_data.reorder_level
@@ -168,7 +281,7 @@ def update_reorder_level(
     
     # Get product details for response
     from app.crud.product import get_product_by_id
-    product = get_product_by_id(db, product_id, shop_id)
+    product = await db.run(get_product_by_id, product_id, shop_id)
     
     stock_value = inventory.current_quantity * product.price if product else 0
     is_low_stock = inventory.current_quantity <= inventory.reorder_level
@@ -186,38 +299,32 @@ def update_reorder_level(
     }
 
 @router.get("/movements/history", response_model=InventoryMovementListResponse)
-def get_inventory_movements(
+async def get_inventory_movements(
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
     product_id: Optional[str] = Query(None),
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
 ):
     """Get inventory movement history"""
     
-    shop_id = str(current_shopkeeper.shop_id)
     skip = (page - 1) * page_size
     
-    movements, total = crud_inventory.get_inventory_movements(
-        db,
+    movements, total = await db.run(
+        crud_inventory.get_inventory_movements,
         shop_id,
         product_id=product_id,
         skip=skip,
         limit=page_size
     )
     
-    # Enrich movements with product names
-    from app.crud.product import get_product_by_id
-    
     enriched_movements = []
-    for movement in movements:
-        product = get_product_by_id(db, str(movement.product_id), shop_id)
-        
+    for movement, product_name in movements:
         enriched_movements.append({
             "movement_id": str(movement.movement_id),
             "shop_id": str(movement.shop_id),
             "product_id": str(movement.product_id),
-            "product_name": product.product_name if product else None,
+            "product_name": product_name,
             "movement_type": movement.movement_type,
             "quantity_change": movement.quantity_change,
             "quantity_after": movement.quantity_after,
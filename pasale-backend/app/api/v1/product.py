@@ -1,50 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
 from typing import Optional
-from app.database import get_db
+from datetime import datetime
+from app.database import DBRunner, get_db_runner, get_read_db_runner
 from app.schemas.product import (
     ProductCreate,
     ProductUpdate,
     ProductResponse,
-    ProductListResponse
+    ProductListResponse,
+    ProductSuggestion,
+    ProductChangesResponse,
+    CategoryResponse,
+    ProductImportResponse,
+    ProductPriceResponse
 )
 from app.crud import product as crud_product
-from app.utils.dependencies import get_current_shopkeeper
-from app.models.shopkeeper import Shopkeeper
+from app.crud import shopkeeper as crud_shopkeeper
+from app.crud import pricing as crud_pricing
+from app.utils.product_import import iter_import_rows
+from app.utils.etag import make_etag, is_not_modified, not_modified_response, set_etag
+from app.utils.dependencies import get_current_shop_id
+from app.utils.fast_json import fast_response
+from app.utils.content_negotiation import NegotiatedRoute
 
-router = APIRouter(prefix="/products", tags=["Products"])
+router = APIRouter(prefix="/products", tags=["Products"], route_class=NegotiatedRoute)
 
 @router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
-def create_product(
+async def create_product(
     product: ProductCreate,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Create a new product"""
-    db_product = crud_product.create_product(
-        db, 
+    db_product = await db.run(
+        crud_product.create_product,
         product, 
-        str(current_shopkeeper.shop_id)
+        shop_id
     )
     return db_product
 
+@router.post("/import", response_model=ProductImportResponse)
+async def import_products(
+    file: UploadFile = File(..., description="CSV or XLSX with product_name, price, category, unit, opening_stock, reorder_level columns"),
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
+):
+    """Bulk import products with opening stock from a CSV or XLSX file"""
+    rows = iter_import_rows(file.filename, file.file)
+    return await db.run(crud_product.import_products, shop_id, rows)
+
 @router.get("/", response_model=ProductListResponse)
-def list_products(
+async def list_products(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
     search: Optional[str] = Query(None, max_length=100),
     category: Optional[str] = Query(None, max_length=100),
     include_inactive: bool = Query(False),
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
 ):
     """List all products for current shop with pagination and filters"""
     
+    # Answer revalidation before running the listing query
+    catalog_version, _ = await db.run(crud_shopkeeper.get_data_versions, shop_id)
+    etag = make_etag(request, shop_id, catalog_version)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
     skip = (page - 1) * page_size
     
-    products, total = crud_product.get_products_by_shop(
-        db,
-        str(current_shopkeeper.shop_id),
+    products, total = await db.run(
+        crud_product.get_product_rows,
+        shop_id,
         skip=skip,
         limit=page_size,
         search=search,
@@ -52,36 +81,84 @@ def list_products(
         include_inactive=include_inactive
     )
     
-    return {
+    return fast_response({
         "total": total,
         "page": page,
         "page_size": page_size,
         "products": products
-    }
+    }, response)
+
+@router.get("/changes", response_model=ProductChangesResponse)
+async def get_product_changes(
+    since: Optional[str] = Query(None, description="Watermark from the previous sync; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
+):
+    """Get catalog changes since the last sync, with tombstones for deleted products"""
+    return await db.run(
+        crud_product.get_product_changes,
+        shop_id,
+        since=since,
+        limit=limit
+    )
+
+@router.get("/autocomplete", response_model=list[ProductSuggestion])
+async def autocomplete_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
+):
+    """Get ranked product name matches for the search box"""
+    return await db.run(
+        crud_product.autocomplete_products,
+        shop_id,
+        q,
+        limit=limit
+    )
 
-@router.get("/categories", response_model=list[str])
-def list_categories(
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+@router.get("/by-code/{code}", response_model=ProductSuggestion)
+async def get_product_by_code(
+    code: str,
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
-    """Get all categories used by current shop"""
-    categories = crud_product.get_categories_by_shop(
-        db,
-        str(current_shopkeeper.shop_id)
+    """Get active product by scanned barcode or SKU"""
+    return await db.run(
+        crud_product.get_product_by_code,
+        shop_id,
+        code
     )
+
+@router.get("/categories", response_model=list[CategoryResponse])
+async def list_categories(
+    request: Request,
+    response: Response,
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
+):
+    """Get all categories used by current shop with active product counts"""
+    catalog_version, _ = await db.run(crud_shopkeeper.get_data_versions, shop_id)
+    etag = make_etag(request, shop_id, catalog_version)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
+    categories = await db.run(crud_product.get_categories_by_shop, shop_id)
     return categories
 
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(
+async def get_product(
     product_id: str,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Get single product details"""
-    db_product = crud_product.get_product_by_id(
-        db,
+    db_product = await db.run(
+        crud_product.get_product_by_id,
         product_id,
-        str(current_shopkeeper.shop_id)
+        shop_id
     )
     
     if not db_product:
@@ -93,47 +170,61 @@ def get_product(
     return db_product
 
 @router.put("/{product_id}", response_model=ProductResponse)
-def update_product(
+async def update_product(
     product_id: str,
     product_update: ProductUpdate,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Update product details"""
-    db_product = crud_product.update_product(
-        db,
+    db_product = await db.run(
+        crud_product.update_product,
         product_id,
-        str(current_shopkeeper.shop_id),
+        shop_id,
         product_update
     )
     return db_product
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_product(
+async def delete_product(
     product_id: str,
     hard_delete: bool = Query(False, description="Permanently delete product"),
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Delete product (soft delete by default)"""
-    crud_product.delete_product(
-        db,
+    await db.run(
+        crud_product.delete_product,
         product_id,
-        str(current_shopkeeper.shop_id),
+        shop_id,
         soft_delete=not hard_delete
     )
     return None
 
 @router.post("/{product_id}/restore", response_model=ProductResponse)
-def restore_product(
+async def restore_product(
     product_id: str,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Restore soft-deleted product"""
-    db_product = crud_product.restore_product(
-        db,
+    db_product = await db.run(
+        crud_product.restore_product,
         product_id,
-        str(current_shopkeeper.shop_id)
+        shop_id
     )
-    return db_product
\ No newline at end of file
+    return db_product
+
+@router.get("/{product_id}/prices", response_model=list[ProductPriceResponse])
+async def get_product_prices(
+    product_id: str,
+    as_of: Optional[datetime] = Query(None, description="Only the list price in effect at this time"),
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
+):
+    """Get product list price history, or the price in effect at a point in time"""
+    if as_of is None:
+        return await db.run(crud_pricing.get_price_history, shop_id, product_id)
+    
+    entry = await db.run(crud_pricing.get_price_as_of, shop_id, product_id, as_of)
+    return [entry] if entry else []
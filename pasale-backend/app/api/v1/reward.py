@@ -1,7 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from app.database import get_db
+from app.database import DBRunner, get_db_runner, get_read_db_runner
 from app.schemas.reward import (
     RewardResponse,
     RewardListResponse,
@@ -10,22 +9,20 @@ from app.schemas.reward import (
     DailyRewardStats
 )
 from app.crud import reward as crud_reward
-from app.utils.dependencies import get_current_shopkeeper
-from app.models.shopkeeper import Shopkeeper
+from app.utils.dependencies import get_current_shop_id
 from app.config import settings
 
 router = APIRouter(prefix="/rewards", tags=["Rewards"])
 
 @router.get("/balance", response_model=RewardBalanceResponse)
-def get_reward_balance(
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+async def get_reward_balance(
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Get current reward balance"""
     
-    shop_id = str(current_shopkeeper.shop_id)
-    current_balance = crud_reward.get_current_balance(db, shop_id)
-    total_earned, total_redeemed = crud_reward.get_total_earned_and_redeemed(db, shop_id)
+    current_balance = await db.run(crud_reward.get_current_balance, shop_id)
+    total_earned, total_redeemed = await db.run(crud_reward.get_total_earned_and_redeemed, shop_id)
     
     balance_in_npr = current_balance * settings.POINTS_TO_NPR_RATIO
     can_redeem = current_balance >= settings.MIN_REDEMPTION_POINTS
@@ -53,20 +50,19 @@ def get_reward_balance(
     }
 
 @router.get("/history", response_model=RewardListResponse)
-def get_reward_history(
+async def get_reward_history(
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
 ):
     """Get reward history"""
     
-    shop_id = str(current_shopkeeper.shop_id)
     skip = (page - 1) * page_size
     
-    rewards, total = crud_reward.get_reward_history(db, shop_id, skip, page_size)
-    current_balance = crud_reward.get_current_balance(db, shop_id)
-    total_earned, total_redeemed = crud_reward.get_total_earned_and_redeemed(db, shop_id)
+    rewards, total = await db.run(crud_reward.get_reward_history, shop_id, skip, page_size)
+    current_balance = await db.run(crud_reward.get_current_balance, shop_id)
+    total_earned, total_redeemed = await db.run(crud_reward.get_total_earned_and_redeemed, shop_id)
     
     return {
         "total": total,
@@ -79,17 +75,15 @@ def get_reward_history(
     }
 
 @router.post("/redeem", response_model=RewardResponse)
-def redeem_rewards(
+async def redeem_rewards(
     redemption: RewardRedemptionRequest,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Redeem reward points"""
     
-    shop_id = str(current_shopkeeper.shop_id)
-    
-    reward = crud_reward.redeem_points(
-        db,
+    reward = await db.run(
+        crud_reward.redeem_points,
         shop_id,
         redemption.points,
         redemption.redemption_method,
@@ -99,20 +93,19 @@ def redeem_rewards(
     return reward
 
 @router.get("/daily-stats", response_model=DailyRewardStats)
-def get_daily_reward_stats(
+async def get_daily_reward_stats(
     date: datetime = Query(default_factory=datetime.utcnow),
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
 ):
     """Get reward statistics for a specific day"""
     
-    shop_id = str(current_shopkeeper.shop_id)
-    stats = crud_reward.get_daily_stats(db, shop_id, date)
+    stats = await db.run(crud_reward.get_daily_stats, shop_id, date)
     
     return stats
 
 @router.get("/config")
-def get_reward_config():
+async def get_reward_config():
     """Get reward system configuration"""
     
     return {
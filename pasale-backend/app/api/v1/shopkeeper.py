@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import DBRunner, get_db_runner
 from app.schemas.shopkeeper import (
     ShopkeeperCreate,
     ShopkeeperLogin,
@@ -10,27 +9,29 @@ from app.schemas.shopkeeper import (
 )
 from app.crud import shopkeeper as crud_shopkeeper
 from app.utils.security import create_access_token
-from app.utils.dependencies import get_current_shopkeeper
-from app.models.shopkeeper import Shopkeeper
+from app.utils import password_pool
+from app.utils.dependencies import get_current_shopkeeper, get_current_shop_id
 
 router = APIRouter(prefix="/shopkeepers", tags=["Shopkeepers"])
 
+# Async so Argon2 work waits on the hashing process pool, not a threadpool worker
 @router.post("/register", response_model=ShopkeeperResponse, status_code=status.HTTP_201_CREATED)
-def register_shopkeeper(
+async def register_shopkeeper(
     shopkeeper: ShopkeeperCreate,
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Register a new shopkeeper"""
-    db_shopkeeper = crud_shopkeeper.create_shopkeeper(db, shopkeeper)
+    hashed_password = await password_pool.hash_password_async(shopkeeper.password)
+    db_shopkeeper = await db.run(crud_shopkeeper.create_shopkeeper, shopkeeper, hashed_password)
     return db_shopkeeper
 
 @router.post("/login", response_model=Token)
-def login_shopkeeper(
+async def login_shopkeeper(
     login_data: ShopkeeperLogin,
-    db: Session = Depends(get_db)
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Login shopkeeper and return access token"""
-    shopkeeper = crud_shopkeeper.authenticate_shopkeeper(
+    shopkeeper = await crud_shopkeeper.authenticate_shopkeeper(
         db, 
         login_data.identifier, 
         login_data.password
@@ -53,22 +54,22 @@ def login_shopkeeper(
     }
 
 @router.get("/me", response_model=ShopkeeperResponse)
-def get_my_profile(
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper)
+async def get_my_profile(
+    current_shopkeeper: ShopkeeperResponse = Depends(get_current_shopkeeper)
 ):
     """Get current shopkeeper's profile"""
     return current_shopkeeper
 
 @router.put("/me", response_model=ShopkeeperResponse)
-def update_my_profile(
+async def update_my_profile(
     shopkeeper_update: ShopkeeperUpdate,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Update current shopkeeper's profile"""
-    updated_shopkeeper = crud_shopkeeper.update_shopkeeper(
-        db,
-        str(current_shopkeeper.shop_id),
+    updated_shopkeeper = await db.run(
+        crud_shopkeeper.update_shopkeeper,
+        shop_id,
         shopkeeper_update
     )
     return updated_shopkeeper
\ No newline at end of file
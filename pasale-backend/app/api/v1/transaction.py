@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime, timedelta
-from app.database import get_db
+from app.database import DBRunner, get_db_runner, get_read_db_runner
 from app.schemas.transaction import (
     TransactionCreate,
     TransactionUpdate,
@@ -14,64 +13,65 @@ from app.schemas.transaction import (
     TransactionType
 )
 from app.crud import transaction as crud_transaction
-from app.utils.dependencies import get_current_shopkeeper
-from app.models.shopkeeper import Shopkeeper
+from app.utils.dependencies import get_current_shop_id
+from app.utils.fast_json import fast_response
+from app.utils.content_negotiation import NegotiatedRoute
 
-router = APIRouter(prefix="/transactions", tags=["Transactions"])
+router = APIRouter(prefix="/transactions", tags=["Transactions"], route_class=NegotiatedRoute)
 
 @router.post("/", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
-def create_transaction(
+async def create_transaction(
     transaction: TransactionCreate,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Create a new transaction"""
-    db_transaction = crud_transaction.create_transaction(
-        db,
+    db_transaction = await db.run(
+        crud_transaction.create_transaction,
         transaction,
-        str(current_shopkeeper.shop_id)
+        shop_id
     )
     return db_transaction
 
 @router.post("/bulk", response_model=TransactionBulkCreateResponse)
-def bulk_create_transactions(
+async def bulk_create_transactions(
     bulk_data: TransactionBulkCreate,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Bulk create transactions (for offline sync)"""
     
-    created, errors = crud_transaction.bulk_create_transactions(
-        db,
+    created, errors = await db.run(
+        crud_transaction.bulk_create_transactions,
         bulk_data.transactions,
-        str(current_shopkeeper.shop_id)
+        shop_id
     )
     
-    return {
+    return fast_response({
         "created_count": len(created),
         "failed_count": len(errors),
-        "created_transactions": created,
+        "created_transactions": [crud_transaction.transaction_to_dict(t) for t in created],
         "errors": errors
-    }
+    })
 
 @router.get("/", response_model=TransactionListResponse)
-def list_transactions(
+async def list_transactions(
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     product_id: Optional[str] = Query(None),
     transaction_type: Optional[TransactionType] = Query(None),
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
 ):
     """List transactions with filters and pagination"""
     
     skip = (page - 1) * page_size
     
-    transactions, total = crud_transaction.get_transactions_by_shop(
-        db,
-        str(current_shopkeeper.shop_id),
+    transactions, total = await db.run(
+        crud_transaction.get_transaction_rows,
+        shop_id,
         skip=skip,
         limit=page_size,
         start_date=start_date,
@@ -80,20 +80,20 @@ def list_transactions(
         transaction_type=transaction_type
     )
     
-    return {
+    return fast_response({
         "total": total,
         "page": page,
         "page_size": page_size,
         "transactions": transactions
-    }
+    })
 
 @router.get("/stats", response_model=TransactionStats)
-def get_transaction_statistics(
+async def get_transaction_statistics(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     period: Optional[str] = Query("all", regex="^(today|week|month|all)$"),
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_read_db_runner)
 ):
     """Get transaction statistics"""
     
@@ -108,9 +108,9 @@ def get_transaction_statistics(
         start_date = datetime.utcnow() - timedelta(days=30)
         end_date = datetime.utcnow()
     
-    stats = crud_transaction.get_transaction_statistics(
-        db,
-        str(current_shopkeeper.shop_id),
+    stats = await db.run(
+        crud_transaction.get_transaction_statistics,
+        shop_id,
         start_date=start_date,
         end_date=end_date
     )
@@ -118,16 +118,16 @@ def get_transaction_statistics(
     return stats
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
-def get_transaction(
+async def get_transaction(
     transaction_id: str,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Get single transaction details"""
-    db_transaction = crud_transaction.get_transaction_by_id(
-        db,
+    db_transaction = await db.run(
+        crud_transaction.get_transaction_by_id,
         transaction_id,
-        str(current_shopkeeper.shop_id)
+        shop_id
     )
     
     if not db_transaction:
@@ -139,31 +139,31 @@ def get_transaction(
     return db_transaction
 
 @router.put("/{transaction_id}", response_model=TransactionResponse)
-def update_transaction(
+async def update_transaction(
     transaction_id: str,
     transaction_update: TransactionUpdate,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Update transaction details"""
-    db_transaction = crud_transaction.update_transaction(
-        db,
+    db_transaction = await db.run(
+        crud_transaction.update_transaction,
         transaction_id,
-        str(current_shopkeeper.shop_id),
+        shop_id,
         transaction_update
     )
     return db_transaction
 
 @router.delete("/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_transaction(
+async def delete_transaction(
     transaction_id: str,
-    current_shopkeeper: Shopkeeper = Depends(get_current_shopkeeper),
-    db: Session = Depends(get_db)
+    shop_id: str = Depends(get_current_shop_id),
+    db: DBRunner = Depends(get_db_runner)
 ):
     """Delete transaction"""
-    crud_transaction.delete_transaction(
-        db,
+    await db.run(
+        crud_transaction.delete_transaction,
         transaction_id,
-        str(current_shopkeeper.shop_id)
+        shop_id
     )
     return None
\ No newline at end of file
@@ -5,9 +5,57 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     SECRET_KEY: str
     ENVIRONMENT: str = "development"
+    DB_ASYNC: bool = False  # Routes use an AsyncSession (asyncpg/aiosqlite) instead of threadpool sessions
+    ASYNC_DATABASE_URL: str = ""  # Defaults to DATABASE_URL with the async driver swapped in
+    READ_REPLICA_URL: str = ""  # Heavy GET routes read here; empty = read-only sessions on the primary
+    ASYNC_READ_REPLICA_URL: str = ""  # Defaults to READ_REPLICA_URL with the async driver swapped in
+    REPLICA_MAX_LAG_SECONDS: float = 5.0  # Above this, reads fall back to the primary
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 5.0
+    
+    # Connection Pool (per engine, per worker process)
+    DB_POOL_SIZE: int = 10  # Persistent connections; sync routes hold one per busy thread
+    DB_MAX_OVERFLOW: int = 30  # Extra connections opened under burst, closed when returned
+    DB_POOL_TIMEOUT: float = 10.0  # Seconds to wait for a free connection before erroring
+    DB_POOL_RECYCLE: int = 1800  # Reopen connections older than this (server idle timeouts)
+    THREADPOOL_SIZE: int = 40  # Threads for sync work; keep <= DB_POOL_SIZE + DB_MAX_OVERFLOW
+    ADMIN_API_KEY: str = ""  # X-Admin-Key for /admin endpoints and /metrics; empty disables them
+    STARTUP_WARMUP: bool = True  # Before taking traffic: load crypto, start hashing pool, open DB connections, compile hot queries
+    WARMUP_DB_CONNECTIONS: int = 0  # Connections opened per engine during warm-up; 0 = DB_POOL_SIZE
+    
+    METRICS_ENABLED: bool = True  # Prometheus text format at /metrics (needs ADMIN_API_KEY)
+    
+    # HTTP Compression (gzip, or brotli when installed)
+    COMPRESSION_MIN_BYTES: int = 1024  # Smaller responses go out as-is; 0 disables response compression
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; higher costs far more CPU per response
+    MAX_DECOMPRESSED_REQUEST_BYTES: int = 10 * 1024 * 1024  # Cap on gzip/br request bodies once inflated
+    
+    # SQL Logging
+    SQL_ECHO: bool = False  # Log every statement (very noisy; prefer the slow-query log)
+    SLOW_QUERY_MS: float = 200.0  # Statements at least this slow are logged; 0 disables the log
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1  # Fraction of slow SELECTs whose plan is captured
+    SLOW_QUERY_LOG_PATH: str = "logs/slow_queries.log"
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS: int = 5
     # Auth
     access_token_expire_minutes: int = 60  # minutes
     debug: bool = False
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = 300  # Decoded JWT claims, capped at the token's expiry
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 60  # Shopkeeper profile per shop_id; bounds staleness across workers
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Password Hashing (Argon2 in a process pool)
+    PASSWORD_HASH_WORKERS: int = 0  # 0 = one per CPU core
+    PASSWORD_HASH_MAX_PENDING: int = 0  # Queued + running jobs before 503; 0 = 4 per worker
+    PASSWORD_HASH_TIMEOUT_SECONDS: float = 10.0
+    PASSWORD_HASH_START_METHOD: str = "spawn"  # Workers re-import __main__, so scripts need a main guard
+    ARGON2_TIME_COST: int = 3  # Keep equal across hosts sharing a DB; scripts.tune_argon2 suggests a value
+    PASSWORD_HASH_TARGET_MS: int = 250  # scripts.tune_argon2 picks the time cost closest under this
+    ARGON2_MIN_TIME_COST: int = 2
+    ARGON2_MAX_TIME_COST: int = 10
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    STRICT_ORM_LOADING: bool = False  # Fail on any relationship load a query didn't ask for (always on in tests)
     
     # Reward System Configuration
     POINTS_PER_SALE: int = 2
@@ -22,6 +70,22 @@ class Settings(BaseSettings):
     POINTS_TO_NPR_RATIO: float = 0.1  # 1 point = Rs. 0.10
     MIN_REDEMPTION_POINTS: int = 1000  # 1000 points = Rs. 100
     
+    # Reorder Suggestion Configuration
+    REORDER_VELOCITY_WINDOW_DAYS: int = 28  # Moving-average window for daily sales
+    REORDER_LEAD_TIME_DAYS: int = 3  # Days between ordering and receiving stock
+    REORDER_SAFETY_STOCK_DAYS: int = 2  # Extra days of cover kept as buffer
+    REORDER_COVER_DAYS: int = 14  # Days of sales a reorder should cover
+    REORDER_CACHE_TTL_SECONDS: int = 900  # Full reload of cached sales history
+    
+    # Product Search
+    SEARCH_INDEX_TTL_SECONDS: int = 300  # Rebuild in-process index to pick up other workers' writes
+    SEARCH_INDEX_MAX_SHOPS: int = 200  # Shop indexes kept per worker, least recently used evicted
+    SEARCH_MAX_RESULTS: int = 500  # Best-ranked matches bound into the listing query's IN list
+    
+    # Bulk Product Import
+    PRODUCT_IMPORT_BATCH_SIZE: int = 500  # Rows inserted per transaction
+    PRODUCT_IMPORT_MAX_ERRORS: int = 1000  # Row errors returned in the response
+    
     class Config:
         env_file = ".env"
 
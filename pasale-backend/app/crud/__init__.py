@@ -1,3 +1,3 @@
-from app.crud import shopkeeper, product, transaction, reward, inventory
+from app.crud import shopkeeper, product, transaction, reward, inventory, reorder, reconciliation, category, pricing
 
-__all__ = ["shopkeeper", "product", "transaction", "reward", "inventory"]
\ No newline at end of file
+__all__ = ["shopkeeper", "product", "transaction", "reward", "inventory", "reorder", "reconciliation", "category", "pricing"]
\ No newline at end of file
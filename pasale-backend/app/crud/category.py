@@ -0,0 +1,45 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, update
+from sqlalchemy.exc import IntegrityError
+from app.models.category import Category
+from typing import Optional, List, Dict
+
+def adjust_category_count(db: Session, shop_id: str, category_name: Optional[str], delta: int) -> None:
+    """Add `delta` to a category's active product count (committed by the caller)"""
+    
+    if not category_name or delta == 0:
+        return
+    
+    result = db.execute(
+        update(Category)
+        .where(
+            and_(
+                Category.shop_id == shop_id,
+                Category.category_name == category_name
+            )
+        )
+        .values(product_count=Category.product_count + delta)
+    )
+    if result.rowcount:
+        return
+    
+    # First product in this category; a concurrent insert wins the unique constraint
+    try:
+        with db.begin_nested():
+            db.add(Category(shop_id=shop_id, category_name=category_name, product_count=max(delta, 0)))
+    except IntegrityError:
+        adjust_category_count(db, shop_id, category_name, delta)
+
+def adjust_category_counts(db: Session, shop_id: str, deltas: Dict[str, int]) -> None:
+    """Apply several category count changes (committed by the caller)"""
+    for category_name, delta in deltas.items():
+        adjust_category_count(db, shop_id, category_name, delta)
+
+def get_categories_with_counts(db: Session, shop_id: str) -> List[Category]:
+    """Get categories that have at least one active product"""
+    return db.query(Category).filter(
+        and_(
+            Category.shop_id == shop_id,
+            Category.product_count > 0
+        )
+    ).order_by(Category.category_name).all()
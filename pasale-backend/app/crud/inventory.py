@@ -1,12 +1,15 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, func, or_
-from app.models.inventory import Inventory, InventoryMovement, MovementType
+from sqlalchemy import and_, func, or_, insert, update
+from app.models.inventory import Inventory, InventoryMovement, InventorySnapshot, MovementType
 from app.models.product import Product
 from app.models.transaction import TransactionType
-from app.schemas.inventory import InventoryAdjustment
-from typing import Optional, List, Tuple
+from app.schemas.inventory import InventoryAdjustment, StocktakeRequest
+from app.crud import reorder as crud_reorder
+from app.crud.shopkeeper import bump_inventory_version
+from app.utils import search_index
+from typing import Optional, List, Tuple, Dict
 from fastapi import HTTPException, status
-from datetime import datetime
+from datetime import datetime, date, time, timedelta, timezone
 
 def get_or_create_inventory(db: Session, shop_id: str, product_id: str) -> Inventory:
     """Get inventory record or create if doesn't exist"""
@@ -26,6 +29,7 @@ def get_or_create_inventory(db: Session, shop_id: str, product_id: str) -> Inven
             current_quantity=0
         )
         db.add(inventory)
+        bump_inventory_version(db, shop_id)
         db.commit()
         db.refresh(inventory)
     
@@ -59,6 +63,7 @@ def create_inventory_with_opening_stock(
         reorder_level=reorder_level
     )
     db.add(inventory)
+    bump_inventory_version(db, shop_id)
     db.commit()
     db.refresh(inventory)
     
@@ -116,6 +121,7 @@ def update_inventory_from_transaction(
         notes=f"Auto-update from {transaction_type.value} transaction"
     )
     db.add(movement)
+    bump_inventory_version(db, shop_id)
     db.commit()
     db.refresh(inventory)
     
@@ -155,6 +161,7 @@ def reverse_inventory_from_transaction(
         notes=f"Reversal for deleted transaction {transaction_id}"
     )
     db.add(reversal)
+    bump_inventory_version(db, shop_id)
     db.commit()
     
     return True
@@ -198,11 +205,140 @@ def adjust_inventory_manually(
         created_by=user_email
     )
     db.add(movement)
+    bump_inventory_version(db, shop_id)
     db.commit()
     db.refresh(inventory)
     
     return inventory
 
+def apply_stocktake(
+    db: Session,
+    shop_id: str,
+    stocktake: StocktakeRequest,
+    user_email: str
+) -> dict:
+    """Apply a full physical count in one transaction and report variances"""
+    
+    errors = []
+    counts = {}
+    for idx, count in enumerate(stocktake.counts):
+        if count.product_id in counts:
+            errors.append({
+                "index": idx,
+                "error": f"Product {count.product_id} counted more than once"
+            })
+            continue
+        counts[count.product_id] = count.counted_quantity
+    
+    product_ids = list(counts.keys())
+    products = {}
+    inventories = {}
+    
+    # Chunk IN lists to stay under driver bind-parameter limits
+    for start in range(0, len(product_ids), 500):
+        chunk = product_ids[start:start + 500]
+        
+        for product_id, product_name, price in db.query(
+            Product.product_id, Product.product_name, Product.price
+        ).filter(
+            and_(
+                Product.shop_id == shop_id,
+                Product.is_active == True,
+                Product.product_id.in_(chunk)
+            )
+        ).all():
+            products[str(product_id)] = (product_name, price)
+        
+        # Lock inventory rows so concurrent sales can't interleave with the count
+        for inventory_id, product_id, current_quantity in db.query(
+            Inventory.inventory_id, Inventory.product_id, Inventory.current_quantity
+        ).filter(
+            and_(
+                Inventory.shop_id == shop_id,
+                Inventory.product_id.in_(chunk)
+            )
+        ).with_for_update().all():
+            inventories[str(product_id)] = (inventory_id, current_quantity)
+    
+    items = []
+    new_inventory_rows = []
+    inventory_updates = []
+    movement_rows = []
+    total_variance_units = 0
+    total_variance_value = 0.0
+    
+    for idx, count in enumerate(stocktake.counts):
+        product_id = count.product_id
+        if product_id not in counts:
+            continue
+        counted = counts.pop(product_id)
+        
+        if product_id not in products:
+            errors.append({
+                "index": idx,
+                "error": f"Product {product_id} not found"
+            })
+            continue
+        
+        product_name, price = products[product_id]
+        inventory_id, expected = inventories.get(product_id, (None, 0))
+        variance = counted - expected
+        
+        if inventory_id is None:
+            new_inventory_rows.append({
+                "shop_id": shop_id,
+                "product_id": product_id,
+                "current_quantity": counted
+            })
+        elif variance != 0:
+            inventory_updates.append({
+                "inventory_id": inventory_id,
+                "current_quantity": counted
+            })
+        
+        if variance != 0:
+            movement_rows.append({
+                "shop_id": shop_id,
+                "product_id": product_id,
+                "movement_type": MovementType.ADJUSTMENT,
+                "quantity_change": variance,
+                "quantity_after": counted,
+                "notes": stocktake.notes or "Stocktake",
+                "created_by": user_email
+            })
+        
+        variance_value = variance * price
+        total_variance_units += variance
+        total_variance_value += variance_value
+        items.append({
+            "product_id": product_id,
+            "product_name": product_name,
+            "expected_quantity": expected,
+            "counted_quantity": counted,
+            "variance": variance,
+            "variance_value": round(variance_value, 2)
+        })
+    
+    # Set-wise writes, committed together
+    if new_inventory_rows:
+        db.execute(insert(Inventory), new_inventory_rows)
+    if inventory_updates:
+        db.execute(update(Inventory), inventory_updates)
+    if movement_rows:
+        db.execute(insert(InventoryMovement), movement_rows)
+    if new_inventory_rows or inventory_updates:
+        bump_inventory_version(db, shop_id)
+    db.commit()
+    
+    return {
+        "products_counted": len(items),
+        "products_adjusted": len(movement_rows),
+        "total_variance_units": total_variance_units,
+        "total_variance_value": round(total_variance_value, 2),
+        "items": items,
+        "errors": errors
+    }
+
 def get_inventory_for_shop(
     db: Session,
     shop_id: str,
@@ -214,7 +350,17 @@ def get_inventory_for_shop(
 ) -> Tuple[List[dict], int]:
     """Get inventory list with product details"""
     
-    query = db.query(Inventory, Product).join(
+    # Columns rather than entities: the page is turned straight into dicts
+    query = db.query(
+        Inventory.inventory_id,
+        Inventory.shop_id,
+        Inventory.product_id,
+        Inventory.current_quantity,
+        Inventory.reorder_level,
+        Inventory.last_updated,
+        Product.product_name,
+        Product.price
+    ).join(
         Product, Inventory.product_id == Product.product_id
     ).filter(
         and_(
@@ -223,9 +369,12 @@ def get_inventory_for_shop(
         )
     )
     
-    # Search filter
+    # Search filter (the in-process index resolves at most SEARCH_MAX_RESULTS IDs)
     if search:
-        query = query.filter(Product.product_name.ilike(f"%{search}%"))
+        product_ids = search_index.search_product_ids(db, shop_id, search)
+        if not product_ids:
+            return [], 0
+        query = query.filter(Product.product_id.in_(product_ids))
     
     # Stock filters
     if low_stock_only:
@@ -239,20 +388,20 @@ def get_inventory_for_shop(
     
     # Format response
     inventory_items = []
-    for inventory, product in results:
-        stock_value = inventory.current_quantity * product.price
-        is_low_stock = inventory.current_quantity <= inventory.reorder_level
+    for row in results:
+        stock_value = row.current_quantity * row.price
+        is_low_stock = row.current_quantity <= row.reorder_level
         
         inventory_items.append({
-            "inventory_id": str(inventory.inventory_id),
-            "shop_id": str(inventory.shop_id),
-            "product_id": str(inventory.product_id),
-            "product_name": product.product_name,
-            "current_quantity": inventory.current_quantity,
-            "reorder_level": inventory.reorder_level,
-            "last_updated": inventory.last_updated,
+            "inventory_id": str(row.inventory_id),
+            "shop_id": str(row.shop_id),
+            "product_id": str(row.product_id),
+            "product_name": row.product_name,
+            "current_quantity": row.current_quantity,
+            "reorder_level": row.reorder_level,
+            "last_updated": row.last_updated,
             "is_low_stock": is_low_stock,
-            "stock_value": round(stock_value, 2)
+            "stock_value": round(float(stock_value), 2)
         })
     
     return inventory_items, total
@@ -295,6 +444,12 @@ def get_stock_alerts(db: Session, shop_id: str) -> List[dict]:
         )
     ).all()
     
+    velocity = crud_reorder.get_sales_velocity(
+        db,
+        shop_id,
+        {str(product.product_id): product.created_at.date() for _, product in alerts if product.created_at}
+    ) if alerts else {}
+    
     stock_alerts = []
     for inventory, product in alerts:
         if inventory.current_quantity <= 0:
@@ -304,6 +459,13 @@ def get_stock_alerts(db: Session, shop_id: str) -> List[dict]:
             status = "low_stock"
             suggested_qty = inventory.reorder_level - inventory.current_quantity
         
+        # Prefer a velocity-based quantity once the product has sales history
+        daily_velocity = velocity.get(str(inventory.product_id))
+        if daily_velocity:
+            suggested_qty = crud_reorder.suggest_reorder(
+                inventory.current_quantity, daily_velocity
+            )["suggested_order_quantity"]
+        
         stock_alerts.append({
             "product_id": str(inventory.product_id),
             "product_name": product.product_name,
@@ -337,6 +499,7 @@ def update_reorder_level(
         )
     
     inventory.reorder_level = reorder_level
+    bump_inventory_version(db, shop_id)
     db.commit()
     db.refresh(inventory)
     
@@ -348,8 +511,8 @@ def get_inventory_movements(
     product_id: Optional[str] = None,
     skip: int = 0,
     limit: int = 100
-) -> Tuple[List[InventoryMovement], int]:
-    """Get inventory movement history"""
+) -> Tuple[List[Tuple[InventoryMovement, Optional[str]]], int]:
+    """Get inventory movement history with active product names"""
     
     query = db.query(InventoryMovement).filter(
         InventoryMovement.shop_id == shop_id
@@ -359,7 +522,15 @@ def get_inventory_movements(
         query = query.filter(InventoryMovement.product_id == product_id)
     
     total = query.count()
-    movements = query.order_by(InventoryMovement.created_at.desc()).offset(skip).limit(limit).all()
+    
+    # Names come from one outer join rather than a product lookup per movement
+    movements = query.add_columns(Product.product_name).outerjoin(
+        Product,
+        and_(
+            Product.product_id == InventoryMovement.product_id,
+            Product.is_active == True
+        )
+    ).order_by(InventoryMovement.created_at.desc()).offset(skip).limit(limit).all()
     
     return movements, total
 
@@ -371,4 +542,202 @@ def get_product_inventory(db: Session, shop_id: str, product_id: str) -> Optiona
             Inventory.shop_id == shop_id,
             Inventory.product_id == product_id
         )
-    ).first()
\ No newline at end of file
+    ).first()
+
+def get_product_stock_as_of(
+    db: Session,
+    shop_id: str,
+    product_id: str,
+    as_of: datetime
+) -> dict:
+    """Get stock level of a product at a point in time"""
+    
+    as_of = _to_utc(as_of)
+    
+    # Range scan on (shop_id, product_id, created_at). Summing changes, unlike
+    # taking the last quantity_after, doesn't depend on how movements sharing
+    # a timestamp are ordered.
+    quantity, last_movement_at = db.query(
+        func.sum(InventoryMovement.quantity_change),
+        func.max(InventoryMovement.created_at)
+    ).filter(
+        and_(
+            InventoryMovement.shop_id == shop_id,
+            InventoryMovement.product_id == product_id,
+            InventoryMovement.created_at <= as_of
+        )
+    ).one()
+    
+    return {
+        "product_id": product_id,
+        "as_of": as_of,
+        "quantity": int(quantity or 0),
+        "last_movement_at": last_movement_at
+    }
+
+def _to_utc(value: datetime) -> datetime:
+    """Aware UTC timestamp for comparing with movement times (naive input is taken as UTC)"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def _replay_start(checkpoint_date: date) -> datetime:
+    """First instant after a checkpoint's (UTC) day"""
+    return datetime.combine(checkpoint_date + timedelta(days=1), time.min, tzinfo=timezone.utc)
+
+def _get_latest_snapshot(
+    db: Session,
+    shop_id: str,
+    before: date
+) -> Tuple[Optional[date], Dict[str, int]]:
+    """Get the latest checkpoint strictly before a day and its quantities"""
+    
+    snapshot_date = db.query(func.max(InventorySnapshot.snapshot_date)).filter(
+        and_(
+            InventorySnapshot.shop_id == shop_id,
+            InventorySnapshot.snapshot_date < before
+        )
+    ).scalar()
+    
+    if snapshot_date is None:
+        return None, {}
+    
+    rows = db.query(InventorySnapshot.product_id, InventorySnapshot.quantity).filter(
+        and_(
+            InventorySnapshot.shop_id == shop_id,
+            InventorySnapshot.snapshot_date == snapshot_date
+        )
+    ).all()
+    
+    return crud_reorder.to_date(snapshot_date), {str(product_id): quantity for product_id, quantity in rows}
+
+def get_shop_stock_as_of(db: Session, shop_id: str, as_of: datetime) -> dict:
+    """Get stock levels of all products at a point in time (checkpoint + deltas)"""
+    
+    # Snapshots are keyed by the UTC day, so the client's offset must not pick the day
+    as_of = _to_utc(as_of)
+    checkpoint_date, quantities = _get_latest_snapshot(db, shop_id, as_of.date())
+    
+    # Only movements after the checkpoint day need replaying
+    delta_query = db.query(
+        InventoryMovement.product_id,
+        func.sum(InventoryMovement.quantity_change)
+    ).filter(
+        and_(
+            InventoryMovement.shop_id == shop_id,
+            InventoryMovement.created_at <= as_of
+        )
+    )
+    if checkpoint_date is not None:
+        delta_query = delta_query.filter(InventoryMovement.created_at >= _replay_start(checkpoint_date))
+    
+    for product_id, change in delta_query.group_by(InventoryMovement.product_id).all():
+        product_id = str(product_id)
+        quantities[product_id] = quantities.get(product_id, 0) + int(change or 0)
+    
+    products = {}
+    if quantities:
+        products = {
+            str(product_id): (name, price)
+            for product_id, name, price in db.query(
+                Product.product_id, Product.product_name, Product.price
+            ).filter(
+                and_(
+                    Product.shop_id == shop_id,
+                    Product.product_id.in_(list(quantities.keys()))
+                )
+            ).all()
+        }
+    
+    items = []
+    total_stock_value = 0.0
+    for product_id, quantity in quantities.items():
+        name, price = products.get(product_id, (None, 0.0))
+        stock_value = quantity * price
+        total_stock_value += stock_value
+        items.append({
+            "product_id": product_id,
+            "product_name": name,
+            "quantity": quantity,
+            "price": price,
+            "stock_value": round(stock_value, 2)
+        })
+    
+    items.sort(key=lambda item: item["product_name"] or "")
+    
+    return {
+        "as_of": as_of,
+        "checkpoint_date": checkpoint_date,
+        "total_products": len(items),
+        "total_stock_value": round(total_stock_value, 2),
+        "items": items
+    }
+
+def build_inventory_snapshots(db: Session, shop_id: str, until: Optional[date] = None) -> dict:
+    """Write end-of-day checkpoints for every day up to `until` (default: yesterday)"""
+    
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    if until is None:
+        until = yesterday
+    elif until > yesterday:
+        # A checkpoint is final; today's (UTC) movements are still coming in
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Snapshots can only be built for days before today (UTC); latest is {yesterday.isoformat()}"
+        )
+    
+    checkpoint_date, quantities = _get_latest_snapshot(db, shop_id, until + timedelta(days=1))
+    
+    if checkpoint_date is not None and checkpoint_date >= until:
+        return {"days_written": 0, "rows_written": 0, "last_snapshot_date": checkpoint_date}
+    
+    movement_day = func.date(InventoryMovement.created_at)
+    day_query = db.query(
+        movement_day,
+        InventoryMovement.product_id,
+        func.sum(InventoryMovement.quantity_change)
+    ).filter(
+        and_(
+            InventoryMovement.shop_id == shop_id,
+            InventoryMovement.created_at < _replay_start(until)
+        )
+    )
+    if checkpoint_date is not None:
+        day_query = day_query.filter(InventoryMovement.created_at >= _replay_start(checkpoint_date))
+    
+    # Per-day deltas for the whole range in one grouped query
+    deltas_by_day: Dict[date, List[Tuple[str, int]]] = {}
+    for day, product_id, change in day_query.group_by(movement_day, InventoryMovement.product_id).all():
+        deltas_by_day.setdefault(crud_reorder.to_date(day), []).append((str(product_id), int(change or 0)))
+    
+    if not deltas_by_day and checkpoint_date is None:
+        return {"days_written": 0, "rows_written": 0, "last_snapshot_date": None}
+    
+    day = checkpoint_date + timedelta(days=1) if checkpoint_date else min(deltas_by_day)
+    days_written = 0
+    rows_written = 0
+    
+    while day <= until:
+        for product_id, change in deltas_by_day.get(day, []):
+            quantities[product_id] = quantities.get(product_id, 0) + change
+        
+        # Products with zero stock are implied by a missing row
+        rows = [
+            {
+                "shop_id": shop_id,
+                "product_id": product_id,
+                "snapshot_date": day,
+                "quantity": quantity
+            }
+            for product_id, quantity in quantities.items()
+            if quantity != 0
+        ]
+        if rows:
+            db.execute(insert(InventorySnapshot), rows)
+            rows_written += len(rows)
+        days_written += 1
+        day += timedelta(days=1)
+    
+    db.commit()
+    
+    return {"days_written": days_written, "rows_written": rows_written, "last_snapshot_date": until}
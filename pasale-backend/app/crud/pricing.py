@@ -0,0 +1,67 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, select
+from app.models.product import Product, ProductPrice
+from typing import List, Optional
+from datetime import datetime
+from fastapi import HTTPException, status
+
+def record_price(db: Session, shop_id: str, product_id: str, price: float, change_seq: int) -> ProductPrice:
+    """Start a new effective-dated list price, stamped with the product write's change_seq (committed by the caller)"""
+    entry = ProductPrice(shop_id=shop_id, product_id=product_id, price=price, change_seq=change_seq)
+    db.add(entry)
+    return entry
+
+def list_price_at(product_id_column, at_column):
+    """Correlated scalar subquery for the list price in effect at a timestamp
+    
+    Lets reports join list prices in bulk, e.g.
+    `db.query(Transaction, list_price_at(Transaction.product_id, Transaction.date_time))`.
+    """
+    return (
+        select(ProductPrice.price)
+        .where(
+            and_(
+                ProductPrice.product_id == product_id_column,
+                ProductPrice.effective_from <= at_column
+            )
+        )
+        .order_by(ProductPrice.effective_from.desc(), ProductPrice.change_seq.desc())
+        .limit(1)
+        .correlate_except(ProductPrice)
+        .scalar_subquery()
+    )
+
+def _get_shop_product(db: Session, shop_id: str, product_id: str) -> Product:
+    db_product = db.query(Product).filter(
+        and_(
+            Product.product_id == product_id,
+            Product.shop_id == shop_id
+        )
+    ).first()
+    
+    if not db_product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    return db_product
+
+def get_price_as_of(db: Session, shop_id: str, product_id: str, as_of: datetime) -> Optional[ProductPrice]:
+    """Get the list price entry in effect at a point in time"""
+    _get_shop_product(db, shop_id, product_id)
+    
+    # Index seek on (product_id, effective_from)
+    return db.query(ProductPrice).filter(
+        and_(
+            ProductPrice.product_id == product_id,
+            ProductPrice.effective_from <= as_of
+        )
+    ).order_by(ProductPrice.effective_from.desc(), ProductPrice.change_seq.desc()).first()
+
+def get_price_history(db: Session, shop_id: str, product_id: str) -> List[ProductPrice]:
+    """Get all list prices a product has had, newest first"""
+    _get_shop_product(db, shop_id, product_id)
+    
+    return db.query(ProductPrice).filter(
+        ProductPrice.product_id == product_id
+    ).order_by(ProductPrice.effective_from.desc(), ProductPrice.change_seq.desc()).all()
@@ -1,11 +1,25 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from app.models.product import Product
+from sqlalchemy import and_, or_, insert, exists
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from pydantic import ValidationError
+from app.models.product import Product, ProductPrice
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.inventory import Inventory, InventoryMovement, MovementType
 from app.schemas.product import ProductCreate, ProductUpdate
-from typing import Optional, List
+from app.config import settings
+from typing import Optional, List, Tuple, Iterable, Dict
+from datetime import datetime
 from fastapi import HTTPException, status
+import uuid
 # Add this import at the top
 from app.crud import inventory as crud_inventory
+from app.crud import category as crud_category
+from app.crud import pricing as crud_pricing
+from app.crud.shopkeeper import bump_catalog_version, bump_inventory_version
+from app.utils import search_index, barcode_cache
+from app.utils.product_import import ImportFileError
+from app.utils.metrics import BULK_SYNC_BATCH_SIZE
 
 # Update create_product function
 def create_product(db: Session, product: ProductCreate, shop_id: str) -> Product:
@@ -16,11 +30,21 @@ def create_product(db: Session, product: ProductCreate, shop_id: str) -> Product
         product_name=product.product_name,
         category=product.category,
         price=product.price,
-        unit=product.unit
+        unit=product.unit,
+        barcode=product.barcode,
+        change_seq=bump_catalog_version(db, shop_id)
     )
     
-    db.add(db_product)
-    db.commit()
+    try:
+        db.add(db_product)
+        # A barcode clash surfaces here, before the rows that depend on the product
+        db.flush()
+        crud_pricing.record_price(db, shop_id, db_product.product_id, db_product.price, db_product.change_seq)
+        crud_category.adjust_category_count(db, shop_id, product.category, 1)
+    except IntegrityError:
+        db.rollback()
+        raise _barcode_clash()
+    _commit_product_write(db)
     db.refresh(db_product)
     
     # Initialize inventory with opening stock
@@ -33,8 +57,24 @@ def create_product(db: Session, product: ProductCreate, shop_id: str) -> Product
             product.reorder_level if hasattr(product, 'reorder_level') else 10
         )
     
+    search_index.index_product(db_product)
+    barcode_cache.cache_product(db_product)
     return db_product
 
+def _barcode_clash() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Another product in this shop already uses this barcode"
+    )
+
+def _commit_product_write(db: Session) -> None:
+    """Commit a product write, reporting a barcode clash as a client error"""
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise _barcode_clash()
+
 def get_product_by_id(db: Session, product_id: str, shop_id: str) -> Optional[Product]:
     """Get product by ID (only if it belongs to the shop)"""
     return db.query(Product).filter(
@@ -52,19 +92,24 @@ def get_products_by_shop(
     limit: int = 100,
     search: Optional[str] = None,
     category: Optional[str] = None,
-    include_inactive: bool = False
+    include_inactive: bool = False,
+    columns: Optional[tuple] = None
 ) -> tuple[List[Product], int]:
-    """Get all products for a shop with pagination and filters"""
+    """Get all products for a shop with pagination and filters (rows of columns if given)"""
     
-    query = db.query(Product).filter(Product.shop_id == shop_id)
+    query = db.query(*columns) if columns else db.query(Product)
+    query = query.filter(Product.shop_id == shop_id)
     
     # Filter by active status
     if not include_inactive:
         query = query.filter(Product.is_active == True)
     
-    # Search by product name
+    # Search by product name (the in-process index resolves at most SEARCH_MAX_RESULTS IDs)
     if search:
-        query = query.filter(Product.product_name.ilike(f"%{search}%"))
+        product_ids = search_index.search_product_ids(db, shop_id, search, include_inactive)
+        if not product_ids:
+            return [], 0
+        query = query.filter(Product.product_id.in_(product_ids))
     
     # Filter by category
     if category:
@@ -78,6 +123,26 @@ def get_products_by_shop(
     
     return products, total
 
+# ProductResponse fields stored on the products table
+PRODUCT_FIELDS = (
+    "product_id", "shop_id", "product_name", "category", "price", "unit", "barcode",
+    "created_at", "updated_at", "version", "is_active"
+)
+
+def get_product_rows(db: Session, shop_id: str, **filters) -> tuple[List[dict], int]:
+    """Same page as get_products_by_shop as plain ProductResponse-shaped dicts"""
+    rows, total = get_products_by_shop(
+        db,
+        shop_id,
+        columns=tuple(getattr(Product, field) for field in PRODUCT_FIELDS),
+        **filters
+    )
+    # Stock fields are only filled in on inventory views
+    return [
+        {**row._asdict(), "current_stock": None, "reorder_level": None, "stock_value": None}
+        for row in rows
+    ], total
+
 def update_product(
     db: Session, 
     product_id: str, 
@@ -97,14 +162,31 @@ def update_product(
     # Update only provided fields
     update_data = product_update.dict(exclude_unset=True)
     
+    # Move the product between category counts
+    if "category" in update_data and update_data["category"] != db_product.category:
+        crud_category.adjust_category_count(db, shop_id, db_product.category, -1)
+        crud_category.adjust_category_count(db, shop_id, update_data["category"], 1)
+    
+    price_changed = "price" in update_data and update_data["price"] != db_product.price
+    
     for key, value in update_data.items():
         setattr(db_product, key, value)
     
     # Increment version for conflict resolution
     db_product.version += 1
     
-    db.commit()
+    # Inventory listings show product names and prices too
+    db_product.change_seq = bump_catalog_version(db, shop_id)
+    bump_inventory_version(db, shop_id)
+    
+    # Close the current list price and open a new one
+    if price_changed:
+        crud_pricing.record_price(db, shop_id, product_id, db_product.price, db_product.change_seq)
+    _commit_product_write(db)
     db.refresh(db_product)
+    
+    search_index.index_product(db_product)
+    barcode_cache.cache_product(db_product)
     return db_product
 
 def delete_product(db: Session, product_id: str, shop_id: str, soft_delete: bool = True) -> bool:
@@ -123,20 +205,38 @@ def delete_product(db: Session, product_id: str, shop_id: str, soft_delete: bool
             detail="Product not found"
         )
     
+    # Hard delete - check if product has transactions first
+    if not soft_delete:
+        has_transactions = db.query(
+            exists().where(Transaction.product_id == product_id)
+        ).scalar()
+        if has_transactions:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot delete product with existing transactions. Use soft delete instead."
+            )
+    
+    # Only active products are counted in their category
+    if db_product.is_active:
+        crud_category.adjust_category_count(db, shop_id, db_product.category, -1)
+    
     if soft_delete:
         # Soft delete - mark as inactive
         db_product.is_active = False
+        db_product.version += 1
+        db_product.change_seq = bump_catalog_version(db, shop_id)
+        bump_inventory_version(db, shop_id)
         db.commit()
+        search_index.index_product(db_product)
+        barcode_cache.cache_product(db_product)
     else:
         # Hard delete - permanently remove
-        # Check if product has transactions first
-        if db_product.transactions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Cannot delete product with existing transactions. Use soft delete instead."
-            )
         db.delete(db_product)
+        change_seq = bump_catalog_version(db, shop_id)
+        bump_inventory_version(db, shop_id)
         db.commit()
+        search_index.unindex_product(shop_id, product_id)
+        barcode_cache.uncache_product(shop_id, product_id, change_seq)
     
     return True
 
@@ -158,18 +258,260 @@ def restore_product(db: Session, product_id: str, shop_id: str) -> Product:
         )
     
     db_product.is_active = True
+    db_product.version += 1
+    db_product.change_seq = bump_catalog_version(db, shop_id)
+    crud_category.adjust_category_count(db, shop_id, db_product.category, 1)
+    bump_inventory_version(db, shop_id)
     db.commit()
     db.refresh(db_product)
+    
+    search_index.index_product(db_product)
+    barcode_cache.cache_product(db_product)
     return db_product
 
-def get_categories_by_shop(db: Session, shop_id: str) -> List[str]:
-    """Get unique categories used by a shop"""
-    categories = db.query(Product.category).filter(
-        and_(
-            Product.shop_id == shop_id,
-            Product.is_active == True,
-            Product.category.isnot(None)
+def get_categories_by_shop(db: Session, shop_id: str) -> List[Category]:
+    """Get categories used by a shop's active products, with product counts"""
+    return crud_category.get_categories_with_counts(db, shop_id)
+
+def autocomplete_products(db: Session, shop_id: str, query: str, limit: int = 10) -> List[dict]:
+    """Get ranked name matches for the search box"""
+    return search_index.get_index(db, shop_id).search(query, limit=limit)
+
+def get_product_by_code(db: Session, shop_id: str, code: str) -> dict:
+    """Get an active product by scanned barcode/SKU"""
+    
+    code = barcode_cache.normalize_code(code)
+    # The cache is checked against the shop's catalog version, so a miss is final
+    hit = barcode_cache.lookup(db, shop_id, code) if code else None
+    if not hit:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No product with this barcode"
+        )
+    return hit
+
+def encode_watermark(product: Product) -> str:
+    """Build a sync watermark pointing just past a product"""
+    return f"{product.change_seq}|{product.product_id}"
+
+def decode_watermark(watermark: str) -> Tuple[int, Optional[str]]:
+    """Parse a sync watermark into (change_seq, product_id)"""
+    seq, _, product_id = watermark.partition("|")
+    try:
+        return int(seq), product_id or None
+    except ValueError:
+        pass
+    
+    # Watermarks from before change_seq carried a timestamp; resync from the start
+    try:
+        datetime.fromisoformat(seq)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync watermark"
         )
-    ).distinct().all()
+    return 0, None
+
+def get_product_changes(
+    db: Session,
+    shop_id: str,
+    since: Optional[str] = None,
+    limit: int = 500
+) -> dict:
+    """Get products created, updated, deleted or restored after a watermark"""
+    
+    query = db.query(Product).filter(Product.shop_id == shop_id)
+    
+    # Keyset on (change_seq, product_id): an import stamps a whole batch with one seq
+    if since:
+        since_seq, since_product_id = decode_watermark(since)
+        if since_product_id:
+            query = query.filter(
+                or_(
+                    Product.change_seq > since_seq,
+                    and_(
+                        Product.change_seq == since_seq,
+                        Product.product_id > since_product_id
+                    )
+                )
+            )
+        else:
+            query = query.filter(Product.change_seq > since_seq)
+    
+    products = query.order_by(Product.change_seq.asc(), Product.product_id.asc()).limit(limit + 1).all()
+    
+    has_more = len(products) > limit
+    products = products[:limit]
+    
+    return {
+        "changed": [p for p in products if p.is_active],
+        "deleted": [
+            {
+                "product_id": str(p.product_id),
+                "updated_at": p.updated_at,
+                "version": p.version
+            }
+            for p in products if not p.is_active
+        ],
+        "watermark": encode_watermark(products[-1]) if products else since,
+        "has_more": has_more
+    }
+
+
+def _import_error_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+def _insert_import_batch(db: Session, shop_id: str, batch: List[ProductCreate]) -> None:
+    """Insert one batch of products with inventory and opening stock in a single transaction"""
+    
+    BULK_SYNC_BATCH_SIZE.observe(len(batch), "product_import")
+    products, prices, inventory, movements = [], [], [], []
+    category_deltas: Dict[str, int] = {}
+    change_seq = bump_catalog_version(db, shop_id)
+    
+    for product in batch:
+        product_id = str(uuid.uuid4())
+        products.append({
+            "product_id": product_id,
+            "shop_id": shop_id,
+            "product_name": product.product_name,
+            "category": product.category,
+            "price": product.price,
+            "unit": product.unit,
+            "barcode": product.barcode,
+            "is_active": True,
+            "version": 1,
+            "change_seq": change_seq
+        })
+        prices.append({
+            "price_id": str(uuid.uuid4()),
+            "shop_id": shop_id,
+            "product_id": product_id,
+            "price": product.price,
+            "change_seq": change_seq
+        })
+        inventory.append({
+            "inventory_id": str(uuid.uuid4()),
+            "shop_id": shop_id,
+            "product_id": product_id,
+            "current_quantity": product.opening_stock,
+            "reorder_level": product.reorder_level
+        })
+        if product.opening_stock > 0:
+            movements.append({
+                "movement_id": str(uuid.uuid4()),
+                "shop_id": shop_id,
+                "product_id": product_id,
+                "movement_type": MovementType.OPENING_STOCK,
+                "quantity_change": product.opening_stock,
+                "quantity_after": product.opening_stock,
+                "notes": "Opening stock (import)"
+            })
+        if product.category:
+            category_deltas[product.category] = category_deltas.get(product.category, 0) + 1
+    
+    db.execute(insert(Product), products)
+    db.execute(insert(ProductPrice), prices)
+    db.execute(insert(Inventory), inventory)
+    if movements:
+        db.execute(insert(InventoryMovement), movements)
+    crud_category.adjust_category_counts(db, shop_id, category_deltas)
+    bump_inventory_version(db, shop_id)
+    db.commit()
+
+def import_products(
+    db: Session,
+    shop_id: str,
+    rows: Iterable[Tuple[int, dict]],
+    batch_size: Optional[int] = None
+) -> dict:
+    """Import products from parsed file rows, committing every `batch_size` valid rows"""
+    
+    batch_size = batch_size or settings.PRODUCT_IMPORT_BATCH_SIZE
+    max_errors = settings.PRODUCT_IMPORT_MAX_ERRORS
+    
+    total_rows = imported = failed = 0
+    errors: List[dict] = []
+    batch: List[ProductCreate] = []
+    batch_rows: List[int] = []
+    
+    def record_error(row_number: int, message: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < max_errors:
+            errors.append({"row": row_number, "error": message})
+    
+    def flush() -> None:
+        nonlocal imported
+        if not batch:
+            return
+        
+        # Drop rows whose barcode is already taken, in the shop or earlier in this batch
+        codes = [product.barcode for product in batch if product.barcode]
+        if codes:
+            taken = {
+                code for (code,) in db.query(Product.barcode).filter(
+                    and_(
+                        Product.shop_id == shop_id,
+                        Product.barcode.in_(codes)
+                    )
+                )
+            }
+            kept, kept_rows = [], []
+            for product, row_number in zip(batch, batch_rows):
+                if product.barcode and product.barcode in taken:
+                    record_error(row_number, f"barcode: {product.barcode} is already used by another product")
+                    continue
+                if product.barcode:
+                    taken.add(product.barcode)
+                kept.append(product)
+                kept_rows.append(row_number)
+            batch[:], batch_rows[:] = kept, kept_rows
+            if not batch:
+                return
+        
+        try:
+            _insert_import_batch(db, shop_id, batch)
+            imported += len(batch)
+        except SQLAlchemyError as exc:
+            db.rollback()
+            message = f"Batch insert failed: {exc.__class__.__name__}"
+            for row_number in batch_rows:
+                record_error(row_number, message)
+        batch.clear()
+        batch_rows.clear()
+    
+    try:
+        try:
+            for row_number, row in rows:
+                total_rows += 1
+                try:
+                    product = ProductCreate(**row)
+                except ValidationError as exc:
+                    record_error(row_number, _import_error_message(exc))
+                    continue
+                
+                batch.append(product)
+                batch_rows.append(row_number)
+                if len(batch) >= batch_size:
+                    flush()
+        except ImportFileError as exc:
+            # Earlier batches are committed; report where reading stopped instead of failing the request
+            record_error(exc.row, f"{exc.message}; rows from here on were not imported")
+        
+        flush()
+    finally:
+        # Rebuild search and barcode lookups lazily rather than row by row
+        if imported:
+            search_index.invalidate_index(shop_id)
+            barcode_cache.invalidate_cache(shop_id)
     
-    return [cat[0] for cat in categories if cat[0]]
\ No newline at end of file
+    return {
+        "total_rows": total_rows,
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors)
+    }
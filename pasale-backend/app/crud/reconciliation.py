@@ -0,0 +1,186 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, case, insert, update
+from app.models.inventory import Inventory, InventoryMovement, MovementType
+from app.models.product import Product
+from app.models.transaction import Transaction, TransactionType
+from app.crud.shopkeeper import bump_inventory_version
+from typing import Dict
+
+# Marks correcting movements so later runs don't count them as manual changes
+RECONCILIATION_ACTOR = "reconciliation"
+
+def _movement_totals(db: Session, shop_id: str) -> Dict[str, dict]:
+    """Sum movements per product, split into transaction-backed and manual changes"""
+    
+    # Movements whose transaction still exists are re-derived from transactions;
+    # everything else (opening stock, adjustments, reversals) is manual
+    manual_change = func.sum(
+        case(
+            (
+                and_(
+                    Transaction.transaction_id.is_(None),
+                    func.coalesce(InventoryMovement.created_by, "") != RECONCILIATION_ACTOR
+                ),
+                InventoryMovement.quantity_change
+            ),
+            else_=0
+        )
+    )
+    
+    rows = db.query(
+        InventoryMovement.product_id,
+        func.sum(InventoryMovement.quantity_change),
+        manual_change
+    ).outerjoin(
+        Transaction, Transaction.transaction_id == InventoryMovement.transaction_id
+    ).filter(
+        InventoryMovement.shop_id == shop_id
+    ).group_by(InventoryMovement.product_id).all()
+    
+    return {
+        str(product_id): {"total": int(total or 0), "manual": int(manual or 0)}
+        for product_id, total, manual in rows
+    }
+
+def _transaction_totals(db: Session, shop_id: str) -> Dict[str, int]:
+    """Sum the stock effect of every existing transaction per product"""
+    
+    signed_quantity = func.sum(
+        case(
+            (Transaction.type == TransactionType.SALE, -Transaction.quantity),
+            else_=Transaction.quantity
+        )
+    )
+    
+    rows = db.query(Transaction.product_id, signed_quantity).filter(
+        and_(
+            Transaction.shop_id == shop_id,
+            Transaction.product_id.isnot(None)
+        )
+    ).group_by(Transaction.product_id).all()
+    
+    return {str(product_id): int(total or 0) for product_id, total in rows}
+
+def reconcile_shop_inventory(
+    db: Session,
+    shop_id: str,
+    include_transactions: bool = False,
+    repair: bool = False
+) -> dict:
+    """Recompute expected stock for a shop, report drift and optionally repair it"""
+    
+    inventory_query = db.query(
+        Inventory.inventory_id,
+        Inventory.product_id,
+        Inventory.current_quantity,
+        Product.product_name
+    ).join(
+        Product, Product.product_id == Inventory.product_id
+    ).filter(Inventory.shop_id == shop_id)
+    if repair:
+        # Lock before summing so stock writes can't land between the read and
+        # the absolute quantities written back
+        inventory_query = inventory_query.with_for_update(of=Inventory)
+    
+    inventories = {
+        str(product_id): (inventory_id, current_quantity, product_name)
+        for inventory_id, product_id, current_quantity, product_name in inventory_query.all()
+    }
+    
+    movements = _movement_totals(db, shop_id)
+    transactions = _transaction_totals(db, shop_id) if include_transactions else {}
+    
+    product_ids = set(inventories) | set(movements) | set(transactions)
+    missing_names = product_ids - set(inventories)
+    names = {}
+    if missing_names:
+        names = {
+            str(product_id): product_name
+            for product_id, product_name in db.query(Product.product_id, Product.product_name).filter(
+                and_(
+                    Product.shop_id == shop_id,
+                    Product.product_id.in_(list(missing_names))
+                )
+            ).all()
+        }
+    
+    items = []
+    new_inventory_rows = []
+    inventory_updates = []
+    movement_rows = []
+    
+    for product_id in product_ids:
+        if product_id not in inventories and product_id not in names:
+            continue  # Product was hard-deleted
+        
+        inventory_id, current_quantity, product_name = inventories.get(
+            product_id, (None, 0, names.get(product_id))
+        )
+        movement = movements.get(product_id, {"total": 0, "manual": 0})
+        movement_quantity = movement["total"]
+        
+        transaction_quantity = None
+        expected_quantity = movement_quantity
+        if include_transactions:
+            transaction_quantity = movement["manual"] + transactions.get(product_id, 0)
+            expected_quantity = transaction_quantity
+        
+        if current_quantity == expected_quantity and movement_quantity == expected_quantity:
+            continue
+        
+        items.append({
+            "product_id": product_id,
+            "product_name": product_name,
+            "current_quantity": current_quantity,
+            "movement_quantity": movement_quantity,
+            "transaction_quantity": transaction_quantity,
+            "expected_quantity": expected_quantity,
+            "drift": current_quantity - expected_quantity
+        })
+        
+        if not repair:
+            continue
+        
+        # The movement log only needs a correction when transactions disagree with it
+        if movement_quantity != expected_quantity:
+            movement_rows.append({
+                "shop_id": shop_id,
+                "product_id": product_id,
+                "movement_type": MovementType.ADJUSTMENT,
+                "quantity_change": expected_quantity - movement_quantity,
+                "quantity_after": expected_quantity,
+                "notes": "Reconciliation correction",
+                "created_by": RECONCILIATION_ACTOR
+            })
+        
+        if inventory_id is None:
+            new_inventory_rows.append({
+                "shop_id": shop_id,
+                "product_id": product_id,
+                "current_quantity": expected_quantity
+            })
+        elif current_quantity != expected_quantity:
+            inventory_updates.append({
+                "inventory_id": inventory_id,
+                "current_quantity": expected_quantity
+            })
+    
+    if repair and items:
+        if new_inventory_rows:
+            db.execute(insert(Inventory), new_inventory_rows)
+        if inventory_updates:
+            db.execute(update(Inventory), inventory_updates)
+        if movement_rows:
+            db.execute(insert(InventoryMovement), movement_rows)
+        bump_inventory_version(db, shop_id)
+        db.commit()
+    
+    items.sort(key=lambda item: abs(item["drift"]), reverse=True)
+    
+    return {
+        "shop_id": shop_id,
+        "products_checked": len(product_ids),
+        "products_drifted": len(items),
+        "repaired": repair and bool(items),
+        "items": items
+    }
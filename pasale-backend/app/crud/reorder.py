@@ -0,0 +1,214 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, case, update
+from app.models.inventory import Inventory
+from app.models.product import Product
+from app.models.transaction import Transaction, TransactionType
+from app.crud.shopkeeper import bump_inventory_version
+from app.config import settings
+from app.database import primary_session
+from typing import Optional, List, Dict
+from datetime import datetime, date, timedelta
+import math
+import threading
+import time
+
+# Per-shop cache of net units sold per product per day:
+# {shop_id: {"loaded_at": float, "daily_sales": {product_id: {date: units}}}}
+_sales_cache: Dict[str, dict] = {}
+_cache_lock = threading.Lock()
+
+def to_date(value) -> date:
+    """Normalize a DATE() result (SQLite returns strings)"""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+def _window_start() -> date:
+    return datetime.utcnow().date() - timedelta(days=settings.REORDER_VELOCITY_WINDOW_DAYS - 1)
+
+def _load_daily_sales(db: Session, shop_id: str) -> Dict[str, Dict[date, int]]:
+    """Load net units sold per product per day for the velocity window"""
+    
+    sale_day = func.date(Transaction.date_time)
+    net_units = func.sum(
+        case(
+            (Transaction.type == TransactionType.SALE, Transaction.quantity),
+            else_=-Transaction.quantity
+        )
+    )
+    
+    rows = db.query(Transaction.product_id, sale_day, net_units).filter(
+        and_(
+            Transaction.shop_id == shop_id,
+            Transaction.product_id.isnot(None),
+            Transaction.type.in_([TransactionType.SALE, TransactionType.RETURN]),
+            Transaction.date_time >= datetime.combine(_window_start(), datetime.min.time())
+        )
+    ).group_by(Transaction.product_id, sale_day).all()
+    
+    daily_sales: Dict[str, Dict[date, int]] = {}
+    for product_id, day, units in rows:
+        daily_sales.setdefault(str(product_id), {})[to_date(day)] = int(units or 0)
+    
+    return daily_sales
+
+def _snapshot(daily_sales: Dict[str, Dict[date, int]]) -> Dict[str, Dict[date, int]]:
+    """Copy of a cached history (call with _cache_lock held; record_sale mutates it)"""
+    return {product_id: dict(days) for product_id, days in daily_sales.items()}
+
+def _get_daily_sales(db: Session, shop_id: str) -> Dict[str, Dict[date, int]]:
+    """Get a snapshot of a shop's cached daily sales, reloading once the TTL has passed"""
+    
+    with _cache_lock:
+        entry = _sales_cache.get(shop_id)
+        if entry and time.monotonic() - entry["loaded_at"] < settings.REORDER_CACHE_TTL_SECONDS:
+            return _snapshot(entry["daily_sales"])
+    
+    # Kept for every later request and only patched by record_sale
+    with primary_session(db) as primary:
+        daily_sales = _load_daily_sales(primary, shop_id)
+    
+    with _cache_lock:
+        _sales_cache[shop_id] = {"loaded_at": time.monotonic(), "daily_sales": daily_sales}
+        return _snapshot(daily_sales)
+
+def record_sale(
+    shop_id: str,
+    product_id: str,
+    transaction_type: TransactionType,
+    quantity: int,
+    date_time: Optional[datetime] = None
+) -> None:
+    """Fold a new sale/return into the cached history without reloading it"""
+    
+    if transaction_type == TransactionType.SALE:
+        units = quantity
+    elif transaction_type == TransactionType.RETURN:
+        units = -quantity
+    else:
+        return
+    
+    day = (date_time or datetime.utcnow()).date()
+    
+    with _cache_lock:
+        entry = _sales_cache.get(shop_id)
+        if entry is None:
+            return  # Loaded fresh on next read
+        product_sales = entry["daily_sales"].setdefault(product_id, {})
+        product_sales[day] = product_sales.get(day, 0) + units
+
+def invalidate_sales_cache(shop_id: str) -> None:
+    """Drop a shop's cached history (e.g. after deletes or bulk edits)"""
+    with _cache_lock:
+        _sales_cache.pop(shop_id, None)
+
+def get_sales_velocity(
+    db: Session,
+    shop_id: str,
+    listed_since: Optional[Dict[str, date]] = None
+) -> Dict[str, float]:
+    """Get moving-average daily sales velocity for every product in a shop"""
+    
+    daily_sales = _get_daily_sales(db, shop_id)
+    window_start = _window_start()
+    today = datetime.utcnow().date()
+    listed_since = listed_since or {}
+    
+    velocity = {}
+    for product_id, days in daily_sales.items():
+        window_days = [day for day in days if day >= window_start]
+        units = sum(days[day] for day in window_days)
+        if units <= 0:
+            continue
+        
+        # Products newer than the window only average over the days they existed
+        days_observed = settings.REORDER_VELOCITY_WINDOW_DAYS
+        if product_id in listed_since:
+            first_day = min(min(window_days), listed_since[product_id])
+            days_observed = min(days_observed, (today - first_day).days + 1)
+        
+        velocity[product_id] = units / days_observed
+    
+    return velocity
+
+def suggest_reorder(current_quantity: int, daily_velocity: float) -> dict:
+    """Derive reorder level and order quantity from a daily sales velocity"""
+    
+    reorder_level = math.ceil(
+        daily_velocity * (settings.REORDER_LEAD_TIME_DAYS + settings.REORDER_SAFETY_STOCK_DAYS)
+    )
+    target_stock = math.ceil(
+        daily_velocity * (settings.REORDER_LEAD_TIME_DAYS + settings.REORDER_SAFETY_STOCK_DAYS + settings.REORDER_COVER_DAYS)
+    )
+    
+    return {
+        "suggested_reorder_level": reorder_level,
+        "suggested_order_quantity": max(0, target_stock - current_quantity),
+        "days_of_cover": round(current_quantity / daily_velocity, 1) if daily_velocity > 0 else None
+    }
+
+def get_reorder_suggestions(db: Session, shop_id: str, only_due: bool = False) -> List[dict]:
+    """Get velocity-based reorder suggestions for all products in a shop"""
+    
+    rows = db.query(
+        Inventory.inventory_id,
+        Product.product_id,
+        Product.product_name,
+        Product.created_at,
+        Inventory.current_quantity,
+        Inventory.reorder_level
+    ).join(
+        Inventory, Inventory.product_id == Product.product_id
+    ).filter(
+        and_(
+            Inventory.shop_id == shop_id,
+            Product.is_active == True
+        )
+    ).all()
+    
+    velocity = get_sales_velocity(
+        db,
+        shop_id,
+        {str(row.product_id): row.created_at.date() for row in rows if row.created_at}
+    )
+    
+    suggestions = []
+    for inventory_id, product_id, product_name, created_at, current_quantity, reorder_level in rows:
+        daily_velocity = velocity.get(str(product_id), 0.0)
+        suggestion = suggest_reorder(current_quantity, daily_velocity)
+        if only_due and current_quantity > suggestion["suggested_reorder_level"]:
+            continue
+        
+        suggestions.append({
+            "inventory_id": inventory_id,
+            "product_id": str(product_id),
+            "product_name": product_name,
+            "current_quantity": current_quantity,
+            "reorder_level": reorder_level,
+            "avg_daily_sales": round(daily_velocity, 2),
+            **suggestion
+        })
+    
+    # Most urgent first; products without sales go last
+    suggestions.sort(key=lambda s: (s["days_of_cover"] is None, s["days_of_cover"] or 0))
+    
+    return suggestions
+
+def auto_tune_reorder_levels(db: Session, shop_id: str) -> int:
+    """Set reorder_level from sales velocity for every product that has sales"""
+    
+    updates = [
+        {"inventory_id": s["inventory_id"], "reorder_level": s["suggested_reorder_level"]}
+        for s in get_reorder_suggestions(db, shop_id)
+        if s["avg_daily_sales"] > 0 and s["suggested_reorder_level"] != s["reorder_level"]
+    ]
+    
+    # Bulk UPDATE by primary key
+    if updates:
+        db.execute(update(Inventory), updates)
+        bump_inventory_version(db, shop_id)
+        db.commit()
+    
+    return len(updates)
@@ -1,10 +1,13 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import update, or_
 from sqlalchemy.exc import IntegrityError
 from app.models.shopkeeper import Shopkeeper
 from app.schemas.shopkeeper import ShopkeeperCreate, ShopkeeperUpdate
-from app.utils.security import hash_password, verify_password, pwd_context
-from typing import Optional
+from app.utils import auth_cache, password_pool
+from app.database import DBRunner
+from typing import Optional, Tuple
 from fastapi import HTTPException, status
+import re
 
 def get_shopkeeper_by_id(db: Session, shop_id: str) -> Optional[Shopkeeper]:
     """Get shopkeeper by shop_id"""
@@ -19,43 +22,41 @@ def get_shopkeeper_by_contact(db: Session, contact: str) -> Optional[Shopkeeper]
     return db.query(Shopkeeper).filter(Shopkeeper.contact == contact).first()
 
 def get_shopkeeper_by_identifier(db: Session, identifier: str) -> Optional[Shopkeeper]:
-    """Get shopkeeper by email or contact"""
-    shopkeeper = get_shopkeeper_by_email(db, identifier)
-    if not shopkeeper:
-        shopkeeper = get_shopkeeper_by_contact(db, identifier)
-    return shopkeeper
-
-def create_shopkeeper(db: Session, shopkeeper: ShopkeeperCreate) -> Shopkeeper:
-    """Create new shopkeeper"""
-    
-    # Check if email already exists
-    if shopkeeper.email:
-        existing = get_shopkeeper_by_email(db, shopkeeper.email)
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-    
-    # Check if contact already exists
-    existing = get_shopkeeper_by_contact(db, shopkeeper.contact)
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Contact number already registered"
+    """Get shopkeeper by email or contact in one query (both columns are unique-indexed)"""
+    return db.query(Shopkeeper).filter(
+        or_(
+            Shopkeeper.email == identifier,
+            Shopkeeper.contact == identifier
         )
-    
-    # Check if PAN already exists (if provided)
-    if shopkeeper.pan:
-        existing = db.query(Shopkeeper).filter(Shopkeeper.pan == shopkeeper.pan).first()
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="PAN already registered"
-            )
+    ).first()
+
+# Unique column -> message, matched against the database's IntegrityError text
+_UNIQUE_FIELDS = (
+    ("email", "Email"),
+    ("contact", "Contact number"),
+    ("pan", "PAN"),
+)
+
+def _conflict_detail(error: IntegrityError, suffix: str, fallback: str) -> str:
+    """Name the unique column an INSERT/UPDATE collided on"""
+    # SQLite: "shopkeepers.email", PostgreSQL: "shopkeepers_email_key" / "Key (email)",
+    # MySQL: "for key 'shopkeepers.email'"
+    message = str(error.orig).lower()
+    for column, label in _UNIQUE_FIELDS:
+        if re.search(rf"(?<![a-z]){column}(?![a-z])", message):
+            return f"{label} {suffix}"
+    return fallback
+
+def create_shopkeeper(
+    db: Session,
+    shopkeeper: ShopkeeperCreate,
+    hashed_password: Optional[str] = None
+) -> Shopkeeper:
+    """Create new shopkeeper (pass `hashed_password` when already hashed off-thread)"""
     
     # Create shopkeeper
-    hashed_password = hash_password(shopkeeper.password)
+    if hashed_password is None:
+        hashed_password = password_pool.hash_password(shopkeeper.password)
     
     db_shopkeeper = Shopkeeper(
         shop_name=shopkeeper.shop_name,
@@ -66,6 +67,7 @@ def create_shopkeeper(db: Session, shopkeeper: ShopkeeperCreate) -> Shopkeeper:
         password=hashed_password
     )
     
+    # Email, contact and PAN uniqueness is enforced by the INSERT itself
     try:
         db.add(db_shopkeeper)
         db.commit()
@@ -75,27 +77,16 @@ def create_shopkeeper(db: Session, shopkeeper: ShopkeeperCreate) -> Shopkeeper:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Registration failed. Please check your details."
+            detail=_conflict_detail(e, "already registered", "Registration failed. Please check your details.")
         )
 
-def authenticate_shopkeeper(db: Session, identifier: str, password: str) -> Optional[Shopkeeper]:
-    """Authenticate shopkeeper with email/contact and password"""
-    shopkeeper = get_shopkeeper_by_identifier(db, identifier)
-    
-    if not shopkeeper:
-        return None
-    
-    if not verify_password(password, shopkeeper.password):
-        return None
-
-    # If the stored hash needs an upgrade (e.g. bcrypt -> argon2), re-hash and update it.
+def _store_upgraded_hash(db: Session, shopkeeper: Shopkeeper, new_hash: str) -> None:
+    """Save a re-hashed password without blocking authentication on failure"""
     try:
-        if pwd_context.needs_update(shopkeeper.password):
-            new_hash = hash_password(password)
-            shopkeeper.password = new_hash
-            db.add(shopkeeper)
-            db.commit()
-            db.refresh(shopkeeper)
+        shopkeeper.password = new_hash
+        db.add(shopkeeper)
+        db.commit()
+        db.refresh(shopkeeper)
     except Exception:
         # If re-hash/update fails, don't block authentication; just rollback and continue
         try:
@@ -103,6 +94,22 @@ def authenticate_shopkeeper(db: Session, identifier: str, password: str) -> Opti
         except Exception:
             pass
 
+async def authenticate_shopkeeper(db: DBRunner, identifier: str, password: str) -> Optional[Shopkeeper]:
+    """Authenticate shopkeeper with email/contact and password"""
+    shopkeeper = await db.run(get_shopkeeper_by_identifier, identifier)
+    
+    if not shopkeeper:
+        return None
+    
+    # Verify in the hashing pool; a new hash comes back if the stored one uses
+    # outdated parameters (e.g. bcrypt -> argon2, or a retuned time cost)
+    valid, new_hash = await password_pool.verify_and_update_async(password, shopkeeper.password)
+    if not valid:
+        return None
+    
+    if new_hash:
+        await db.run(_store_upgraded_hash, shopkeeper, new_hash)
+    
     return shopkeeper
 
 def update_shopkeeper(db: Session, shop_id: str, shopkeeper_update: ShopkeeperUpdate) -> Shopkeeper:
@@ -118,41 +125,45 @@ def update_shopkeeper(db: Session, shop_id: str, shopkeeper_update: ShopkeeperUp
     # Update only provided fields
     update_data = shopkeeper_update.dict(exclude_unset=True)
     
-    # Check for unique constraints if updating email/contact/pan
-    if "email" in update_data and update_data["email"]:
-        existing = get_shopkeeper_by_email(db, update_data["email"])
-        if existing and existing.shop_id != shop_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already in use"
-            )
-    
-    if "contact" in update_data:
-        existing = get_shopkeeper_by_contact(db, update_data["contact"])
-        if existing and existing.shop_id != shop_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Contact number already in use"
-            )
-    
-    if "pan" in update_data and update_data["pan"]:
-        existing = db.query(Shopkeeper).filter(Shopkeeper.pan == update_data["pan"]).first()
-        if existing and existing.shop_id != shop_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="PAN already in use"
-            )
-    
     for key, value in update_data.items():
         setattr(db_shopkeeper, key, value)
     
     try:
         db.commit()
         db.refresh(db_shopkeeper)
+        auth_cache.invalidate_principal(shop_id)
         return db_shopkeeper
-    except IntegrityError:
+    except IntegrityError as e:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Update failed. Please check your details."
-        )
\ No newline at end of file
+            detail=_conflict_detail(e, "already in use", "Update failed. Please check your details.")
+        )
+
+def get_data_versions(db: Session, shop_id: str) -> Tuple[int, int]:
+    """Get (catalog_version, inventory_version) for a shop"""
+    versions = db.query(Shopkeeper.catalog_version, Shopkeeper.inventory_version).filter(
+        Shopkeeper.shop_id == shop_id
+    ).first()
+    return tuple(versions) if versions else (0, 0)
+
+def bump_catalog_version(db: Session, shop_id: str) -> int:
+    """Mark the shop's product catalog as changed and return the new version (committed by the caller)"""
+    statement = (
+        update(Shopkeeper)
+        .where(Shopkeeper.shop_id == shop_id)
+        .values(catalog_version=Shopkeeper.catalog_version + 1)
+    )
+    # The update holds the shop row lock until commit, so versions commit in order
+    if db.get_bind().dialect.update_returning:
+        return db.execute(statement.returning(Shopkeeper.catalog_version)).scalar() or 0
+    db.execute(statement)
+    return db.query(Shopkeeper.catalog_version).filter(Shopkeeper.shop_id == shop_id).scalar() or 0
+
+def bump_inventory_version(db: Session, shop_id: str) -> None:
+    """Mark the shop's stock levels as changed (committed by the caller)"""
+    db.execute(
+        update(Shopkeeper)
+        .where(Shopkeeper.shop_id == shop_id)
+        .values(inventory_version=Shopkeeper.inventory_version + 1)
+    )
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
+from sqlalchemy import and_, func, desc, select
 from app.models.transaction import Transaction, TransactionType
 from app.models.product import Product
 from app.schemas.transaction import TransactionCreate, TransactionUpdate
@@ -7,8 +7,11 @@ from typing import Optional, List, Tuple
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
 from app.crud import inventory as crud_inventory
+from app.crud import reorder as crud_reorder
+from app.crud.pricing import list_price_at
 # Add this import at the top
 from app.crud import reward as crud_reward
+from app.utils.metrics import TRANSACTION_STEP_SECONDS, BULK_SYNC_BATCH_SIZE
 def create_transaction(
     db: Session, 
     transaction: TransactionCreate, 
@@ -55,25 +58,36 @@ def create_transaction(
     
    # Update inventory
     try:
-        crud_inventory.update_inventory_from_transaction(
-            db,
+        with TRANSACTION_STEP_SECONDS.time("inventory_update"):
+            crud_inventory.update_inventory_from_transaction(
+                db,
+                shop_id,
+                transaction.product_id,
+                str(db_transaction.transaction_id),
+                db_transaction.type,
+                transaction.quantity
+            )
+    except Exception as e:
+        print(f"Failed to update inventory: {e}")
+    
+    with TRANSACTION_STEP_SECONDS.time("sales_history"):
+        crud_reorder.record_sale(
             shop_id,
             transaction.product_id,
-            str(db_transaction.transaction_id),
             db_transaction.type,
-            transaction.quantity
+            db_transaction.quantity,
+            db_transaction.date_time
         )
-    except Exception as e:
-        print(f"Failed to update inventory: {e}")
     
     # Award points for transaction
     try:
-        crud_reward.award_transaction_points(
-            db,
-            shop_id,
-            str(db_transaction.transaction_id),
-            db_transaction.type
-        )
+        with TRANSACTION_STEP_SECONDS.time("reward_award"):
+            crud_reward.award_transaction_points(
+                db,
+                shop_id,
+                str(db_transaction.transaction_id),
+                db_transaction.type
+            )
     except Exception as e:
         print(f"Failed to award points: {e}")
     # TODO: Trigger reward calculation here
@@ -89,6 +103,7 @@ def bulk_create_transactions(
 ) -> Tuple[List[Transaction], List[dict]]:
     """Bulk create transactions (for sync from mobile)"""
     
+    BULK_SYNC_BATCH_SIZE.observe(len(transactions), "transactions")
     created_transactions = []
     errors = []
     
@@ -140,6 +155,7 @@ def bulk_create_transactions(
         db.commit()
         for txn in created_transactions:
             db.refresh(txn)
+            crud_reorder.record_sale(shop_id, txn.product_id, txn.type, txn.quantity, txn.date_time)
     
     return created_transactions, errors
 
@@ -156,33 +172,47 @@ def get_transaction_by_id(
         )
     ).first()
 
-def get_transactions_by_shop(
-    db: Session,
+def _transaction_filters(
     shop_id: str,
-    skip: int = 0,
-    limit: int = 100,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     product_id: Optional[str] = None,
     transaction_type: Optional[TransactionType] = None
-) -> Tuple[List[Transaction], int]:
-    """Get transactions with filters and pagination"""
-    
-    query = db.query(Transaction).filter(Transaction.shop_id == shop_id)
+) -> list:
+    """WHERE conditions shared by the ORM and row listings"""
+    conditions = [Transaction.shop_id == shop_id]
     
     # Date range filter
     if start_date:
-        query = query.filter(Transaction.date_time >= start_date)
+        conditions.append(Transaction.date_time >= start_date)
     if end_date:
-        query = query.filter(Transaction.date_time <= end_date)
+        conditions.append(Transaction.date_time <= end_date)
     
     # Product filter
     if product_id:
-        query = query.filter(Transaction.product_id == product_id)
+        conditions.append(Transaction.product_id == product_id)
     
     # Transaction type filter
     if transaction_type:
-        query = query.filter(Transaction.type == transaction_type)
+        conditions.append(Transaction.type == transaction_type)
+    
+    return conditions
+
+def get_transactions_by_shop(
+    db: Session,
+    shop_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    product_id: Optional[str] = None,
+    transaction_type: Optional[TransactionType] = None
+) -> Tuple[List[Transaction], int]:
+    """Get transactions with filters and pagination"""
+    
+    query = db.query(Transaction).filter(
+        *_transaction_filters(shop_id, start_date, end_date, product_id, transaction_type)
+    )
     
     # Get total count
     total = query.count()
@@ -192,6 +222,50 @@ def get_transactions_by_shop(
     
     return transactions, total
 
+# TransactionResponse fields, in order
+TRANSACTION_FIELDS = (
+    "transaction_id", "shop_id", "product_id", "date_time", "quantity",
+    "price", "total", "type", "synced", "device_id", "version"
+)
+
+def transaction_to_dict(transaction: Transaction, product_name: Optional[str] = None) -> dict:
+    """Plain TransactionResponse-shaped dict from a loaded transaction"""
+    row = {field: getattr(transaction, field) for field in TRANSACTION_FIELDS}
+    row["product_name"] = product_name
+    return row
+
+def get_transaction_rows(
+    db: Session,
+    shop_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    product_id: Optional[str] = None,
+    transaction_type: Optional[TransactionType] = None
+) -> Tuple[List[dict], int]:
+    """Same page as get_transactions_by_shop as plain dicts from a Core query, with product names"""
+    
+    conditions = _transaction_filters(shop_id, start_date, end_date, product_id, transaction_type)
+    
+    total = db.execute(
+        select(func.count()).select_from(Transaction).where(*conditions)
+    ).scalar()
+    
+    rows = db.execute(
+        select(
+            *(getattr(Transaction, field) for field in TRANSACTION_FIELDS),
+            Product.product_name
+        )
+        .outerjoin(Product, Product.product_id == Transaction.product_id)
+        .where(*conditions)
+        .order_by(desc(Transaction.date_time))
+        .offset(skip)
+        .limit(limit)
+    ).mappings().all()
+    
+    return [dict(row) for row in rows], total
+
 def update_transaction(
     db: Session,
     transaction_id: str,
@@ -240,6 +314,8 @@ def update_transaction(
     
     db.commit()
     db.refresh(db_transaction)
+    
+    crud_reorder.invalidate_sales_cache(shop_id)
     return db_transaction
 
 def delete_transaction(
@@ -277,6 +353,8 @@ def delete_transaction(
     
     db.delete(db_transaction)
     db.commit()
+    
+    crud_reorder.invalidate_sales_cache(shop_id)
     return True
 
 def get_transaction_statistics(
@@ -287,7 +365,17 @@ def get_transaction_statistics(
 ) -> dict:
     """Get transaction statistics for a shop"""
     
-    query = db.query(Transaction).filter(Transaction.shop_id == shop_id)
+    # One query: product names and the list price in effect at each sale are joined in bulk
+    query = db.query(
+        Transaction.product_id,
+        Transaction.quantity,
+        Transaction.total,
+        Transaction.type,
+        Product.product_name,
+        list_price_at(Transaction.product_id, Transaction.date_time).label("list_price")
+    ).outerjoin(
+        Product, Product.product_id == Transaction.product_id
+    ).filter(Transaction.shop_id == shop_id)
     
     # Apply date filters
     if start_date:
@@ -305,6 +393,11 @@ def get_transaction_statistics(
     total_returns = sum(t.total for t in transactions if t.type == TransactionType.RETURN)
     net_revenue = total_sales - total_returns
     
+    # Sales measured against the catalogue price at sale time
+    priced_sales = [t for t in transactions if t.type == TransactionType.SALE and t.list_price is not None]
+    list_price_sales = sum(t.quantity * t.list_price for t in priced_sales)
+    discount_total = list_price_sales - sum(t.total for t in priced_sales)
+    
     # Count by type
     transaction_count_by_type = {
         "sale": sum(1 for t in transactions if t.type == TransactionType.SALE),
@@ -315,16 +408,19 @@ def get_transaction_statistics(
     # Top products (only sales)
     product_stats = {}
     for t in transactions:
-        if t.type == TransactionType.SALE and t.product:
+        if t.type == TransactionType.SALE and t.product_name:
             if t.product_id not in product_stats:
                 product_stats[t.product_id] = {
                     "product_id": str(t.product_id),
-                    "product_name": t.product.product_name,
+                    "product_name": t.product_name,
                     "quantity": 0,
-                    "revenue": 0.0
+                    "revenue": 0.0,
+                    "list_revenue": 0.0
                 }
             product_stats[t.product_id]["quantity"] += t.quantity
             product_stats[t.product_id]["revenue"] += t.total
+            if t.list_price is not None:
+                product_stats[t.product_id]["list_revenue"] += t.quantity * t.list_price
     
     # Sort by revenue and get top 10
     top_products = sorted(
@@ -339,6 +435,8 @@ def get_transaction_statistics(
         "total_purchases": round(total_purchases, 2),
         "total_returns": round(total_returns, 2),
         "net_revenue": round(net_revenue, 2),
+        "list_price_sales": round(list_price_sales, 2),
+        "discount_total": round(discount_total, 2),
         "transaction_count_by_type": transaction_count_by_type,
         "top_products": top_products
     }
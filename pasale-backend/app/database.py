@@ -1,18 +1,199 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, raiseload
+from sqlalchemy.pool import Pool, QueuePool, AsyncAdaptedQueuePool, NullPool
+from starlette.concurrency import run_in_threadpool
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Type, TypeVar
 from app.config import settings
+from app.utils.pool_metrics import instrumented_pool_class
+from app.utils.sql_log import install_sql_instrumentation
+from app.utils import metrics
+import time
+
+T = TypeVar("T")
+
+def _pool_options(url: str, base: Type[Pool], name: str) -> dict:
+    """Sized, instrumented queue pool settings for an engine URL"""
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        # In-memory SQLite must keep its single shared connection
+        return {}
+    if url.startswith("sqlite+aiosqlite"):
+        # Each aiosqlite connection owns a thread bound to one event loop; don't pool them
+        return {"poolclass": instrumented_pool_class(NullPool, name)}
+    return {
+        "poolclass": instrumented_pool_class(base, name),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE
+    }
 
 # Create engine
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,  # Verify connections before using
-    echo=True if settings.ENVIRONMENT == "development" else False
+    echo=settings.SQL_ECHO,
+    **_pool_options(settings.DATABASE_URL, QueuePool, "sync")
 )
+install_sql_instrumentation(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Strict mode: relationships must be loaded with an explicit per-query option
+# (joinedload/selectinload); anything else raises instead of issuing a query
+if settings.STRICT_ORM_LOADING or settings.ENVIRONMENT == "test":
+    @event.listens_for(SessionLocal, "do_orm_execute")
+    def _raise_on_unplanned_loads(orm_execute_state):
+        if (
+            orm_execute_state.is_select
+            and not orm_execute_state.is_column_load
+            and not orm_execute_state.is_relationship_load
+        ):
+            orm_execute_state.statement = orm_execute_state.statement.options(raiseload("*"))
+
+def _async_database_url(url: str, override: str = "ASYNC_DATABASE_URL") -> str:
+    """Swap a sync driver for its asyncio counterpart"""
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    drivers = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+    if dialect not in drivers:
+        raise ValueError(f"No async driver configured for {dialect!r}; set {override}")
+    return f"{dialect}+{drivers[dialect]}://{rest}"
+
+# Async engine, only when DB_ASYNC is on (the driver is imported here)
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    
+    async_url = settings.ASYNC_DATABASE_URL or _async_database_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(
+        async_url,
+        pool_pre_ping=True,
+        echo=settings.SQL_ECHO,
+        **_pool_options(async_url, AsyncAdaptedQueuePool, "async")
+    )
+    install_sql_instrumentation(async_engine.sync_engine)
+    # Same Session subclass as SessionLocal so strict loading applies to both.
+    # Objects are serialized after the route returns, outside the greenlet, so
+    # they must not expire on commit.
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        sync_session_class=SessionLocal.class_,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+def _read_only_options(url: str) -> dict:
+    """Execution options for read sessions: autocommit (no BEGIN/COMMIT round trips), read-only where supported"""
+    options = {"isolation_level": "AUTOCOMMIT"}
+    if url.startswith("postgresql"):
+        options["postgresql_readonly"] = True
+    return options
+
+# Read engines: the replica when READ_REPLICA_URL is set, always with a
+# read-only view of the primary to fall back to (shares the primary's pool)
+replica_engine = None
+if settings.READ_REPLICA_URL:
+    replica_engine = create_engine(
+        settings.READ_REPLICA_URL,
+        pool_pre_ping=True,
+        echo=settings.SQL_ECHO,
+        **_pool_options(settings.READ_REPLICA_URL, QueuePool, "replica")
+    ).execution_options(**_read_only_options(settings.READ_REPLICA_URL))
+    install_sql_instrumentation(replica_engine)
+primary_read_engine = engine.execution_options(**_read_only_options(settings.DATABASE_URL))
+
+ReplicaSessionLocal = sessionmaker(class_=SessionLocal.class_, autoflush=False, bind=replica_engine)
+PrimaryReadSessionLocal = sessionmaker(class_=SessionLocal.class_, autoflush=False, bind=primary_read_engine)
+
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+AsyncPrimaryReadSessionLocal = None
+if settings.DB_ASYNC:
+    async_primary_read_engine = async_engine.execution_options(**_read_only_options(async_url))
+    AsyncPrimaryReadSessionLocal = async_sessionmaker(
+        async_primary_read_engine,
+        sync_session_class=SessionLocal.class_,
+        autoflush=False,
+        expire_on_commit=False
+    )
+    if settings.READ_REPLICA_URL:
+        async_replica_url = (
+            settings.ASYNC_READ_REPLICA_URL
+            or _async_database_url(settings.READ_REPLICA_URL, "ASYNC_READ_REPLICA_URL")
+        )
+        async_replica_engine = create_async_engine(
+            async_replica_url,
+            pool_pre_ping=True,
+            echo=settings.SQL_ECHO,
+            **_pool_options(async_replica_url, AsyncAdaptedQueuePool, "async_replica")
+        ).execution_options(**_read_only_options(async_replica_url))
+        install_sql_instrumentation(async_replica_engine.sync_engine)
+        AsyncReplicaSessionLocal = async_sessionmaker(
+            async_replica_engine,
+            sync_session_class=SessionLocal.class_,
+            autoflush=False,
+            expire_on_commit=False
+        )
+
+# Last lag check; re-measured at most every REPLICA_LAG_CHECK_INTERVAL_SECONDS
+_replica_status = {"checked_at": float("-inf"), "lag_seconds": None, "usable": False}
+
+def _measure_replica_lag(conn: Connection) -> float:
+    """Seconds the replica is behind (0 when caught up or not measurable)"""
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    # An idle primary leaves the last replay timestamp old; only count time
+    # while WAL has been received but not yet replayed
+    return float(conn.execute(text(
+        "SELECT CASE WHEN NOT pg_is_in_recovery() "
+        "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    )).scalar())
+
+def _check_replica_sync() -> float:
+    with replica_engine.connect() as conn:
+        return _measure_replica_lag(conn)
+
+async def replica_usable() -> bool:
+    """Whether reads may go to the replica: configured, reachable and within REPLICA_MAX_LAG_SECONDS"""
+    if replica_engine is None:
+        return False
+    
+    now = time.monotonic()
+    if now - _replica_status["checked_at"] < settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS:
+        return _replica_status["usable"]
+    # Claim the check so concurrent requests keep using the previous answer
+    _replica_status["checked_at"] = now
+    
+    try:
+        if async_replica_engine is not None:
+            async with async_replica_engine.connect() as conn:
+                lag = await conn.run_sync(_measure_replica_lag)
+        else:
+            lag = await run_in_threadpool(_check_replica_sync)
+    except Exception:
+        lag = None  # Unreachable: read from the primary until the next check
+    
+    _replica_status["lag_seconds"] = lag
+    _replica_status["usable"] = lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+    return _replica_status["usable"]
+
+def get_replica_lag() -> Optional[float]:
+    """Lag from the last replica check, None if unknown or unreachable"""
+    return _replica_status["lag_seconds"]
+
+def _replica_samples():
+    if replica_engine is not None:
+        yield "pasale_db_replica_lag_seconds", "gauge", "Replica lag at the last check", {}, _replica_status["lag_seconds"]
+        yield "pasale_db_replica_usable", "gauge", "1 while reads are routed to the replica", {}, int(_replica_status["usable"])
+
+metrics.register_collector(_replica_samples)
+
 # Base class for models
 Base = declarative_base()
 
@@ -22,4 +203,111 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+class DBRunner:
+    """Runs crud functions (which take a sync Session first) from async routes"""
+    
+    mode = "sync"
+    
+    def __init__(self, session: Session):
+        self.session = session
+    
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        # Blocking driver: the call holds a threadpool worker
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+    
+    async def close(self) -> None:
+        await run_in_threadpool(self.session.close)
+
+
+class AsyncDBRunner(DBRunner):
+    """DBRunner on an AsyncSession; crud code runs in a greenlet and awaits the driver's I/O"""
+    
+    mode = "async"
+    
+    def __init__(self, session):
+        self.async_session = session
+        self.session = session.sync_session
+    
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await self.async_session.run_sync(fn, *args, **kwargs)
+    
+    async def close(self) -> None:
+        await self.async_session.close()
+
+
+# Read-only session for sync code (scripts, reports); always the primary since
+# the lag check is async
+def get_read_db():
+    db = PrimaryReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Dependency for async routes; DB_ASYNC picks the engine so both modes can be
+# benchmarked under the same load
+async def get_db_runner():
+    if AsyncSessionLocal is not None:
+        runner = AsyncDBRunner(AsyncSessionLocal())
+    else:
+        runner = DBRunner(SessionLocal())
+    try:
+        yield runner
+    finally:
+        await runner.close()
+
+
+# Dependency for heavy read-only routes: autocommit, read-only sessions on the
+# replica while it is fresh, on the primary otherwise
+async def get_read_db_runner():
+    use_replica = await replica_usable()
+    metrics.DB_READ_ROUTING.inc(1, "replica" if use_replica else "primary")
+    
+    if AsyncPrimaryReadSessionLocal is not None:
+        factory = AsyncReplicaSessionLocal if use_replica else AsyncPrimaryReadSessionLocal
+        runner = AsyncDBRunner(factory())
+    else:
+        factory = ReplicaSessionLocal if use_replica else PrimaryReadSessionLocal
+        runner = DBRunner(factory())
+    try:
+        yield runner
+    finally:
+        await runner.close()
+
+
+def _reads_replica(db: Session) -> bool:
+    pool = db.get_bind().pool
+    if replica_engine is not None and pool is replica_engine.pool:
+        return True
+    return async_replica_engine is not None and pool is async_replica_engine.sync_engine.pool
+
+
+@contextmanager
+def primary_session(db: Session) -> Iterator[Session]:
+    """`db`, or a read-only primary session if `db` reads the replica
+    
+    For building process-wide caches: incremental updates from writes never
+    repair rows a lagging replica hadn't seen yet.
+    """
+    if not _reads_replica(db):
+        yield db
+        return
+    
+    if db.get_bind().dialect.is_async:
+        # Called from inside AsyncSession.run_sync, so this session's sync
+        # calls can await its driver through the same greenlet
+        async_session = AsyncPrimaryReadSessionLocal()
+        try:
+            yield async_session.sync_session
+        finally:
+            async_session.sync_session.close()
+    else:
+        session = PrimaryReadSessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
@@ -1,12 +1,21 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.api.v1 import api_router
+from app.utils import password_pool, warmup
+from app.database import async_engine
+from app.utils.request_context import RequestContextMiddleware
+from app.utils.compression import CompressionMiddleware
+from app.utils import metrics
+from app.utils.fast_json import FastJSONResponse
+from app.utils.dependencies import require_admin_key
+import anyio.to_thread
 
 app = FastAPI(
     title="Pasale API",
     description="Inventory Management System for Nepali Retail Shops",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware (adjust origins for production)
@@ -18,17 +27,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/br request bodies in, compressed responses out (inside the metrics
+# middleware so latency includes compression)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    max_request_bytes=settings.MAX_DECOMPRESSED_REQUEST_BYTES
+)
+
+# Tags logs and metrics with the endpoint and shop behind them
+app.add_middleware(RequestContextMiddleware)
+
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
+@app.on_event("startup")
+async def size_threadpool():
+    # Sync routes, dependencies and DBRunner calls share this limiter
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+@app.on_event("startup")
+async def warm_up():
+    # Otherwise the hashing pool, DB connections and crypto imports come up on first use
+    if settings.STARTUP_WARMUP:
+        await warmup.warm_up()
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    password_pool.shutdown()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
+
 @app.get("/")
 def root():
     return {
         "message": "Welcome to Pasale API",
         "environment": settings.ENVIRONMENT,
+        "database": "async" if settings.DB_ASYNC else "sync",
         "docs": "/docs"
     }
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+# Scrapers send X-Admin-Key: per-endpoint and per-shop series are not public
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_admin_key)])
+async def prometheus_metrics():
+    # Async: the threadpool gauges are read from the event loop
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
\ No newline at end of file
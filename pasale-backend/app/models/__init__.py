@@ -1,5 +1,5 @@
 from app.models.shopkeeper import Shopkeeper
-from app.models.product import Product
+from app.models.product import Product, ProductPrice
 from app.models.transaction import Transaction
 from app.models.reward import Reward
 from app.models.sync_log import SyncLog
@@ -8,6 +8,7 @@ from app.models.category import Category
 __all__ = [
     "Shopkeeper",
     "Product", 
+    "ProductPrice",
     "Transaction",
     "Reward",
     "SyncLog",
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, String, Integer, TIMESTAMP, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -12,7 +12,12 @@ class Category(Base):
     category_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     shop_id = Column(String(36), ForeignKey("shopkeepers.shop_id", ondelete="CASCADE"), nullable=False)
     category_name = Column(String(100), nullable=False)
+    product_count = Column(Integer, default=0, server_default='0', nullable=False)  # Active products in this category
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
 
     # Relationships
-    shopkeeper = relationship("Shopkeeper", back_populates="categories")
\ No newline at end of file
+    shopkeeper = relationship("Shopkeeper", back_populates="categories", lazy="raise")
+
+    __table_args__ = (
+        UniqueConstraint('shop_id', 'category_name', name='uq_categories_shop_name'),
+    )
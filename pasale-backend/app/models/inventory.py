@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, Float, TIMESTAMP, ForeignKey, Enum, CheckConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Float, TIMESTAMP, Date, ForeignKey, Enum, CheckConstraint, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, backref
 from sqlalchemy.sql import func
 import enum
 import uuid
@@ -27,8 +27,9 @@ class Inventory(Base):
     last_updated = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    shopkeeper = relationship("Shopkeeper", backref="inventory")
-    product = relationship("Product", backref="inventory")
+    # Never loaded implicitly; child rows go with the database cascade
+    shopkeeper = relationship("Shopkeeper", lazy="raise", backref=backref("inventory", lazy="raise", passive_deletes=True))
+    product = relationship("Product", lazy="raise", backref=backref("inventory", lazy="raise", passive_deletes=True))
     
     # Ensure unique inventory per product per shop
     __table_args__ = (
@@ -50,6 +51,26 @@ class InventoryMovement(Base):
     created_by = Column(String, nullable=True)  # For manual adjustments, track who made it
     
     # Relationships
-    shopkeeper = relationship("Shopkeeper", backref="inventory_movements")
-    product = relationship("Product", backref="inventory_movements")
-    transaction = relationship("Transaction", backref="inventory_movements")
\ No newline at end of file
+    shopkeeper = relationship("Shopkeeper", lazy="raise", backref=backref("inventory_movements", lazy="raise", passive_deletes=True))
+    product = relationship("Product", lazy="raise", backref=backref("inventory_movements", lazy="raise", passive_deletes=True))
+    transaction = relationship("Transaction", lazy="raise", backref=backref("inventory_movements", lazy="raise", passive_deletes=True))
+    
+    # Point-in-time lookups seek to the last movement before a timestamp
+    __table_args__ = (
+        Index('ix_inventory_movements_shop_product_created', 'shop_id', 'product_id', 'created_at'),
+    )
+
+class InventorySnapshot(Base):
+    """End-of-day stock checkpoint used to answer shop-wide as-of queries"""
+    __tablename__ = "inventory_snapshots"
+    
+    snapshot_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    shop_id = Column(String(36), ForeignKey("shopkeepers.shop_id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(String(36), ForeignKey("products.product_id", ondelete="CASCADE"), nullable=False)
+    snapshot_date = Column(Date, nullable=False)  # Stock level at the end of this day
+    quantity = Column(Integer, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint('shop_id', 'snapshot_date', 'product_id', name='uq_inventory_snapshot_shop_date_product'),
+    )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Integer, TIMESTAMP, ForeignKey, Boolean
+from sqlalchemy import Column, String, Float, Integer, TIMESTAMP, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -16,11 +16,39 @@ class Product(Base):
     category = Column(String(100), nullable=True)
     price = Column(Float, nullable=False)
     unit = Column(String(50), nullable=True)  # "piece", "kg", "liter", etc.
+    barcode = Column(String(64), nullable=True)  # Barcode or shop SKU scanned at the counter
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
     version = Column(Integer, default=1)  # For conflict resolution
+    # Shop catalog_version of the last write; orders the delta sync feed
+    change_seq = Column(Integer, default=0, server_default='0', nullable=False)
 
     # Relationships
-    shopkeeper = relationship("Shopkeeper", back_populates="products")
-    transactions = relationship("Transaction", back_populates="product")
\ No newline at end of file
+    shopkeeper = relationship("Shopkeeper", back_populates="products", lazy="raise")
+    # Transactions keep their rows with product_id SET NULL by the database
+    transactions = relationship("Transaction", back_populates="product", lazy="raise", passive_deletes=True)
+    
+    # Delta sync scans a shop's products in change_seq order
+    __table_args__ = (
+        Index('ix_products_shop_change_seq', 'shop_id', 'change_seq', 'product_id'),
+        Index('uq_products_shop_barcode', 'shop_id', 'barcode', unique=True),
+    )
+
+
+class ProductPrice(Base):
+    __tablename__ = "product_prices"
+
+    # One row per list price a product has had, effective until the next row
+    price_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    shop_id = Column(String(36), ForeignKey("shopkeepers.shop_id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(String(36), ForeignKey("products.product_id", ondelete="CASCADE"), nullable=False)
+    price = Column(Float, nullable=False)
+    effective_from = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    # Shop catalog_version of the write that set the price; orders prices sharing an effective_from
+    change_seq = Column(Integer, default=0, server_default='0', nullable=False)
+
+    # "Price of P at T" seeks to the last row for P at or before T
+    __table_args__ = (
+        Index('ix_product_prices_product_effective', 'product_id', 'effective_from'),
+    )
@@ -37,5 +37,5 @@ class Reward(Base):
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     
     # Relationships
-    shopkeeper = relationship("Shopkeeper", back_populates="rewards")
-    transaction = relationship("Transaction", back_populates="rewards")
\ No newline at end of file
+    shopkeeper = relationship("Shopkeeper", back_populates="rewards", lazy="raise")
+    transaction = relationship("Transaction", back_populates="rewards", lazy="raise")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP
+from sqlalchemy import Column, String, Integer, TIMESTAMP, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -12,16 +12,23 @@ class Shopkeeper(Base):
     shop_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     shop_name = Column(String(255), nullable=False)
     shop_address = Column(String(255))
-    contact = Column(String(50), nullable=False)
+    contact = Column(String(50), nullable=False)  # Login identifier, unique
     email = Column(String(320), unique=True, nullable=True)
     pan = Column(String(50), unique=True, nullable=True)
     password = Column(String(128), nullable=False)  # Store hashed
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     last_sync = Column(TIMESTAMP(timezone=True), nullable=True)
+    catalog_version = Column(Integer, default=1, server_default='1', nullable=False)  # Bumped on product writes
+    inventory_version = Column(Integer, default=1, server_default='1', nullable=False)  # Bumped on stock writes
     
     # Relationships
-    products = relationship("Product", back_populates="shopkeeper", cascade="all, delete-orphan")
-    transactions = relationship("Transaction", back_populates="shopkeeper", cascade="all, delete-orphan")
-    rewards = relationship("Reward", back_populates="shopkeeper", cascade="all, delete-orphan")
-    sync_logs = relationship("SyncLog", back_populates="shopkeeper", cascade="all, delete-orphan")
-    categories = relationship("Category", back_populates="shopkeeper", cascade="all, delete-orphan")
\ No newline at end of file
+    # Never loaded implicitly; the database cascades deletes (ondelete="CASCADE")
+    products = relationship("Product", back_populates="shopkeeper", cascade="all, delete-orphan", lazy="raise", passive_deletes=True)
+    transactions = relationship("Transaction", back_populates="shopkeeper", cascade="all, delete-orphan", lazy="raise", passive_deletes=True)
+    rewards = relationship("Reward", back_populates="shopkeeper", cascade="all, delete-orphan", lazy="raise", passive_deletes=True)
+    sync_logs = relationship("SyncLog", back_populates="shopkeeper", cascade="all, delete-orphan", lazy="raise", passive_deletes=True)
+    categories = relationship("Category", back_populates="shopkeeper", cascade="all, delete-orphan", lazy="raise", passive_deletes=True)
+    
+    __table_args__ = (
+        UniqueConstraint('contact', name='uq_shopkeepers_contact'),
+    )
@@ -24,4 +24,4 @@ class SyncLog(Base):
     status = Column(Enum(SyncStatus), nullable=False)
 
     # Relationships
-    shopkeeper = relationship("Shopkeeper", back_populates="sync_logs")
\ No newline at end of file
+    shopkeeper = relationship("Shopkeeper", back_populates="sync_logs", lazy="raise")
\ No newline at end of file
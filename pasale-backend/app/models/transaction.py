@@ -29,6 +29,6 @@ class Transaction(Base):
     version = Column(Integer, default=1)
 
     # Relationships
-    shopkeeper = relationship("Shopkeeper", back_populates="transactions")
-    product = relationship("Product", back_populates="transactions")
-    rewards = relationship("Reward", back_populates="transaction")
\ No newline at end of file
+    shopkeeper = relationship("Shopkeeper", back_populates="transactions", lazy="raise")
+    product = relationship("Product", back_populates="transactions", lazy="raise")
+    rewards = relationship("Reward", back_populates="transaction", lazy="raise", passive_deletes=True)
\ No newline at end of file
@@ -9,7 +9,14 @@ from app.schemas.product import (
     ProductCreate,
     ProductUpdate,
     ProductResponse,
-    ProductListResponse
+    ProductListResponse,
+    ProductSuggestion,
+    ProductTombstone,
+    ProductChangesResponse,
+    CategoryResponse,
+    ProductImportError,
+    ProductImportResponse,
+    ProductPriceResponse
 )
 from app.schemas.transaction import (
     TransactionCreate,
@@ -37,7 +44,21 @@ from app.schemas.inventory import (
     ReorderLevelUpdate,
     InventoryMovementResponse,
     InventoryMovementListResponse,
-    StockAlert
+    StockAlert,
+    StockAsOfResponse,
+    ShopStockAsOfResponse,
+    InventorySnapshotBuildResponse,
+    StocktakeCount,
+    StocktakeRequest,
+    StocktakeResponse,
+    ReorderSuggestion,
+    ReorderTuneResponse,
+    InventoryReconciliationResponse
+)
+from app.schemas.admin import (
+    DatabasePoolStats,
+    ThreadpoolStats,
+    DatabasePoolResponse
 )
 
 __all__ = [
@@ -50,6 +71,13 @@ __all__ = [
     "ProductUpdate",
     "ProductResponse",
     "ProductListResponse",
+    "ProductSuggestion",
+    "ProductTombstone",
+    "ProductChangesResponse",
+    "CategoryResponse",
+    "ProductImportError",
+    "ProductImportResponse",
+    "ProductPriceResponse",
     "TransactionCreate",
     "TransactionUpdate",
     "TransactionResponse",
@@ -68,5 +96,17 @@ __all__ = [
     "ReorderLevelUpdate",
     "InventoryMovementResponse",
     "InventoryMovementListResponse",
-    "StockAlert"
+    "StockAlert",
+    "StockAsOfResponse",
+    "ShopStockAsOfResponse",
+    "InventorySnapshotBuildResponse",
+    "StocktakeCount",
+    "StocktakeRequest",
+    "StocktakeResponse",
+    "ReorderSuggestion",
+    "ReorderTuneResponse",
+    "InventoryReconciliationResponse",
+    "DatabasePoolStats",
+    "ThreadpoolStats",
+    "DatabasePoolResponse"
 ]
\ No newline at end of file
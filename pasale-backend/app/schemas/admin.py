@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from typing import Optional
+
+# Connection pool gauges and counters for one engine
+class DatabasePoolStats(BaseModel):
+    name: str
+    pool_class: str
+    size: Optional[int] = None
+    checkedin: Optional[int] = None
+    checkedout: Optional[int] = None
+    overflow: Optional[int] = None
+    checkouts: int
+    checkins: int
+    connects: int
+    invalidations: int
+    pre_ping_failures: int
+    timeouts: int
+    wait_ms_total: float
+    wait_ms_avg: float
+    wait_ms_max: float
+
+# Worker threads shared by sync routes and threadpool DB calls
+class ThreadpoolStats(BaseModel):
+    size: int
+    busy: int
+
+# For pool sizing
+class DatabasePoolResponse(BaseModel):
+    database_mode: str
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    threadpool: ThreadpoolStats
+    engines: list[DatabasePoolStats]
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, date
 from app.models.inventory import MovementType
 
 # Base inventory schema
@@ -75,4 +75,95 @@ class StockAlert(BaseModel):
     current_quantity: int
     reorder_level: int
     stock_status: str  # "low_stock", "out_of_stock"
-    suggested_order_quantity: int
\ No newline at end of file
+    suggested_order_quantity: int
+
+# Point-in-time stock for a single product
+class StockAsOfResponse(BaseModel):
+    product_id: str
+    product_name: Optional[str] = None
+    as_of: datetime
+    quantity: int
+    last_movement_at: Optional[datetime] = None
+
+# Point-in-time stock line for shop-wide valuation
+class StockAsOfItem(BaseModel):
+    product_id: str
+    product_name: Optional[str] = None
+    quantity: int
+    price: float
+    stock_value: float
+
+# Point-in-time stock for the whole shop
+class ShopStockAsOfResponse(BaseModel):
+    as_of: datetime
+    checkpoint_date: Optional[date] = None  # Daily checkpoint the answer was built from
+    total_products: int
+    total_stock_value: float
+    items: list[StockAsOfItem]
+
+# Result of building daily stock checkpoints
+class InventorySnapshotBuildResponse(BaseModel):
+    days_written: int
+    rows_written: int
+    last_snapshot_date: Optional[date] = None
+
+# Counted quantity for one product in a stocktake
+class StocktakeCount(BaseModel):
+    product_id: str
+    counted_quantity: int = Field(..., ge=0)
+
+# Full physical count
+class StocktakeRequest(BaseModel):
+    counts: list[StocktakeCount] = Field(..., min_length=1)
+    notes: Optional[str] = None
+
+# Variance line in the stocktake report
+class StocktakeVarianceItem(BaseModel):
+    product_id: str
+    product_name: str
+    expected_quantity: int
+    counted_quantity: int
+    variance: int  # counted - expected
+    variance_value: float  # variance × price
+
+# Stocktake variance report
+class StocktakeResponse(BaseModel):
+    products_counted: int
+    products_adjusted: int
+    total_variance_units: int
+    total_variance_value: float
+    items: list[StocktakeVarianceItem]
+    errors: list[dict] = []
+
+# Velocity-based reorder suggestion
+class ReorderSuggestion(BaseModel):
+    product_id: str
+    product_name: str
+    current_quantity: int
+    reorder_level: Optional[int] = None
+    avg_daily_sales: float  # Moving average over the velocity window
+    days_of_cover: Optional[float] = None  # None when the product has no sales
+    suggested_reorder_level: int
+    suggested_order_quantity: int
+
+# Result of auto-tuning reorder levels
+class ReorderTuneResponse(BaseModel):
+    updated_count: int
+
+# Stock drift for one product
+class InventoryDriftItem(BaseModel):
+    product_id: str
+    product_name: Optional[str] = None
+    current_quantity: int  # Inventory.current_quantity
+    movement_quantity: int  # Sum of the movement log
+    transaction_quantity: Optional[int] = None  # Rebuilt from transactions, if requested
+    expected_quantity: int
+    drift: int  # current - expected
+
+# Reconciliation report for a shop
+class InventoryReconciliationResponse(BaseModel):
+    shop_id: str
+    products_checked: int
+    products_drifted: int
+    repaired: bool
+    items: list[InventoryDriftItem]
@@ -22,6 +22,7 @@ class ProductBase(BaseModel):
     category: Optional[str] = None
     price: float = Field(..., gt=0)  # Must be greater than 0
     unit: Optional[str] = Field(default="piece", max_length=50)  # piece, kg, liter, packet, etc.
+    barcode: Optional[str] = Field(None, max_length=64)  # Barcode or SKU, unique per shop
     
     @validator('price')
     def validate_price(cls, v):
@@ -29,6 +30,13 @@ class ProductBase(BaseModel):
             raise ValueError('Price must be greater than 0')
         # Round to 2 decimal places
         return round(v, 2)
+    
+    @validator('barcode')
+    def validate_barcode(cls, v):
+        # Blank codes mean "no barcode" so they don't collide on the unique index
+        if v is not None:
+            v = v.strip()
+        return v or None
 
 # For creating product
 class ProductCreate(ProductBase):
@@ -41,6 +49,7 @@ class ProductUpdate(BaseModel):
     category: Optional[str] = None
     price: Optional[float] = Field(None, gt=0)
     unit: Optional[str] = Field(None, max_length=50)
+    barcode: Optional[str] = Field(None, max_length=64)
     
     @validator('price')
     def validate_price(cls, v):
@@ -49,6 +58,12 @@ class ProductUpdate(BaseModel):
                 raise ValueError('Price must be greater than 0')
             return round(v, 2)
         return v
+    
+    @validator('barcode')
+    def validate_barcode(cls, v):
+        if v is not None:
+            v = v.strip()
+        return v or None
 
 # For response
 class ProductResponse(ProductBase):
@@ -72,4 +87,55 @@ class ProductListResponse(BaseModel):
     page_size: int
     products: list[ProductResponse]
 
-    
\ No newline at end of file
+# For search box autocomplete
+class ProductSuggestion(BaseModel):
+    product_id: str
+    product_name: str
+    category: Optional[str] = None
+    price: float
+    unit: Optional[str] = None
+    barcode: Optional[str] = None
+
+# Tombstone for a soft-deleted product
+class ProductTombstone(BaseModel):
+    product_id: str
+    updated_at: datetime
+    version: int
+
+# For delta catalog sync
+class ProductChangesResponse(BaseModel):
+    changed: list[ProductResponse]  # Created, updated or restored
+    deleted: list[ProductTombstone]
+    watermark: Optional[str] = None  # Pass as `since` on the next call
+    has_more: bool
+
+# For category list with active product counts
+class CategoryResponse(BaseModel):
+    category_id: str
+    category_name: str
+    product_count: int
+    
+    class Config:
+        from_attributes = True
+
+# For bulk CSV/XLSX import
+class ProductImportError(BaseModel):
+    row: int  # Line/row number in the uploaded file (header is row 1)
+    error: str
+
+class ProductImportResponse(BaseModel):
+    total_rows: int
+    imported: int
+    failed: int
+    errors: list[ProductImportError]  # Capped; `failed` has the full count
+    errors_truncated: bool = False
+
+# For effective-dated price history
+class ProductPriceResponse(BaseModel):
+    price_id: str
+    product_id: str
+    price: float
+    effective_from: datetime
+    
+    class Config:
+        from_attributes = True
@@ -98,8 +98,10 @@ class TransactionStats(BaseModel):
     total_purchases: float
     total_returns: float
     net_revenue: float  # sales - returns
+    list_price_sales: float = 0.0  # Sales valued at the list price in effect at sale time
+    discount_total: float = 0.0  # list_price_sales - amount charged, for those sales
     transaction_count_by_type: dict[str, int]
-    top_products: list[dict]  # [{product_name, quantity, revenue}]
+    top_products: list[dict]  # [{product_name, quantity, revenue, list_revenue}]
 
 # Date range filter
 class DateRangeFilter(BaseModel):
@@ -0,0 +1,104 @@
+from sqlalchemy.orm import Session
+from app.models.shopkeeper import Shopkeeper
+from app.schemas.shopkeeper import ShopkeeperResponse
+from app.config import settings
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import threading
+import time
+
+
+class TTLCache:
+    """Small thread-safe LRU map whose entries expire individually"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_tokens = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES)
+_principals = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES)
+
+
+def _token_key(token: str) -> str:
+    # Never keep raw bearer tokens in memory longer than the request
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_token_payload(token: str) -> Optional[dict]:
+    """Get a previously verified token's claims"""
+    return _tokens.get(_token_key(token))
+
+
+def cache_token_payload(token: str, payload: dict) -> None:
+    """Remember verified claims, never past the token's own expiry"""
+    ttl = settings.AUTH_TOKEN_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    _tokens.set(_token_key(token), payload, ttl)
+
+
+def get_cached_principal(shop_id: str) -> Optional[ShopkeeperResponse]:
+    """Get a shopkeeper's profile only if it is cached"""
+    return _principals.get(shop_id)
+
+
+def load_principal(db: Session, shop_id: str) -> Optional[ShopkeeperResponse]:
+    """Get a shopkeeper's profile, from cache or one column query (no ORM entity)"""
+    principal = _principals.get(shop_id)
+    if principal is not None:
+        return principal
+
+    row = db.query(
+        Shopkeeper.shop_id,
+        Shopkeeper.shop_name,
+        Shopkeeper.shop_address,
+        Shopkeeper.contact,
+        Shopkeeper.email,
+        Shopkeeper.pan,
+        Shopkeeper.created_at,
+        Shopkeeper.last_sync
+    ).filter(Shopkeeper.shop_id == shop_id).first()
+    if row is None:
+        return None
+
+    # Stored rows were validated on the way in; skip re-validating on every miss
+    principal = ShopkeeperResponse.model_construct(**row._asdict())
+    _principals.set(shop_id, principal, settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS)
+    return principal
+
+
+def invalidate_principal(shop_id: str) -> None:
+    """Drop a cached profile after the shopkeeper row changes"""
+    _principals.pop(shop_id)
@@ -0,0 +1,130 @@
+from sqlalchemy.orm import Session
+from app.models.product import Product
+from app.models.shopkeeper import Shopkeeper
+from typing import Dict, Optional
+import threading
+
+
+def normalize_code(code: Optional[str]) -> Optional[str]:
+    """Scanners may pad codes with whitespace; blank means no code"""
+    if code is None:
+        return None
+    code = code.strip()
+    return code or None
+
+
+class BarcodeCache:
+    """Hash map from barcode/SKU to an active product's scan details"""
+
+    def __init__(self, catalog_version: int):
+        self._by_code: Dict[str, dict] = {}
+        self._codes: Dict[str, str] = {}  # product_id -> barcode, to drop stale codes
+        self._lock = threading.Lock()
+        self.catalog_version = catalog_version  # Shop catalog the map reflects
+
+    def advance(self, change_seq: int) -> None:
+        """Move to a write's catalog version if the map was current just before it"""
+        with self._lock:
+            if self.catalog_version == change_seq - 1:
+                self.catalog_version = change_seq
+
+    def add(self, product) -> None:
+        """Insert or replace a product, dropping it if inactive or without a code"""
+        product_id = str(product.product_id)
+        with self._lock:
+            old_code = self._codes.pop(product_id, None)
+            if old_code is not None:
+                self._by_code.pop(old_code, None)
+
+            if not product.barcode or not product.is_active:
+                return
+            self._codes[product_id] = product.barcode
+            self._by_code[product.barcode] = {
+                "product_id": product_id,
+                "product_name": product.product_name,
+                "category": product.category,
+                "price": product.price,
+                "unit": product.unit,
+                "barcode": product.barcode
+            }
+
+    def remove(self, product_id: str) -> None:
+        with self._lock:
+            code = self._codes.pop(product_id, None)
+            if code is not None:
+                self._by_code.pop(code, None)
+
+    def get(self, code: str) -> Optional[dict]:
+        return self._by_code.get(code)
+
+
+_caches: Dict[str, BarcodeCache] = {}
+_registry_lock = threading.Lock()
+
+
+def _catalog_version(db: Session, shop_id: str) -> int:
+    return db.query(Shopkeeper.catalog_version).filter(Shopkeeper.shop_id == shop_id).scalar() or 0
+
+
+def build_cache(db: Session, shop_id: str, catalog_version: Optional[int] = None) -> BarcodeCache:
+    """Load every active product with a code for a shop in one query"""
+    # Version read before the rows: a write in between only triggers another rebuild
+    if catalog_version is None:
+        catalog_version = _catalog_version(db, shop_id)
+    cache = BarcodeCache(catalog_version)
+    rows = db.query(
+        Product.product_id,
+        Product.product_name,
+        Product.category,
+        Product.price,
+        Product.unit,
+        Product.barcode,
+        Product.is_active
+    ).filter(
+        Product.shop_id == shop_id,
+        Product.is_active == True,
+        Product.barcode.isnot(None)
+    ).all()
+
+    for row in rows:
+        cache.add(row)
+
+    with _registry_lock:
+        _caches[shop_id] = cache
+    return cache
+
+
+def lookup(db: Session, shop_id: str, code: str) -> Optional[dict]:
+    """Find an active product by barcode/SKU, building the shop's cache on first use"""
+    with _registry_lock:
+        cache = _caches.get(shop_id)
+
+    # Any product write, from any worker process, bumps the shop's catalog version
+    catalog_version = _catalog_version(db, shop_id)
+    if cache is None or cache.catalog_version != catalog_version:
+        cache = build_cache(db, shop_id, catalog_version)
+    return cache.get(code)
+
+
+def cache_product(product) -> None:
+    """Keep an already-built cache in sync after a product write"""
+    with _registry_lock:
+        cache = _caches.get(str(product.shop_id))
+    if cache is not None:
+        cache.add(product)
+        cache.advance(product.change_seq)
+
+
+def uncache_product(shop_id: str, product_id: str, change_seq: int) -> None:
+    """Remove a hard-deleted product from an already-built cache"""
+    with _registry_lock:
+        cache = _caches.get(shop_id)
+    if cache is not None:
+        cache.remove(product_id)
+        cache.advance(change_seq)
+
+
+def invalidate_cache(shop_id: str) -> None:
+    """Drop a shop's cache so the next lookup rebuilds it (after bulk writes)"""
+    with _registry_lock:
+        _caches.pop(shop_id, None)
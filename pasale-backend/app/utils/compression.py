@@ -0,0 +1,243 @@
+# HTTP compression in both directions. Request bodies sent with
+# Content-Encoding gzip/br are inflated (with a size cap against
+# decompression bombs) before routing; responses are compressed with the best
+# encoding the client accepts once they reach a minimum size. Brotli is used
+# when the brotli package is installed, gzip otherwise.
+from starlette.datastructures import Headers, MutableHeaders
+from typing import Optional
+import json
+import zlib
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Already-compressed formats (images, xlsx, zip) gain nothing
+_COMPRESSIBLE_PREFIXES = ("text/", "application/json", "application/msgpack", "application/javascript", "application/xml")
+
+
+class _RequestRejected(Exception):
+    def __init__(self, status_code: int, detail: str):
+        self.status_code = status_code
+        self.detail = detail
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported response encoding for an Accept-Encoding header, None for identity"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            weights[coding] = q
+
+    wildcard = weights.get("*", 0.0)
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    best, best_q = None, 0.0
+    for coding in supported:  # Ties go to the earlier (smaller) encoding
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _decompress(body: bytes, encoding: str, limit: int) -> bytes:
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        # 16 + MAX_WBITS expects gzip framing, plain MAX_WBITS the zlib framing HTTP calls deflate
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding != "deflate" else zlib.MAX_WBITS)
+        try:
+            data = decompressor.decompress(body, limit + 1)
+        except zlib.error:
+            raise _RequestRejected(400, f"Malformed {encoding} request body")
+        if len(data) > limit or decompressor.unconsumed_tail:
+            raise _RequestRejected(413, "Decompressed request body too large")
+        if not decompressor.eof:
+            raise _RequestRejected(400, f"Truncated {encoding} request body")
+        return data
+
+    if encoding == "br" and brotli is not None:
+        decompressor = brotli.Decompressor()
+        chunks, size = [], 0
+        try:
+            # Small input steps keep the output between size checks bounded
+            for start in range(0, len(body), 1024):
+                chunk = decompressor.process(body[start:start + 1024])
+                size += len(chunk)
+                if size > limit:
+                    raise _RequestRejected(413, "Decompressed request body too large")
+                chunks.append(chunk)
+        except brotli.error:
+            raise _RequestRejected(400, "Malformed br request body")
+        if not decompressor.is_finished():
+            raise _RequestRejected(400, "Truncated br request body")
+        return b"".join(chunks)
+
+    raise _RequestRejected(415, f"Unsupported Content-Encoding: {encoding}")
+
+
+class _Compressor:
+    """Incremental gzip or brotli stream"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """Plain ASGI middleware: inflates compressed request bodies and compresses large responses"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4, max_request_bytes: int = 10 * 1024 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.max_request_bytes = max_request_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_encoding = headers.get("content-encoding", "").strip().lower()
+        if content_encoding and content_encoding != "identity":
+            try:
+                receive = await self._inflate_request(scope, receive, content_encoding)
+            except _RequestRejected as e:
+                await self._reject(send, e)
+                return
+
+        encoding = negotiate_encoding(headers.get("accept-encoding", "")) if self.minimum_size > 0 else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(self, encoding)(scope, receive, send)
+
+    async def _inflate_request(self, scope, receive, encoding):
+        chunks, size = [], 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise _RequestRejected(400, "Client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            # Compressed input larger than the output cap can't be legitimate
+            if size > self.max_request_bytes:
+                raise _RequestRejected(413, "Request body too large")
+            chunks.append(chunk)
+            more_body = message.get("more_body", False)
+        body = _decompress(b"".join(chunks), encoding, self.max_request_bytes)
+
+        # Downstream sees a plain body of the inflated length. The scope is
+        # updated in place: outer middleware reads what routing stores in it
+        scope["headers"] = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode())]
+
+        sent = False
+
+        async def inflated_receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return inflated_receive
+
+    @staticmethod
+    async def _reject(send, error: _RequestRejected):
+        body = json.dumps({"detail": error.detail}, separators=(",", ":")).encode()
+        await send({
+            "type": "http.response.start",
+            "status": error.status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class _CompressingResponder:
+    """Wraps send for one request; decides to compress once the first body chunk is seen"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = None
+        self.start_message = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.middleware.app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Hold the headers until we know whether the body gets compressed
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or not content_type.startswith(_COMPRESSIBLE_PREFIXES)
+            )
+            return
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if self.passthrough or (not more_body and len(body) < self.middleware.minimum_size):
+                await self.send(start)
+                await self.send(message)
+                self.passthrough = True
+                return
+
+            self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            # A weak ETag still holds for the compressed representation; a strong one doesn't
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            compressed = self.compressor.compress(body, final=not more_body)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(compressed))
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+        compressed = self.compressor.compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
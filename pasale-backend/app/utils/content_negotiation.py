@@ -0,0 +1,111 @@
+# MessagePack alongside JSON for the sync-heavy routers. Routers opt in with
+# route_class=NegotiatedRoute: request bodies sent as application/msgpack are
+# decoded into the same Python values a JSON body would give, and when the
+# Accept header prefers MessagePack, FastJSONResponse renders it instead of
+# JSON. Error responses (HTTPException, validation) stay JSON.
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable
+from uuid import UUID
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+import msgpack
+import orjson
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_TYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+
+# Format the current route's responses are rendered in ("json" or "msgpack")
+_response_format: ContextVar[str] = ContextVar("response_format", default="json")
+
+
+def response_format() -> str:
+    """Format negotiated for the response being built"""
+    return _response_format.get()
+
+
+def _media_type(content_type: str) -> str:
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+def prefers_msgpack(accept: str) -> bool:
+    """Whether an Accept header ranks MessagePack at or above JSON"""
+    msgpack_q, json_q = 0.0, 0.0
+    for part in accept.split(","):
+        media_type, *params = part.split(";")
+        media_type = media_type.strip().lower()
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in _MSGPACK_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            json_q = max(json_q, q)
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def _default(value: Any) -> Any:
+    # Same text forms the JSON path writes, so both formats decode to equal data
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__} to MessagePack")
+
+
+def packb(content: Any) -> bytes:
+    """Encode a response body as MessagePack"""
+    return msgpack.packb(content, default=_default, use_bin_type=True, datetime=False)
+
+
+class NegotiatedRequest(Request):
+    """Request whose body decodes from MessagePack or, faster than the stdlib, from JSON"""
+
+    msgpack_body = False
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            body = await self.body()
+            # Timestamp extension values arrive as aware datetimes
+            self._json = msgpack.unpackb(body, raw=False, timestamp=3) if self.msgpack_body else orjson.loads(body)
+        return self._json
+
+
+class NegotiatedRoute(APIRoute):
+    """Route that accepts and returns MessagePack as well as JSON"""
+
+    def get_route_handler(self) -> Callable:
+        original_handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            scope = request.scope
+            msgpack_body = _media_type(request.headers.get("content-type", "")) in _MSGPACK_TYPES
+            if msgpack_body:
+                # FastAPI only hands application/json bodies to request.json()
+                scope = dict(scope)
+                scope["headers"] = [
+                    (name, value) for name, value in scope["headers"] if name != b"content-type"
+                ] + [(b"content-type", b"application/json")]
+            request = NegotiatedRequest(scope, request.receive)
+            request.msgpack_body = msgpack_body
+
+            token = _response_format.set("msgpack" if prefers_msgpack(request.headers.get("accept", "")) else "json")
+            try:
+                response = await original_handler(request)
+            finally:
+                _response_format.reset(token)
+            response.headers.add_vary_header("Accept")
+            return response
+
+        return negotiated_handler
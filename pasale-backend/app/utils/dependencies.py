@@ -1,28 +1,30 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import DBRunner, get_db_runner
 from app.utils.security import verify_token
-from app.crud.shopkeeper import get_shopkeeper_by_id
-from app.models.shopkeeper import Shopkeeper
+from app.utils import auth_cache
+from app.utils.request_context import set_shop_id
+from app.schemas.shopkeeper import ShopkeeperResponse
+from app.config import settings
+from typing import Optional
+import hmac
 
 security = HTTPBearer()
 
-def get_current_shopkeeper(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> Shopkeeper:
-    """Dependency to get current authenticated shopkeeper"""
-    
-    token = credentials.credentials
-    payload = verify_token(token)
+def _get_token_shop_id(token: str) -> str:
+    """Decode a bearer token (cached by token hash) and return its shop_id"""
     
+    payload = auth_cache.get_token_payload(token)
     if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        payload = verify_token(token)
+        
+        if payload is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        auth_cache.cache_token_payload(token, payload)
     
     shop_id: str = payload.get("sub")
     if shop_id is None:
@@ -31,8 +33,20 @@ def get_current_shopkeeper(
             detail="Invalid token payload",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return shop_id
+
+async def get_current_shopkeeper(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: DBRunner = Depends(get_db_runner)
+) -> ShopkeeperResponse:
+    """Dependency to get current authenticated shopkeeper's profile (cached)"""
     
-    shopkeeper = get_shopkeeper_by_id(db, shop_id)
+    shop_id = _get_token_shop_id(credentials.credentials)
+    
+    # Cache hits stay on the event loop; only a miss needs the database
+    shopkeeper = auth_cache.get_cached_principal(shop_id)
+    if shopkeeper is None:
+        shopkeeper = await db.run(auth_cache.load_principal, shop_id)
     if shopkeeper is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -40,4 +54,22 @@ def get_current_shopkeeper(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return shopkeeper
\ No newline at end of file
+    set_shop_id(shopkeeper.shop_id)
+    return shopkeeper
+
+async def get_current_shop_id(
+    shopkeeper: ShopkeeperResponse = Depends(get_current_shopkeeper)
+) -> str:
+    """Dependency for routes that only need the authenticated shop_id"""
+    return shopkeeper.shop_id
+
+def require_admin_key(x_admin_key: Optional[str] = Header(None)) -> None:
+    """Dependency for operator endpoints; hidden entirely when ADMIN_API_KEY is unset"""
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    
+    if x_admin_key is None or not hmac.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin key"
+        )
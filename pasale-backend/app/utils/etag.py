@@ -0,0 +1,34 @@
+from fastapi import Request, Response, status
+from app.utils.content_negotiation import response_format
+import hashlib
+
+
+def make_etag(request: Request, shop_id: str, *versions) -> str:
+    """Weak ETag for a shop-scoped listing at the given data versions"""
+    # Filters, paging and the negotiated format change the representation
+    raw = f"{shop_id}:{':'.join(str(v) for v in versions)}:{request.url.path}?{request.url.query}:{response_format()}"
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already covers this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: ignore W/ prefixes
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"}
+    )
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
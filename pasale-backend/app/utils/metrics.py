@@ -0,0 +1,225 @@
+# In-process Prometheus metrics. Hot paths never take a lock: each thread
+# writes only to its own shard (the event loop thread is one shard, each
+# threadpool worker another), and a scrape sums the shards. Registering a new
+# thread's shard is the only locked step and happens once per thread; when the
+# thread exits, its shard is folded into a retired total, so threadpools that
+# recycle workers don't grow the shard list without bound.
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import bisect
+import itertools
+import threading
+import time
+import weakref
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+# Seconds; covers cached reads (~1 ms) through slow reports
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metrics: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ShardHolder:
+    """Thread-local owner of a shard; collected when its thread exits"""
+
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self):
+        self.shard = {}
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: Dict[int, dict] = {}
+        self._shard_ids = itertools.count()
+        self._retired: dict = {}  # Totals of shards whose threads have exited
+        self._shards_lock = threading.Lock()
+        _metrics.append(self)
+
+    def _shard(self) -> dict:
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = _ShardHolder()
+            shard_id = next(self._shard_ids)
+            with self._shards_lock:
+                self._shards[shard_id] = holder.shard
+            # Thread-local storage is dropped when the thread exits
+            weakref.finalize(holder, self._retire, shard_id)
+            self._local.holder = holder
+        return holder.shard
+
+    def _retire(self, shard_id: int) -> None:
+        with self._shards_lock:
+            shard = self._shards.pop(shard_id)
+            for labels, value in shard.items():
+                self._retired[labels] = self._combine(self._retired.get(labels), value)
+
+    def _merged(self) -> dict:
+        # Taken together so a shard retiring mid-scrape isn't counted twice
+        with self._shards_lock:
+            shards = list(self._shards.values())
+            merged = dict(self._retired)
+        for shard in shards:
+            # items() is copied in one C call, safe against the owner inserting
+            for labels, value in list(shard.items()):
+                merged[labels] = self._combine(merged.get(labels), value)
+        return merged
+
+    def _combine(self, total, value):
+        return (total or 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self._merged().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic total"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, *labels) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down; shards may go negative, their sum doesn't"""
+
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, *labels) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def dec(self, amount: float = 1, *labels) -> None:
+        self.inc(-amount, *labels)
+
+
+class Histogram(_Metric):
+    """Bucketed observations with sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # Per-bucket (not cumulative) counts, then sum
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _combine(self, total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        bounds = self.buckets + (float("inf"),)
+        for labels, state in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]) -> None:
+    """Add a scrape-time source of (name, type, help, labels, value) samples"""
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+
+    described = set()
+    for collector in _collectors:
+        for name, kind, documentation, labels, value in collector():
+            if value is None:
+                continue
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+HTTP_REQUESTS = Counter("pasale_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("pasale_http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("pasale_http_requests_in_flight", "HTTP requests being handled")
+
+# Database work per request
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "pasale_db_statements_per_request", "SQL statements executed per request", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+DB_TIME_PER_REQUEST = Histogram("pasale_db_time_per_request_seconds", "Time spent in SQL statements per request", ("method", "route"))
+DB_READ_ROUTING = Counter("pasale_db_read_sessions_total", "Read-only sessions by the database they were routed to", ("target",))
+
+# Pipelines
+TRANSACTION_STEP_SECONDS = Histogram(
+    "pasale_transaction_step_duration_seconds", "Side-effect steps of creating a transaction", ("step",)
+)
+BULK_SYNC_BATCH_SIZE = Histogram(
+    "pasale_bulk_sync_batch_size", "Items per bulk sync request", ("kind",),
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+)
+
+
+def observe_request(method: str, route: Optional[str], status: int, seconds: float, db_statements: int, db_seconds: float) -> None:
+    """Record one finished HTTP request"""
+    # Unrouted paths (404s, scanners) share one label to bound cardinality
+    route = route or "unmatched"
+    HTTP_REQUESTS.inc(1, method, route, str(status))
+    HTTP_LATENCY.observe(seconds, method, route)
+    DB_STATEMENTS_PER_REQUEST.observe(db_statements, method, route)
+    DB_TIME_PER_REQUEST.observe(db_seconds, method, route)
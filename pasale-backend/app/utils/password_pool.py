@@ -0,0 +1,171 @@
+# Argon2 hashing is CPU-bound and holds the GIL long enough that running it in
+# FastAPI's threadpool starves ordinary requests during login bursts. Jobs go to
+# a small process pool; at most PASSWORD_HASH_MAX_PENDING may be queued or
+# running, beyond which callers get 503 immediately.
+from concurrent.futures import ProcessPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
+from typing import Optional, Tuple
+from app.config import settings
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending: Optional[threading.BoundedSemaphore] = None
+
+# Worker-process state
+_worker_context = None
+_worker_params: Optional[dict] = None
+
+
+def _init_worker(params: dict) -> None:
+    global _worker_context, _worker_params
+    from app.utils.security import build_password_context
+    _worker_context = build_password_context(params)
+    _worker_params = params
+
+
+def _hash(password: str) -> str:
+    return _worker_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    from app.utils.security import needs_rehash
+    # Not passlib's verify_and_update: that also rehashes stronger hashes down
+    # to this host's parameters
+    if not _worker_context.verify(password, hashed):
+        return False, None
+    if needs_rehash(hashed, _worker_params):
+        return True, _worker_context.hash(password)
+    return True, None
+
+
+def benchmark_hash_params() -> dict:
+    """Pick the Argon2 time cost that lands closest under PASSWORD_HASH_TARGET_MS on this host"""
+    from argon2 import PasswordHasher
+
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
+
+    def timed(time_cost: int) -> float:
+        hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        started = time.perf_counter()
+        hasher.hash("benchmark-password")
+        return (time.perf_counter() - started) * 1000
+
+    # Cost grows linearly with time_cost; two samples give fixed and per-pass cost
+    one, two = timed(1), timed(2)
+    per_pass = max(two - one, 0.1)
+    fixed = max(one - per_pass, 0.0)
+    time_cost = int((settings.PASSWORD_HASH_TARGET_MS - fixed) // per_pass)
+    time_cost = max(settings.ARGON2_MIN_TIME_COST, min(time_cost, settings.ARGON2_MAX_TIME_COST))
+
+    return {"time_cost": time_cost, "memory_cost": memory_cost, "parallelism": parallelism}
+
+
+def get_hash_params() -> dict:
+    """Argon2 parameters for new hashes, from settings so every host agrees"""
+    return {
+        "time_cost": settings.ARGON2_TIME_COST,
+        "memory_cost": settings.ARGON2_MEMORY_COST,
+        "parallelism": settings.ARGON2_PARALLELISM
+    }
+
+
+def start() -> None:
+    """Configure hashing and start the worker processes (idempotent)"""
+    global _pool, _pending
+    with _pool_lock:
+        if _pool is not None:
+            return
+        params = get_hash_params()
+
+        from app.utils.security import configure_password_hashing
+        configure_password_hashing(params)
+
+        workers = settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+        max_pending = settings.PASSWORD_HASH_MAX_PENDING or workers * 4
+        _pending = threading.BoundedSemaphore(max_pending)
+        # Spawned workers don't inherit the parent's threads, locks or DB connections
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(settings.PASSWORD_HASH_START_METHOD),
+            initializer=_init_worker,
+            initargs=(params,)
+        )
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service is busy, please retry",
+        headers={"Retry-After": "1"}
+    )
+
+
+def _submit(fn, *args) -> Future:
+    """Queue a job, failing fast when the pool is saturated"""
+    start()
+    if not _pending.acquire(blocking=False):
+        raise _busy()
+    try:
+        future = _pool.submit(fn, *args)
+    except BrokenProcessPool:
+        _pending.release()
+        # A crashed worker poisons the pool; replace it for the next caller
+        shutdown()
+        raise _busy()
+    future.add_done_callback(lambda _: _pending.release())
+    return future
+
+
+def _result(future: Future):
+    try:
+        return future.result(timeout=settings.PASSWORD_HASH_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        raise _busy()
+    except BrokenProcessPool:
+        shutdown()
+        raise _busy()
+
+
+async def _result_async(future: Future):
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), settings.PASSWORD_HASH_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise _busy()
+    except BrokenProcessPool:
+        shutdown()
+        raise _busy()
+
+
+def hash_password(password: str) -> str:
+    """Hash a password in the pool, blocking the calling thread"""
+    return _result(_submit(_hash, password))
+
+
+def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and get a replacement hash if it is weaker than the configured parameters"""
+    return _result(_submit(_verify_and_update, password, hashed))
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password in the pool without holding a threadpool worker"""
+    return await _result_async(_submit(_hash, password))
+
+
+async def verify_and_update_async(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Async verify_and_update for event-loop routes"""
+    return await _result_async(_submit(_verify_and_update, password, hashed))
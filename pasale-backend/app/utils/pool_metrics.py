@@ -0,0 +1,142 @@
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool
+from typing import Dict, Type
+from app.utils.metrics import register_collector
+import anyio.to_thread
+import threading
+import time
+
+
+class PoolStats:
+    """Cumulative counters for one engine's connection pool"""
+
+    def __init__(self, name: str, pool_class: str):
+        self.name = name
+        self.pool_class = pool_class
+        self.pool: Pool = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.pre_ping_failures = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        """Live pool gauges plus counters since startup"""
+        pool = self.pool
+        gauges = {"pool_class": self.pool_class}
+        # Only queue pools track size and overflow
+        for gauge in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, gauge, None)
+            gauges[gauge] = method() if callable(method) else None
+        if gauges["overflow"] is not None:
+            # QueuePool counts up from -pool_size; report connections beyond it
+            gauges["overflow"] = max(gauges["overflow"], 0)
+
+        with self._lock:
+            return {
+                "name": self.name,
+                **gauges,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "pre_ping_failures": self.pre_ping_failures,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_seconds_total * 1000, 2),
+                "wait_ms_avg": round(self.wait_seconds_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 2)
+            }
+
+
+_registry: Dict[str, PoolStats] = {}
+
+
+def instrumented_pool_class(base: Type[Pool], name: str) -> Type[Pool]:
+    """Subclass a pool class so checkout wait time and pool events are recorded under name"""
+    stats = _registry.setdefault(name, PoolStats(name, base.__name__))
+
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.increment("checkouts")
+
+    def _checkin(dbapi_connection, connection_record):
+        stats.increment("checkins")
+
+    def _connect(dbapi_connection, connection_record):
+        stats.increment("connects")
+
+    def _invalidate(dbapi_connection, connection_record, exception):
+        stats.increment("invalidations")
+        # A failed pre-ping surfaces as a DisconnectionError on checkout
+        if isinstance(exception, exc.DisconnectionError):
+            stats.increment("pre_ping_failures")
+
+    class InstrumentedPool(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # dispose() swaps in a fresh pool of the same class. Listeners go on
+            # the instance: async pools don't accept class-level listeners.
+            stats.pool = self
+            event.listen(self, "checkout", _checkout)
+            event.listen(self, "checkin", _checkin)
+            event.listen(self, "connect", _connect)
+            event.listen(self, "invalidate", _invalidate)
+
+        def _do_get(self):
+            # Covers queueing for a free slot plus opening a new connection
+            started = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                stats.record_wait(time.perf_counter() - started, timed_out=True)
+                raise
+            stats.record_wait(time.perf_counter() - started)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+
+    return InstrumentedPool
+
+
+def get_pool_stats() -> list:
+    """Snapshots for every instrumented engine"""
+    return [stats.snapshot() for stats in _registry.values() if stats.pool is not None]
+
+
+def get_threadpool_stats() -> dict:
+    """Size and busy workers of the default threadpool (call from the event loop)"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {"size": int(limiter.total_tokens), "busy": limiter.borrowed_tokens}
+
+
+def _prometheus_samples():
+    for snapshot in get_pool_stats():
+        engine = {"engine": snapshot["name"]}
+        yield "pasale_db_pool_size", "gauge", "Persistent connections the pool keeps", engine, snapshot["size"]
+        yield "pasale_db_pool_checked_out", "gauge", "Connections in use", engine, snapshot["checkedout"]
+        yield "pasale_db_pool_overflow", "gauge", "Connections open beyond pool_size", engine, snapshot["overflow"]
+        yield "pasale_db_pool_checkouts_total", "counter", "Connection checkouts", engine, snapshot["checkouts"]
+        yield "pasale_db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection", engine, snapshot["timeouts"]
+        yield "pasale_db_pool_pre_ping_failures_total", "counter", "Stale connections caught by pre-ping", engine, snapshot["pre_ping_failures"]
+        yield "pasale_db_pool_wait_seconds_total", "counter", "Time spent waiting for connections", engine, snapshot["wait_ms_total"] / 1000
+
+    threadpool = get_threadpool_stats()
+    yield "pasale_threadpool_size", "gauge", "Threadpool worker limit", {}, threadpool["size"]
+    yield "pasale_threadpool_busy", "gauge", "Threadpool workers in use", {}, threadpool["busy"]
+
+
+register_collector(_prometheus_samples)
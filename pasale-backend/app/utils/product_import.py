@@ -0,0 +1,137 @@
+from fastapi import HTTPException, status
+from typing import IO, Dict, Iterator, Optional, Tuple
+from zipfile import BadZipFile
+import codecs
+import csv
+
+IMPORT_COLUMNS = ("product_name", "category", "price", "unit", "barcode", "opening_stock", "reorder_level")
+
+# Header aliases shopkeepers commonly use in their spreadsheets
+_HEADER_ALIASES = {
+    "name": "product_name",
+    "product": "product_name",
+    "stock": "opening_stock",
+    "quantity": "opening_stock",
+    "qty": "opening_stock",
+    "reorder": "reorder_level",
+    "sku": "barcode",
+    "code": "barcode",
+}
+
+
+class ImportFileError(Exception):
+    """The upload became unreadable partway through; rows before `row` were already yielded"""
+
+    def __init__(self, row: int, message: str):
+        super().__init__(message)
+        self.row = row
+        self.message = message
+
+
+def _normalize_header(header) -> Optional[str]:
+    if header is None:
+        return None
+    key = str(header).strip().lower().replace(" ", "_")
+    key = _HEADER_ALIASES.get(key, key)
+    return key if key in IMPORT_COLUMNS else None
+
+
+def _to_row(headers: list, values) -> Dict[str, object]:
+    """Map a raw row onto import columns, treating blank cells as missing"""
+    row = {}
+    for key, value in zip(headers, values):
+        if key is None or value is None:
+            continue
+        if key == "barcode" and not isinstance(value, str):
+            # Spreadsheets turn numeric barcodes into numbers
+            value = str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+        if isinstance(value, str):
+            value = value.strip()
+            if value == "":
+                continue
+        row[key] = value
+    return row
+
+
+def _check_headers(headers: list) -> None:
+    if "product_name" not in headers or "price" not in headers:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Import file must have product_name and price columns"
+        )
+
+
+def iter_csv_rows(file: IO[bytes]) -> Iterator[Tuple[int, Dict[str, object]]]:
+    """Yield (line number, row) from a CSV upload without reading it all into memory"""
+    reader = csv.reader(codecs.iterdecode(file, "utf-8-sig"))
+    try:
+        headers = [_normalize_header(h) for h in next(reader)]
+    except StopIteration:
+        return
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=_csv_error_message(e))
+    _check_headers(headers)
+
+    # Decoding is lazy, so a bad byte can surface after rows were imported
+    try:
+        for values in reader:
+            if not any(v.strip() for v in values):
+                continue
+            yield reader.line_num, _to_row(headers, values)
+    except (UnicodeDecodeError, csv.Error) as e:
+        line = reader.line_num + 1 if isinstance(e, UnicodeDecodeError) else reader.line_num
+        raise ImportFileError(line, _csv_error_message(e))
+
+
+def _csv_error_message(error: Exception) -> str:
+    if isinstance(error, UnicodeDecodeError):
+        return "CSV file is not UTF-8 text; save it as \"CSV UTF-8\""
+    return f"Malformed CSV file: {error}"
+
+
+def iter_xlsx_rows(file: IO[bytes]) -> Iterator[Tuple[int, Dict[str, object]]]:
+    """Yield (row number, row) from the first sheet of an XLSX upload in read-only mode"""
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="XLSX import is not available on this server; upload a CSV file"
+        )
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    # Not a zip, or a zip without the workbook parts
+    except (BadZipFile, InvalidFileException, KeyError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is not a valid .xlsx workbook"
+        )
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        try:
+            headers = [_normalize_header(h) for h in next(rows)]
+        except StopIteration:
+            return
+        _check_headers(headers)
+
+        for row_number, values in enumerate(rows, start=2):
+            if all(v is None or (isinstance(v, str) and not v.strip()) for v in values):
+                continue
+            yield row_number, _to_row(headers, values)
+    finally:
+        workbook.close()
+
+
+def iter_import_rows(filename: Optional[str], file: IO[bytes]) -> Iterator[Tuple[int, Dict[str, object]]]:
+    """Pick a row reader from the uploaded file's extension"""
+    name = (filename or "").lower()
+    if name.endswith(".xlsx"):
+        return iter_xlsx_rows(file)
+    if name.endswith(".csv") or name.endswith(".txt"):
+        return iter_csv_rows(file)
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Unsupported file type; upload a .csv or .xlsx file"
+    )
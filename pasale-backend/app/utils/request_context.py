@@ -0,0 +1,81 @@
+from contextvars import ContextVar
+from typing import Optional
+from app.utils import metrics
+import time
+
+
+class RequestContext:
+    """What the current request is, for logs and metrics emitted deep in the stack"""
+
+    __slots__ = ("scope", "shop_id", "db_statements", "db_seconds")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.shop_id: Optional[str] = None
+        self.db_statements = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> Optional[str]:
+        """Route template (e.g. /api/v1/products/{product_id}), None until routed"""
+        route = self.scope.get("route")
+        return route.path if route is not None else None
+
+    @property
+    def endpoint(self) -> str:
+        """Method and route template, or the raw path if no route matched"""
+        return f"{self.scope.get('method', '')} {self.route or self.scope.get('path', '')}"
+
+
+_current: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+
+def get_request_context() -> Optional[RequestContext]:
+    """Context of the request being handled, or None outside a request"""
+    return _current.get()
+
+
+def set_shop_id(shop_id: str) -> None:
+    """Attach the authenticated shop to the current request"""
+    # The context object is shared, so threadpool and greenlet copies see this too
+    context = _current.get()
+    if context is not None:
+        context.shop_id = shop_id
+
+
+class RequestContextMiddleware:
+    """Plain ASGI middleware that opens a RequestContext per HTTP request and records its metrics"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext(scope)
+        token = _current.set(context)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.HTTP_IN_FLIGHT.dec()
+            metrics.observe_request(
+                scope["method"],
+                context.route,
+                status_code,
+                time.perf_counter() - started,
+                context.db_statements,
+                context.db_seconds
+            )
+            _current.reset(token)
@@ -0,0 +1,229 @@
+from sqlalchemy.orm import Session
+from app.models.product import Product
+from app.config import settings
+from app.database import primary_session
+from app.utils.auth_cache import TTLCache
+from typing import Dict, List, Optional, Set
+import heapq
+import threading
+
+# Bigrams serve two-letter queries, trigrams everything longer
+GRAM_SIZES = (2, 3)
+
+
+def normalize(text: Optional[str]) -> str:
+    """Case-fold and collapse whitespace so matching ignores formatting"""
+    return " ".join((text or "").casefold().split())
+
+
+def _ngrams(text: str, size: int) -> Set[str]:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _grams(text: str) -> Set[str]:
+    """Grams stored in the index for a product name"""
+    grams = set()
+    for size in GRAM_SIZES:
+        grams |= _ngrams(text, size)
+    return grams
+
+
+def _query_grams(query: str) -> Set[str]:
+    """Grams that must all be present for a name to contain the query"""
+    return _ngrams(query, min(len(query), GRAM_SIZES[-1])) if len(query) >= GRAM_SIZES[0] else set()
+
+
+class ProductSearchIndex:
+    """In-process n-gram index over one shop's product catalog"""
+
+    def __init__(self):
+        self._docs: Dict[str, dict] = {}  # product_id -> product fields + normalized name
+        self._postings: Dict[str, Set[str]] = {}  # n-gram -> product_ids
+        self._word_starts: Dict[str, Set[str]] = {}  # first letter of each word -> product_ids
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, product) -> None:
+        """Insert or replace a product"""
+        product_id = str(product.product_id)
+        name = normalize(product.product_name)
+        doc = {
+            "product_id": product_id,
+            "product_name": product.product_name,
+            "category": product.category,
+            "price": product.price,
+            "unit": product.unit,
+            "barcode": product.barcode,
+            "is_active": product.is_active,
+            "name": name
+        }
+
+        with self._lock:
+            self._remove_postings(product_id)
+            self._docs[product_id] = doc
+            for gram in _grams(name):
+                self._postings.setdefault(gram, set()).add(product_id)
+            for letter in {word[0] for word in name.split()}:
+                self._word_starts.setdefault(letter, set()).add(product_id)
+
+    def remove(self, product_id: str) -> None:
+        """Drop a product"""
+        with self._lock:
+            self._remove_postings(product_id)
+            self._docs.pop(product_id, None)
+
+    def _remove_postings(self, product_id: str) -> None:
+        doc = self._docs.get(product_id)
+        if not doc:
+            return
+        for gram in _grams(doc["name"]):
+            postings = self._postings.get(gram)
+            if postings:
+                postings.discard(product_id)
+                if not postings:
+                    del self._postings[gram]
+        for letter in {word[0] for word in doc["name"].split()}:
+            postings = self._word_starts.get(letter)
+            if postings:
+                postings.discard(product_id)
+                if not postings:
+                    del self._word_starts[letter]
+
+    def _candidates(self, query: str) -> Set[str]:
+        grams = _query_grams(query)
+        if not grams:
+            # Single character: scan names in memory
+            return set(self._docs)
+
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates &= other
+            if not candidates:
+                break
+        return candidates
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        include_inactive: bool = False
+    ) -> List[dict]:
+        """Find products whose name contains the query, best matches first"""
+        query = normalize(query)
+        if not query:
+            return []
+
+        with self._lock:
+            # One letter matches most of the catalog; word starts rank first, so
+            # a limited lookup only needs a full scan when those run out
+            if len(query) == 1 and limit is not None:
+                matches = self._match(query, self._word_starts.get(query, set()), include_inactive)
+                if len(matches) < limit:
+                    matches = self._match(query, self._candidates(query), include_inactive)
+            else:
+                matches = self._match(query, self._candidates(query), include_inactive)
+
+        if limit is not None:
+            matches = heapq.nsmallest(limit, matches, key=lambda m: m[:4])
+        else:
+            matches.sort(key=lambda m: m[:4])
+
+        return [match[4] for match in matches]
+
+    def _match(self, query: str, candidates: Set[str], include_inactive: bool) -> list:
+        """Verify candidates and attach a rank to each match"""
+        matches = []
+        for product_id in candidates:
+            doc = self._docs[product_id]
+            if not include_inactive and not doc["is_active"]:
+                continue
+            name = doc["name"]
+            position = name.find(query)
+            if position < 0:
+                continue  # N-gram false positive
+
+            # Exact > prefix > word prefix > substring, then shorter names
+            if name == query:
+                rank = 0
+            elif position == 0:
+                rank = 1
+            elif name[position - 1] == " ":
+                rank = 2
+            else:
+                rank = 3
+            matches.append((rank, len(name), name, product_id, doc))
+        return matches
+
+
+# Least recently searched shops are evicted; expiry picks up other workers' writes
+_indexes = TTLCache(settings.SEARCH_INDEX_MAX_SHOPS)
+
+
+def build_index(db: Session, shop_id: str) -> ProductSearchIndex:
+    """Build a shop's index from the database in one query"""
+    index = ProductSearchIndex()
+    rows = db.query(
+        Product.product_id,
+        Product.product_name,
+        Product.category,
+        Product.price,
+        Product.unit,
+        Product.barcode,
+        Product.is_active
+    ).filter(Product.shop_id == shop_id).all()
+
+    for row in rows:
+        index.add(row)
+
+    _indexes.set(shop_id, index, settings.SEARCH_INDEX_TTL_SECONDS)
+    return index
+
+
+def get_index(db: Session, shop_id: str) -> ProductSearchIndex:
+    """Get a shop's index, building it on first use or once it is stale"""
+    index = _indexes.get(shop_id)
+    if index is None:
+        with primary_session(db) as primary:
+            index = build_index(primary, shop_id)
+    return index
+
+
+def search_product_ids(
+    db: Session,
+    shop_id: str,
+    query: str,
+    include_inactive: bool = False
+) -> List[str]:
+    """Get IDs of the best-ranked products whose name contains the query"""
+    # Callers bind every ID as a parameter, so a broad query must not grow past
+    # the driver's limit (999 on older SQLite, 32767 on asyncpg)
+    return [
+        doc["product_id"]
+        for doc in get_index(db, shop_id).search(
+            query,
+            limit=settings.SEARCH_MAX_RESULTS,
+            include_inactive=include_inactive
+        )
+    ]
+
+
+def index_product(product) -> None:
+    """Keep an already-built index in sync after a product write"""
+    index = _indexes.get(str(product.shop_id))
+    if index is not None:
+        index.add(product)
+
+
+def unindex_product(shop_id: str, product_id: str) -> None:
+    """Remove a hard-deleted product from an already-built index"""
+    index = _indexes.get(shop_id)
+    if index is not None:
+        index.remove(product_id)
+
+
+def invalidate_index(shop_id: str) -> None:
+    """Drop a shop's index so the next search rebuilds it (after bulk writes)"""
+    _indexes.pop(shop_id)
@@ -1,13 +1,57 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from app.config import settings
 
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+# passlib (with its argon2/bcrypt handlers) and jose (which loads the
+# cryptography backend) are imported on first use rather than with the app:
+# hashing runs in password_pool workers, and warm-up loads jose before traffic.
+
 # Password hashing
 # Prefer Argon2 for new hashes with bcrypt as a fallback for existing hashes.
 # Argon2 supports longer inputs and is recommended. Requires `argon2-cffi`.
-pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+_pwd_context: Optional["CryptContext"] = None
+
+def build_password_context(params: Optional[dict] = None) -> "CryptContext":
+    """CryptContext using the given Argon2 time/memory/parallelism parameters"""
+    from passlib.context import CryptContext
+    
+    context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+    if params:
+        configure_password_hashing(params, context)
+    return context
+
+def get_password_context() -> "CryptContext":
+    """This process's shared CryptContext, created on first use"""
+    global _pwd_context
+    if _pwd_context is None:
+        _pwd_context = build_password_context()
+    return _pwd_context
+
+def configure_password_hashing(params: dict, context: Optional["CryptContext"] = None) -> None:
+    """Apply Argon2 parameters for new hashes; weaker stored hashes are upgraded on login"""
+    context = context or get_password_context()
+    context.update(**{f"argon2__{key}": value for key, value in params.items()})
+
+def needs_rehash(hashed: str, params: dict) -> bool:
+    """Whether a verified hash is weaker than the given Argon2 parameters (never downgrades)"""
+    from argon2 import extract_parameters
+    from argon2.exceptions import InvalidHashError
+    
+    if not hashed.startswith("$argon2"):
+        return True  # bcrypt -> argon2
+    try:
+        current = extract_parameters(hashed)
+    except InvalidHashError:
+        return False
+    return current.time_cost < params["time_cost"] or current.memory_cost < params["memory_cost"]
+
+def load_crypto_backends() -> None:
+    """Import the JWT and hashing libraries now instead of on the first request"""
+    import jose.jwt  # noqa: F401
+    get_password_context()
 
 # JWT settings
 ALGORITHM = "HS256"
@@ -15,14 +59,16 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
 def hash_password(password: str) -> str:
     """Hash a plain password"""
-    return pwd_context.hash(password)
+    return get_password_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
+    from jose import jwt
+    
     to_encode = data.copy()
     
     if expires_delta:
@@ -36,6 +82,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode JWT token"""
+    from jose import JWTError, jwt
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
         return payload
@@ -0,0 +1,128 @@
+# SQL instrumentation. Every statement is timed with two cursor events and
+# added to the current request's totals (for metrics). Those over
+# SLOW_QUERY_MS are written, as JSON lines to a rotating file, together with
+# the endpoint and shop that issued them. A sample of slow SELECTs also gets
+# its query plan captured on the same connection.
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from logging.handlers import RotatingFileHandler
+from datetime import datetime, timezone
+from app.config import settings
+from app.utils.request_context import get_request_context
+import json
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger("pasale.slow_query")
+
+# Plan-only forms: none of these execute the statement again
+_EXPLAIN_PREFIX = {
+    "postgresql": "EXPLAIN ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "mysql": "EXPLAIN ",
+}
+
+_MAX_STATEMENT_CHARS = 4000
+
+
+def _configure_logger() -> None:
+    if logger.handlers:
+        return
+    directory = os.path.dirname(settings.SLOW_QUERY_LOG_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = RotatingFileHandler(
+        settings.SLOW_QUERY_LOG_PATH,
+        maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+        backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+        encoding="utf-8",
+        delay=True  # Open the file with the first slow query, not at import
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _explain(conn, statement: str, parameters) -> list:
+    """Query plan for a statement, run on the connection that just executed it"""
+    prefix = _EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None:
+        raise NotImplementedError(f"no EXPLAIN form for {conn.dialect.name}")
+
+    dbapi_connection = conn.connection.dbapi_connection
+    # A failed statement would otherwise abort the request's transaction; an
+    # autocommit connection (the read replica) has none, and rejects SAVEPOINT
+    guarded = conn.dialect.name == "postgresql" and not getattr(dbapi_connection, "autocommit", False)
+    cursor = dbapi_connection.cursor()
+    try:
+        if guarded:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = [" ".join(str(col) for col in row) for row in cursor.fetchall()]
+        except Exception:
+            if guarded:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            raise
+        finally:
+            if guarded:
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["slow_query_start"].pop()
+    request = get_request_context()
+    if request is not None:
+        request.db_statements += 1
+        request.db_seconds += elapsed
+
+    elapsed_ms = elapsed * 1000
+    if settings.SLOW_QUERY_MS <= 0 or elapsed_ms < settings.SLOW_QUERY_MS:
+        return
+
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(elapsed_ms, 2),
+        "threshold_ms": settings.SLOW_QUERY_MS,
+        "endpoint": request.endpoint if request is not None else None,
+        "shop_id": request.shop_id if request is not None else None,
+        "rowcount": cursor.rowcount,
+        "executemany": executemany,
+        # Parameters are left out: they can carry password hashes and customer data
+        "statement": statement[:_MAX_STATEMENT_CHARS]
+    }
+
+    is_select = statement.lstrip()[:6].upper() in ("SELECT", "WITH")
+    if is_select and not executemany and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        try:
+            record["plan"] = _explain(conn, statement, parameters)
+        except Exception as e:
+            record["plan_error"] = f"{type(e).__name__}: {e}"
+
+    logger.info(json.dumps(record, default=str))
+
+
+def _handle_error(exception_context):
+    # The statement failed, so after_cursor_execute won't pop its start time
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("slow_query_start"):
+        connection.info["slow_query_start"].pop()
+
+
+def install_sql_instrumentation(engine: Engine) -> None:
+    """Time every statement on engine, count it against the request and log the slow ones"""
+    if settings.SLOW_QUERY_MS > 0:
+        _configure_logger()
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,124 @@
+# Startup warm-up. Everything here would otherwise happen lazily on the first
+# requests a fresh worker serves: importing the JWT/crypto libraries,
+# spawning the password hashing pool, opening pooled DB connections and
+# compiling the hot SQL statements. Run from a startup handler, so the worker
+# only accepts traffic once it is done. Failures are logged, never fatal: the
+# lazy paths still work.
+from contextlib import asynccontextmanager
+from sqlalchemy.pool import QueuePool
+from starlette.concurrency import run_in_threadpool
+from typing import Dict
+from app.config import settings
+from app.utils import metrics
+import logging
+import time
+import uuid
+
+logger = logging.getLogger("pasale.startup")
+
+# Seconds per step of the last warm-up
+_timings: Dict[str, float] = {}
+
+
+async def _step(name: str, fn) -> None:
+    started = time.perf_counter()
+    try:
+        await fn()
+    except Exception as e:
+        logger.warning("warm-up step %s failed: %s: %s", name, type(e).__name__, e)
+    finally:
+        _timings[name] = time.perf_counter() - started
+
+
+async def _load_crypto() -> None:
+    from app.utils.security import load_crypto_backends
+    await run_in_threadpool(load_crypto_backends)
+
+
+async def _start_password_pool() -> None:
+    from app.utils import password_pool
+    # Spawns the hashing workers
+    await run_in_threadpool(password_pool.start)
+
+
+def _connections_to_open(engine) -> int:
+    if engine is None or not isinstance(engine.pool, QueuePool):
+        return 0  # SQLite's single connection, NullPool: nothing to pre-open
+    return min(settings.WARMUP_DB_CONNECTIONS or settings.DB_POOL_SIZE, engine.pool.size())
+
+
+def _open_sync(engine, count: int) -> None:
+    # Held together so the pool really grows to count, then returned to it
+    connections = [engine.connect() for _ in range(count)]
+    for connection in connections:
+        connection.close()
+
+
+async def _open_db_connections() -> None:
+    from app.database import engine, replica_engine, async_engine, async_replica_engine
+
+    if async_engine is not None:
+        for async_bind in (async_engine, async_replica_engine):
+            if async_bind is None:
+                continue
+            count = _connections_to_open(async_bind.sync_engine)
+            connections = [await async_bind.connect() for _ in range(count)]
+            for connection in connections:
+                await connection.close()
+    else:
+        for bind in (engine, replica_engine):
+            count = _connections_to_open(bind)
+            if count:
+                await run_in_threadpool(_open_sync, bind, count)
+
+
+async def _compile_statements() -> None:
+    from app.database import get_db_runner, get_read_db_runner
+    from app.crud import inventory as crud_inventory
+    from app.crud import product as crud_product
+    from app.crud import shopkeeper as crud_shopkeeper
+    from app.crud import transaction as crud_transaction
+    from app.utils import auth_cache
+
+    # A shop that can't exist: every query runs (and is compiled and cached)
+    # but matches nothing
+    shop_id = str(uuid.uuid4())
+    async with asynccontextmanager(get_db_runner)() as db:
+        await db.run(crud_shopkeeper.get_shopkeeper_by_identifier, "warm-up@invalid")
+    async with asynccontextmanager(get_read_db_runner)() as db:
+        await db.run(auth_cache.load_principal, shop_id)
+        await db.run(crud_shopkeeper.get_data_versions, shop_id)
+        await db.run(crud_product.get_product_rows, shop_id)
+        await db.run(crud_transaction.get_transaction_rows, shop_id)
+        await db.run(crud_inventory.get_inventory_for_shop, shop_id)
+        await db.run(crud_inventory.get_inventory_statistics, shop_id)
+
+
+async def warm_up() -> Dict[str, float]:
+    """Run every warm-up step and return how long each took, in seconds"""
+    started = time.perf_counter()
+    await _step("crypto_backends", _load_crypto)
+    await _step("password_pool", _start_password_pool)
+    await _step("db_connections", _open_db_connections)
+    await _step("sql_statements", _compile_statements)
+    total = time.perf_counter() - started
+
+    logger.info(
+        "warm-up finished in %.1f ms (%s)",
+        total * 1000,
+        ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in _timings.items())
+    )
+    return get_warmup_timings()
+
+
+def get_warmup_timings() -> Dict[str, float]:
+    """Seconds per step of the last warm-up (empty if it hasn't run)"""
+    return dict(_timings)
+
+
+def _prometheus_samples():
+    for name, seconds in _timings.items():
+        yield "pasale_startup_warmup_seconds", "gauge", "Duration of each startup warm-up step", {"step": name}, seconds
+
+
+metrics.register_collector(_prometheus_samples)
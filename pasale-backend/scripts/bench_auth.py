@@ -0,0 +1,161 @@
+"""Measure registration and login throughput and latency.
+
+Usage:
+    python -m scripts.bench_auth [--base-url URL] [--users N] [--logins N] [--concurrency N]
+
+Without --base-url the app is driven in-process over ASGI on a throwaway
+SQLite database (or DATABASE_URL if set). Point --base-url at a running
+server to include the network and real worker processes. 503 responses
+from the hashing pool's queue limit are counted separately from errors;
+registrations retry them so every login account exists.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _run_phase(client, name, requests, concurrency, retry_busy=False):
+    """Send (method, path, body) requests with bounded concurrency and summarize"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async def send(method, path, body):
+        async with semaphore:
+            while True:
+                started = time.perf_counter()
+                response = await client.request(method, path, json=body)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if not (retry_busy and response.status_code == 503):
+                    break
+                await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(*request) for request in requests))
+    elapsed = time.perf_counter() - started
+
+    sent = sum(statuses.values())
+    ok = sum(count for code, count in statuses.items() if code < 400)
+    return {
+        "phase": name,
+        "requests": sent,
+        "ok": ok,
+        "busy_503": statuses.get(503, 0),
+        "errors": sent - ok - statuses.get(503, 0),
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 1),
+        "p95_ms": round(_percentile(latencies, 95), 1),
+        "mean_ms": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+        "statuses": statuses
+    }
+
+
+def _users(count):
+    run = uuid.uuid4().int % 10 ** 6
+    for i in range(count):
+        # Contacts must match the Nepal mobile format: 98/97 + 8 digits
+        yield {
+            "shop_name": f"Bench Shop {i}",
+            "shop_address": "Kathmandu, Nepal",
+            "contact": f"98{(run * 1000 + i) % 10 ** 8:08d}",
+            "email": f"bench-{run}-{i}@example.com",
+            "password": "bench-password"
+        }
+
+
+async def bench(args):
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url.rstrip("/") + "/api/v1", timeout=60)
+    else:
+        if "DATABASE_URL" not in os.environ:
+            os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_auth.db')}"
+        os.environ.setdefault("SECRET_KEY", "bench-auth")
+
+        from app.main import app as fastapi_app
+        from app.database import Base, engine
+        from app.utils import password_pool
+        import app.models
+        import app.models.inventory
+
+        Base.metadata.create_all(engine)
+        password_pool.start()
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=fastapi_app),
+            base_url="http://bench/api/v1",
+            timeout=60
+        )
+
+    users = list(_users(args.users))
+    results = []
+    async with client:
+        # Logins need every account to exist, so registrations retry after 503
+        results.append(await _run_phase(
+            client, "register",
+            [("POST", "/shopkeepers/register", user) for user in users],
+            args.concurrency,
+            retry_busy=True
+        ))
+
+        # Alternate identifiers so both sides of the email/contact lookup are exercised
+        logins = []
+        for i in range(args.logins):
+            user = users[i % len(users)]
+            identifier = user["email"] if i % 2 else user["contact"]
+            logins.append(("POST", "/shopkeepers/login", {"identifier": identifier, "password": user["password"]}))
+        results.append(await _run_phase(client, "login", logins, args.concurrency))
+
+        # Wrong passwords cost a full verify too
+        bad = [
+            ("POST", "/shopkeepers/login", {"identifier": users[i % len(users)]["contact"], "password": "wrong-password"})
+            for i in range(max(args.logins // 4, 1))
+        ]
+        results.append(await _run_phase(client, "login_wrong_password", bad, args.concurrency))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark registration and login")
+    parser.add_argument("--base-url", help="Running server, e.g. http://127.0.0.1:8000 (default: in-process)")
+    parser.add_argument("--users", type=int, default=50, help="Shopkeepers to register")
+    parser.add_argument("--logins", type=int, default=200, help="Successful login attempts")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines")
+    args = parser.parse_args()
+
+    results = asyncio.run(bench(args))
+    for result in results:
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(
+                f"{result['phase']:<22} {result['requests']:>5} req  {result['throughput_rps']:>8.2f} ok/s  "
+                f"p50 {result['p50_ms']:>7.1f} ms  p95 {result['p95_ms']:>7.1f} ms  "
+                f"ok {result['ok']}  503 {result['busy_503']}  errors {result['errors']}"
+            )
+
+    # Wrong-password 401s are expected; only other failures count
+    failed = any(r["errors"] for r in results if r["phase"] != "login_wrong_password")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
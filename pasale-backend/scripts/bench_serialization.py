@@ -0,0 +1,256 @@
+"""Compare response serialization paths for large list endpoints.
+
+Usage:
+    python -m scripts.bench_serialization [--transactions N] [--page-size N] [--rounds N] [--json]
+
+Seeds one shop with N transactions in a throwaway SQLite database (or
+DATABASE_URL if set), then times one page of the transaction listing through:
+
+    orm_pydantic_json    ORM objects -> response_model validation -> jsonable_encoder -> json.dumps
+                         (what FastAPI did for every route before FastJSONResponse)
+    orm_pydantic_orjson  ORM objects -> response_model validation -> orjson
+    core_orjson          Core column rows as dicts -> orjson (the list route's fast path)
+    http_get             GET /transactions in-process over ASGI, end to end
+
+The first three include the query, so the numbers are per page served. A
+second table fetches the same page as JSON and MessagePack, each identity,
+gzip and br encoded, and reports bytes on the wire and the client's time to
+decompress and parse them.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_serialization.db')}"
+os.environ.setdefault("SECRET_KEY", "bench-serialization")
+
+import gzip
+import httpx
+import msgpack
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app.main import app as fastapi_app
+from app.database import Base, engine, SessionLocal
+from app.crud import transaction as crud_transaction
+from app.models.shopkeeper import Shopkeeper
+from app.models.product import Product
+from app.models.transaction import Transaction, TransactionType
+from app.schemas.transaction import TransactionListResponse
+from app.utils.fast_json import FastJSONResponse
+from app.utils.compression import brotli
+from app.utils.security import create_access_token
+import app.models
+import app.models.inventory
+
+
+def _seed(transactions: int) -> str:
+    """One shop with a handful of products and the requested transactions"""
+    Base.metadata.create_all(engine)
+    shop_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        db.add(Shopkeeper(
+            shop_id=shop_id,
+            shop_name="Bench Shop",
+            contact=f"98{uuid.uuid4().int % 10 ** 8:08d}",
+            password="not-a-hash"
+        ))
+        product_ids = [str(uuid.uuid4()) for _ in range(20)]
+        db.add_all(
+            Product(product_id=pid, shop_id=shop_id, product_name=f"Product {i}", price=10.0 + i)
+            for i, pid in enumerate(product_ids)
+        )
+        db.flush()
+
+        now = datetime.now(timezone.utc)
+        db.bulk_insert_mappings(Transaction, [
+            {
+                "transaction_id": str(uuid.uuid4()),
+                "shop_id": shop_id,
+                "product_id": product_ids[i % len(product_ids)],
+                "date_time": now - timedelta(minutes=i),
+                "quantity": 1 + i % 5,
+                "price": 12.5,
+                "total": 12.5 * (1 + i % 5),
+                "type": TransactionType.SALE if i % 7 else TransactionType.PURCHASE,
+                "synced": bool(i % 2),
+                "device_id": "bench",
+                "version": 1
+            }
+            for i in range(transactions)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return shop_id
+
+
+def _page(transactions, total, page_size):
+    return {"total": total, "page": 1, "page_size": page_size, "transactions": transactions}
+
+
+def _orm_pydantic_json(shop_id, page_size):
+    db = SessionLocal()
+    try:
+        transactions, total = crud_transaction.get_transactions_by_shop(db, shop_id, limit=page_size)
+        model = TransactionListResponse.model_validate(_page(transactions, total, page_size))
+        return json.dumps(
+            jsonable_encoder(model), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+    finally:
+        db.close()
+
+
+def _orm_pydantic_orjson(shop_id, page_size):
+    db = SessionLocal()
+    try:
+        transactions, total = crud_transaction.get_transactions_by_shop(db, shop_id, limit=page_size)
+        model = TransactionListResponse.model_validate(_page(transactions, total, page_size))
+        return FastJSONResponse(model.model_dump()).body
+    finally:
+        db.close()
+
+
+def _core_orjson(shop_id, page_size):
+    db = SessionLocal()
+    try:
+        transactions, total = crud_transaction.get_transaction_rows(db, shop_id, limit=page_size)
+        return FastJSONResponse(_page(transactions, total, page_size)).body
+    finally:
+        db.close()
+
+
+def _summarize(name, timings_ms, body_bytes):
+    return {
+        "path": name,
+        "rounds": len(timings_ms),
+        "mean_ms": round(statistics.fmean(timings_ms), 3),
+        "p50_ms": round(statistics.median(timings_ms), 3),
+        "min_ms": round(min(timings_ms), 3),
+        "bytes": body_bytes
+    }
+
+
+def _time_sync(name, fn, rounds, *args):
+    fn(*args)  # Warm up statement caches
+    timings, body = [], b""
+    for _ in range(rounds):
+        started = time.perf_counter()
+        body = fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return _summarize(name, timings, len(body))
+
+
+async def _time_http(shop_id, page_size, rounds):
+    token = create_access_token(data={"sub": shop_id})
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fastapi_app),
+        base_url="http://bench/api/v1",
+        headers={"Authorization": f"Bearer {token}"}
+    ) as client:
+        url = f"/transactions/?page_size={page_size}"
+        response = await client.get(url)
+        response.raise_for_status()
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            response = await client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+    return _summarize("http_get", timings, len(response.content))
+
+
+async def _wire_formats(shop_id, page_size, rounds):
+    """Bytes on the wire and client decode time per format and content encoding"""
+    token = create_access_token(data={"sub": shop_id})
+    decoders = {"identity": lambda raw: raw, "gzip": gzip.decompress}
+    if brotli is not None:
+        decoders["br"] = brotli.decompress
+    parsers = {"application/json": orjson.loads, "application/msgpack": msgpack.unpackb}
+
+    results = []
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fastapi_app),
+        base_url="http://bench/api/v1",
+        headers={"Authorization": f"Bearer {token}"}
+    ) as client:
+        for accept, parse in parsers.items():
+            for encoding, decode in decoders.items():
+                request = client.build_request(
+                    "GET", f"/transactions/?page_size={page_size}",
+                    headers={"Accept": accept, "Accept-Encoding": encoding}
+                )
+                response = await client.send(request, stream=True)
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+                await response.aclose()
+                assert response.headers.get("content-encoding", "identity") == encoding, response.headers
+
+                timings = []
+                for _ in range(rounds):
+                    started = time.perf_counter()
+                    parse(decode(raw))
+                    timings.append((time.perf_counter() - started) * 1000)
+                results.append({
+                    "format": accept.split("/")[1],
+                    "encoding": encoding,
+                    "bytes": len(raw),
+                    "decode_ms": round(statistics.median(timings), 4)
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization of list responses")
+    parser.add_argument("--transactions", type=int, default=2000, help="Transactions to seed")
+    parser.add_argument("--page-size", type=int, default=100, help="Rows per page (the API caps this at 100)")
+    parser.add_argument("--rounds", type=int, default=200, help="Timed repetitions per path")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines")
+    args = parser.parse_args()
+
+    shop_id = _seed(args.transactions)
+    results = [
+        _time_sync("orm_pydantic_json", _orm_pydantic_json, args.rounds, shop_id, args.page_size),
+        _time_sync("orm_pydantic_orjson", _orm_pydantic_orjson, args.rounds, shop_id, args.page_size),
+        _time_sync("core_orjson", _core_orjson, args.rounds, shop_id, args.page_size),
+    ]
+    if args.page_size <= 100:
+        results.append(asyncio.run(_time_http(shop_id, args.page_size, args.rounds)))
+
+    wire = asyncio.run(_wire_formats(shop_id, min(args.page_size, 100), args.rounds))
+
+    baseline = results[0]["mean_ms"]
+    for result in results:
+        result["speedup"] = round(baseline / result["mean_ms"], 2) if result["mean_ms"] else None
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(
+                f"{result['path']:<20} mean {result['mean_ms']:>8.3f} ms  p50 {result['p50_ms']:>8.3f} ms  "
+                f"min {result['min_ms']:>8.3f} ms  {result['bytes']:>7} bytes  x{result['speedup']}"
+            )
+
+    if not args.json:
+        print()
+    for result in wire:
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(
+                f"{result['format']:<8} {result['encoding']:<9} {result['bytes']:>7} bytes  "
+                f"client decode p50 {result['decode_ms']:>8.4f} ms"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
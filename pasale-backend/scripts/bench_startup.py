@@ -0,0 +1,153 @@
+"""Measure worker cold-start cost: importing app.main and running its startup handlers.
+
+Usage:
+    python -m scripts.bench_startup [--runs N] [--top N] [--warmup] [--json]
+
+Every run is a fresh interpreter, so nothing is shared through sys.modules.
+Two kinds of run are made:
+
+- Plain runs time `import app.main` and the startup handlers, wall clock.
+  --warmup turns on STARTUP_WARMUP for them and reports each warm-up step.
+- `python -X importtime` runs give the cost of each module. It is reported
+  as the median over runs, for app modules and per third-party package.
+  importtime adds its own overhead, so these numbers sum to more than the
+  plain import.
+
+Without DATABASE_URL a throwaway SQLite database is used. Bytecode caches are
+written by an untimed first run.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints one JSON line
+_CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+result = {"import_seconds": time.perf_counter() - started}
+
+async def startup():
+    from app.utils.warmup import get_warmup_timings
+    started = time.perf_counter()
+    await app.main.app.router.startup()
+    result["startup_seconds"] = time.perf_counter() - started
+    result["warmup"] = get_warmup_timings()
+    await app.main.app.router.shutdown()
+
+asyncio.run(startup())
+print(json.dumps(result))
+"""
+
+
+def _child_env(warmup: bool) -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_startup.db')}")
+    env.setdefault("SECRET_KEY", "bench-startup")
+    env["STARTUP_WARMUP"] = "true" if warmup else "false"
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _run_plain(env: dict) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", _CHILD], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _run_importtime(env: dict) -> dict:
+    """{module: (self_us, cumulative_us)} from one -X importtime run"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def _median_ms(values) -> float:
+    return round(statistics.median(values) / 1000, 2) if values else 0.0
+
+
+def bench(args) -> dict:
+    env = _child_env(args.warmup)
+    _run_plain(env)  # Writes .pyc files
+
+    plain = [_run_plain(env) for _ in range(args.runs)]
+    traces = [_run_importtime(env) for _ in range(args.runs)]
+
+    # App modules by cumulative time (includes what they pull in first)
+    app_cumulative = defaultdict(list)
+    # Everything else by self time, summed per top-level package
+    package_self = defaultdict(list)
+    for trace in traces:
+        per_package = defaultdict(int)
+        for name, (self_us, cumulative_us) in trace.items():
+            if name == "app" or name.startswith("app."):
+                app_cumulative[name].append(cumulative_us)
+            else:
+                per_package[name.split(".")[0]] += self_us
+        for package, self_us in per_package.items():
+            package_self[package].append(self_us)
+
+    warmup_steps = defaultdict(list)
+    for run in plain:
+        for step, seconds in run["warmup"].items():
+            warmup_steps[step].append(seconds * 1000)
+
+    return {
+        "runs": args.runs,
+        "warmup": args.warmup,
+        "import_ms": round(statistics.median(r["import_seconds"] for r in plain) * 1000, 1),
+        "startup_ms": round(statistics.median(r["startup_seconds"] for r in plain) * 1000, 1),
+        "warmup_steps_ms": {step: round(statistics.median(v), 1) for step, v in warmup_steps.items()},
+        "app_modules_ms": sorted(
+            ((name, _median_ms(v)) for name, v in app_cumulative.items()), key=lambda item: -item[1]
+        )[:args.top],
+        "packages_self_ms": sorted(
+            ((name, _median_ms(v)) for name, v in package_self.items()), key=lambda item: -item[1]
+        )[:args.top]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app import and startup time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="Modules and packages to list")
+    parser.add_argument("--warmup", action="store_true", help="Run with STARTUP_WARMUP on and report its steps")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    result = bench(args)
+    if args.json:
+        print(json.dumps(result))
+        return 0
+
+    print(f"import app.main   {result['import_ms']:>8.1f} ms  (median of {result['runs']} runs)")
+    print(f"startup handlers  {result['startup_ms']:>8.1f} ms  (warm-up {'on' if result['warmup'] else 'off'})")
+    for step, ms in result["warmup_steps_ms"].items():
+        print(f"  {step:<20} {ms:>8.1f} ms")
+    print("\napp modules, cumulative import time (-X importtime)")
+    for name, ms in result["app_modules_ms"]:
+        print(f"  {name:<40} {ms:>8.2f} ms")
+    print("\nthird-party packages, self import time (-X importtime)")
+    for name, ms in result["packages_self_ms"]:
+        print(f"  {name:<40} {ms:>8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,412 @@
+"""Load test: a fleet of simulated shops running a realistic daily mix against the API.
+
+Usage:
+    python -m scripts.loadtest [--base-url URL] [--shops N] [--duration S] [--think-time S]
+                               [--save-baseline FILE] [--baseline FILE] [--tolerance PCT] [--json]
+
+Each shop registers, logs in and stocks a small catalog (setup, not measured),
+then loops for --duration seconds picking weighted actions:
+
+    sale              POST /transactions/                    one sale at the till
+    purchase          POST /transactions/                    restocking a product
+    bulk_sync         POST /transactions/bulk                a device coming back online with queued sales
+    catalog_sync      GET  /products/changes                 delta sync from the last watermark
+    stats_poll        GET  /transactions/stats, /inventory/stats
+    inventory_check   GET  /inventory/ (with If-None-Match), /inventory/alerts, /inventory/{product_id}
+
+Between actions a shop pauses for an exponentially distributed think time
+(--think-time mean; 0 runs closed-loop at full speed). Throughput and
+p50/p95/p99 latency are reported per endpoint. --save-baseline stores the
+run as JSON. --baseline compares this run against a stored one and exits
+non-zero when an endpoint's p95 or p99 regresses by more than --tolerance
+percent, or its error rate rises.
+
+Against a local server (SQLite or Postgres, whatever its DATABASE_URL is):
+    uvicorn app.main:app --workers 4 &
+    python -m scripts.loadtest --base-url http://127.0.0.1:8000 --shops 50
+
+Without --base-url the app runs in-process over ASGI on a throwaway SQLite
+database (or DATABASE_URL if set). Client and server then share one event
+loop, so use it for smoke runs and relative comparisons only.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+# Relative frequency of each action per shop
+ACTION_WEIGHTS = {
+    "sale": 45,
+    "purchase": 8,
+    "bulk_sync": 7,
+    "catalog_sync": 10,
+    "stats_poll": 15,
+    "inventory_check": 15,
+}
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Recorder:
+    """Latencies and outcomes per endpoint label"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(lambda: defaultdict(int))
+
+    def record(self, label: str, elapsed_ms: float, outcome) -> None:
+        self.latencies[label].append(elapsed_ms)
+        self.outcomes[label][str(outcome)] += 1
+
+    @staticmethod
+    def _summarize(latencies, outcomes, elapsed):
+        requests = sum(outcomes.values())
+        ok = sum(count for outcome, count in outcomes.items() if outcome.isdigit() and int(outcome) < 400)
+        client_errors = sum(count for outcome, count in outcomes.items() if outcome.isdigit() and 400 <= int(outcome) < 500)
+        return {
+            "requests": requests,
+            "ok": ok,
+            "client_errors": client_errors,
+            # 5xx plus timeouts and connection failures
+            "server_errors": requests - ok - client_errors,
+            "error_rate": round((requests - ok) / requests, 4) if requests else 0.0,
+            "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "max_ms": round(max(latencies), 2) if latencies else 0.0,
+            "outcomes": dict(outcomes)
+        }
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {
+            label: self._summarize(self.latencies[label], self.outcomes[label], elapsed)
+            for label in sorted(self.latencies)
+        }
+        all_outcomes = defaultdict(int)
+        for outcomes in self.outcomes.values():
+            for outcome, count in outcomes.items():
+                all_outcomes[outcome] += count
+        all_latencies = [ms for latencies in self.latencies.values() for ms in latencies]
+        return {"endpoints": endpoints, "total": self._summarize(all_latencies, all_outcomes, elapsed)}
+
+
+class Shop:
+    """One simulated shop: its credentials, catalog and client-side sync state"""
+
+    def __init__(self, index: int, run_id: str, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+        self.index = index
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.device_id = f"loadtest-{run_id}-{index}"
+        # Contacts must match the Nepal mobile format: 98/97 + 8 digits
+        self.contact = f"97{(int(run_id, 16) * 10000 + index) % 10 ** 8:08d}"
+        self.password = "loadtest-password"
+        self.headers = {}
+        self.products = []  # (product_id, price)
+        self.watermark = None
+        self.inventory_etag = None
+
+    async def request(self, label: str, method: str, path: str, measured: bool = True, **kwargs):
+        started = time.perf_counter()
+        try:
+            headers = {**self.headers, **kwargs.pop("headers", {})}
+            response = await self.client.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            if measured:
+                self.recorder.record(label, (time.perf_counter() - started) * 1000, type(e).__name__)
+            return None
+        if measured:
+            self.recorder.record(label, (time.perf_counter() - started) * 1000, response.status_code)
+        return response
+
+    async def _post_retrying_busy(self, path: str, body: dict):
+        # The hashing pool sheds load with 503 under a registration burst
+        for attempt in range(30):
+            response = await self.request("setup", "POST", path, measured=False, json=body)
+            if response is not None and response.status_code != 503:
+                return response
+            await asyncio.sleep(0.5 + self.rng.random())
+        return response
+
+    async def setup(self, products: int) -> None:
+        """Register, log in and create a stocked catalog"""
+        shop = {
+            "shop_name": f"Loadtest Shop {self.index}",
+            "shop_address": "Kathmandu, Nepal",
+            "contact": self.contact,
+            "email": f"{self.device_id}@example.com",
+            "password": self.password
+        }
+        response = await self._post_retrying_busy("/shopkeepers/register", shop)
+        if response is None or response.status_code != 201:
+            raise RuntimeError(f"registering shop {self.index} failed: {response and response.text}")
+
+        response = await self._post_retrying_busy(
+            "/shopkeepers/login", {"identifier": self.contact, "password": self.password}
+        )
+        if response is None or response.status_code != 200:
+            raise RuntimeError(f"login for shop {self.index} failed: {response and response.text}")
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        for i in range(products):
+            price = round(self.rng.uniform(10, 500), 2)
+            response = await self.request("setup", "POST", "/products/", measured=False, json={
+                "product_name": f"Product {i}",
+                "category": f"Category {i % 5}",
+                "price": price,
+                "opening_stock": 1000,
+                "reorder_level": 20
+            })
+            if response is None or response.status_code != 201:
+                raise RuntimeError(f"creating products for shop {self.index} failed: {response and response.text}")
+            self.products.append((response.json()["product_id"], price))
+
+    def _transaction(self, kind: str, when: datetime = None) -> dict:
+        product_id, price = self.rng.choice(self.products)
+        if kind == "purchase":
+            quantity, price = self.rng.randint(20, 100), round(price * 0.8, 2)
+        else:
+            quantity = self.rng.choices((1, 2, 3, 5), weights=(60, 25, 10, 5))[0]
+        return {
+            "product_id": product_id,
+            "quantity": quantity,
+            "price": price,
+            "type": kind,
+            "date_time": (when or datetime.now(timezone.utc)).isoformat(),
+            "device_id": self.device_id
+        }
+
+    async def sale(self):
+        await self.request("POST /transactions/ (sale)", "POST", "/transactions/", json=self._transaction("sale"))
+
+    async def purchase(self):
+        await self.request("POST /transactions/ (purchase)", "POST", "/transactions/", json=self._transaction("purchase"))
+
+    async def bulk_sync(self):
+        # Sales queued while offline during the last few hours
+        now = datetime.now(timezone.utc)
+        batch = [
+            self._transaction("sale", now - timedelta(minutes=self.rng.randint(1, 240)))
+            for _ in range(self.rng.randint(5, 50))
+        ]
+        await self.request("POST /transactions/bulk", "POST", "/transactions/bulk", json={"transactions": batch})
+
+    async def catalog_sync(self):
+        params = {"since": self.watermark} if self.watermark else {}
+        response = await self.request("GET /products/changes", "GET", "/products/changes", params=params)
+        if response is not None and response.status_code == 200:
+            self.watermark = response.json().get("watermark") or self.watermark
+
+    async def stats_poll(self):
+        period = self.rng.choice(("today", "today", "week", "month"))
+        await self.request("GET /transactions/stats", "GET", "/transactions/stats", params={"period": period})
+        await self.request("GET /inventory/stats", "GET", "/inventory/stats")
+
+    async def inventory_check(self):
+        # Devices revalidate their cached stock list instead of refetching it
+        headers = {"If-None-Match": self.inventory_etag} if self.inventory_etag else {}
+        response = await self.request("GET /inventory/", "GET", "/inventory/", params={"page_size": 50}, headers=headers)
+        if response is not None:
+            self.inventory_etag = response.headers.get("etag", self.inventory_etag)
+
+        await self.request("GET /inventory/alerts", "GET", "/inventory/alerts")
+        product_id, _ = self.rng.choice(self.products)
+        await self.request("GET /inventory/{product_id}", "GET", f"/inventory/{product_id}")
+
+    async def run(self, deadline: float, think_time: float) -> None:
+        actions, weights = zip(*ACTION_WEIGHTS.items())
+        while time.monotonic() < deadline:
+            await getattr(self, self.rng.choices(actions, weights=weights)[0])()
+            if think_time > 0:
+                await asyncio.sleep(self.rng.expovariate(1 / think_time))
+
+
+async def _in_process_client():
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}"
+    os.environ.setdefault("SECRET_KEY", "loadtest")
+
+    from app.main import app as fastapi_app
+    from app.database import Base, engine
+    import app.models
+    import app.models.inventory
+
+    Base.metadata.create_all(engine)
+    # Startup handlers: threadpool size, warm-up (hashing pool, connections)
+    await fastapi_app.router.startup()
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fastapi_app),
+        base_url="http://loadtest/api/v1",
+        timeout=60
+    )
+    return client, fastapi_app
+
+
+async def run_load(args) -> dict:
+    fastapi_app = None
+    if args.base_url:
+        limits = httpx.Limits(max_connections=args.shops, max_keepalive_connections=args.shops)
+        client = httpx.AsyncClient(base_url=args.base_url.rstrip("/") + "/api/v1", timeout=60, limits=limits)
+    else:
+        client, fastapi_app = await _in_process_client()
+
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:6]
+    master = random.Random(args.seed)
+    shops = [Shop(i, run_id, client, recorder, random.Random(master.random())) for i in range(args.shops)]
+
+    try:
+        async with client:
+            setup_started = time.perf_counter()
+            semaphore = asyncio.Semaphore(args.setup_concurrency)
+
+            async def setup(shop):
+                async with semaphore:
+                    await shop.setup(args.products)
+
+            await asyncio.gather(*(setup(shop) for shop in shops))
+            setup_seconds = time.perf_counter() - setup_started
+
+            async def staggered(shop, delay):
+                await asyncio.sleep(delay)
+                await shop.run(deadline, args.think_time)
+
+            started = time.perf_counter()
+            deadline = time.monotonic() + args.duration
+            await asyncio.gather(*(
+                staggered(shop, args.ramp_up * i / max(len(shops), 1)) for i, shop in enumerate(shops)
+            ))
+            elapsed = time.perf_counter() - started
+    finally:
+        if fastapi_app is not None:
+            await fastapi_app.router.shutdown()
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "target": args.base_url or "in-process",
+            "shops": args.shops,
+            "products": args.products,
+            "duration": args.duration,
+            "think_time": args.think_time,
+            "seed": args.seed,
+            "weights": ACTION_WEIGHTS
+        },
+        "setup_seconds": round(setup_seconds, 2),
+        "elapsed_seconds": round(elapsed, 2),
+        **recorder.summary(elapsed)
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """Rows of (label, metric, baseline, current, change %, regressed) for endpoints in both runs"""
+    rows = []
+    for label, now in current["endpoints"].items():
+        before = baseline["endpoints"].get(label)
+        if before is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "error_rate"):
+            old, new = before[metric], now[metric]
+            change = round((new - old) / old * 100, 1) if old else None
+            if metric in ("p95_ms", "p99_ms"):
+                # Ignore sub-millisecond jitter on fast endpoints
+                regressed = change is not None and change > tolerance and new - old > min_delta_ms
+            elif metric == "error_rate":
+                regressed = new > old + 0.001
+            else:
+                regressed = False
+            rows.append((label, metric, old, new, change, regressed))
+    return rows
+
+
+def _print_report(result: dict) -> None:
+    config = result["config"]
+    print(
+        f"{config['shops']} shops against {config['target']} for {result['elapsed_seconds']} s "
+        f"(think time {config['think_time']} s, setup {result['setup_seconds']} s)\n"
+    )
+    print(f"{'endpoint':<34} {'req':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'4xx':>5} {'5xx':>5}")
+    rows = list(result["endpoints"].items()) + [("ALL", result["total"])]
+    for label, s in rows:
+        print(
+            f"{label:<34} {s['requests']:>7} {s['throughput_rps']:>8.1f} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} "
+            f"{s['p99_ms']:>8.1f} {s['max_ms']:>8.1f} {s['client_errors']:>5} {s['server_errors']:>5}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a fleet of shops against the API")
+    parser.add_argument("--base-url", help="Running server, e.g. http://127.0.0.1:8000 (default: in-process)")
+    parser.add_argument("--shops", type=int, default=20, help="Simulated shops (one device each)")
+    parser.add_argument("--products", type=int, default=30, help="Catalog size per shop")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of load after setup")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean pause between a shop's actions; 0 = closed loop")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="Seconds over which shops start")
+    parser.add_argument("--setup-concurrency", type=int, default=8, help="Shops set up at once")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the action mix")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write this run's results to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against a saved run")
+    parser.add_argument("--tolerance", type=float, default=25.0, help="Allowed p95/p99 increase over the baseline, percent")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Latency increases below this never count as regressions")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load(args))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    rows = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for key in ("target", "shops", "think_time", "weights"):
+            if baseline["config"].get(key) != result["config"][key]:
+                print(f"warning: baseline {key} was {baseline['config'].get(key)!r}, now {result['config'][key]!r}", file=sys.stderr)
+        rows = compare(result, baseline, args.tolerance, args.min_delta_ms)
+
+    if args.json:
+        result["comparison"] = [
+            {"endpoint": label, "metric": metric, "baseline": old, "current": new, "change_pct": change, "regressed": regressed}
+            for label, metric, old, new, change, regressed in rows
+        ]
+        print(json.dumps(result))
+    else:
+        _print_report(result)
+        if rows:
+            print(f"\n{'endpoint':<34} {'metric':<15} {'baseline':>10} {'current':>10} {'change':>9}")
+            for label, metric, old, new, change, regressed in rows:
+                change_text = f"{change:+.1f}%" if change is not None else "n/a"
+                print(f"{label:<34} {metric:<15} {old:>10} {new:>10} {change_text:>9}{'  REGRESSED' if regressed else ''}")
+
+    regressions = [row for row in rows if row[5]]
+    if args.baseline and not args.json:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance}% against {args.baseline}")
+    failed = result["total"]["server_errors"] > 0 or regressions
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""Count SQL statements and DB time per API request and enforce query budgets.
+
+Seeds a realistic shop through the API, then calls every route in app/api/v1
+and fails when a request runs more statements than its declared budget or when
+a list endpoint's statement count grows with page size.
+
+Usage:
+    python -m scripts.query_budget [--products N] [--transactions N] [--json]
+
+Without DATABASE_URL a throwaway SQLite database is used. GET requests are
+measured warm (after one untimed call) so lazily built in-process caches don't
+count against the budget; writes are measured on their first call.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'query_budget.db')}"
+os.environ.setdefault("SECRET_KEY", "query-budget")
+os.environ.setdefault("ENVIRONMENT", "test")  # Also turns on strict ORM loading
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app as fastapi_app
+from app.database import Base, engine, async_engine
+import app.models
+import app.models.inventory
+
+
+class QueryCounter:
+    """Counts statements and cursor time on the shared engine"""
+
+    def __init__(self, bind):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.recording = False
+        event.listen(bind, "before_cursor_execute", self._before)
+        event.listen(bind, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_budget_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_budget_start"].pop()
+        if self.recording:
+            self.statements += 1
+            self.db_seconds += time.perf_counter() - started
+
+    @contextmanager
+    def measure(self):
+        self.statements, self.db_seconds, self.recording = 0, 0.0, True
+        try:
+            yield self
+        finally:
+            self.recording = False
+
+
+# (method, path, budget, options). Paths are formatted with seeded IDs.
+# Budgets are the statement counts the routes need today; raise one only
+# together with the change that justifies it.
+# "scale": page-size parameter whose value must not change the statement count.
+BUDGETS = [
+    # Shopkeepers
+    ("post", "/shopkeepers/login", 1, {"json": {"identifier": "9800000001", "password": "budget-secret"}}),
+    ("get", "/shopkeepers/me", 0, {}),
+    # Products
+    ("get", "/products/", 3, {"scale": "page_size"}),
+    ("get", "/products/?search=rice", 3, {}),
+    ("get", "/products/changes", 1, {"scale": "limit"}),
+    ("get", "/products/autocomplete?q=ri", 0, {}),
+    ("get", "/products/by-code/{barcode}", 1, {}),
+    ("get", "/products/categories", 2, {}),
+    ("get", "/products/{product_id}", 1, {}),
+    ("get", "/products/{product_id}/prices", 2, {}),
+    # Transactions
+    ("get", "/transactions/", 2, {"scale": "page_size"}),
+    ("get", "/transactions/stats", 1, {}),
+    ("get", "/transactions/{transaction_id}", 1, {}),
+    # Inventory
+    ("get", "/inventory/", 4, {"scale": "page_size"}),
+    ("get", "/inventory/alerts", 1, {}),
+    ("get", "/inventory/reorder-suggestions", 1, {}),
+    ("get", "/inventory/stats", 1, {}),
+    ("get", "/inventory/as-of?ts={now}", 3, {}),
+    ("get", "/inventory/{product_id}", 2, {}),
+    ("get", "/inventory/{product_id}/as-of?ts={now}", 2, {}),
+    ("get", "/inventory/movements/history", 2, {"scale": "page_size"}),
+    # Rewards
+    ("get", "/rewards/balance", 2, {}),
+    ("get", "/rewards/history", 4, {"scale": "page_size"}),
+    ("get", "/rewards/daily-stats", 2, {}),
+    ("get", "/rewards/config", 0, {}),
+    # Writes
+    ("post", "/products/", 11, {"json": {"product_name": "Budget Soap", "category": "Hygiene", "price": 45, "opening_stock": 12}}),
+    ("put", "/products/{product_id}", 11, {"json": {"price": 99, "category": "Staples"}}),
+    ("post", "/transactions/", 30, {"json": {"product_id": "{product_id}", "quantity": 1, "price": 99, "type": "sale", "date_time": "{now}"}}),
+    ("post", "/transactions/bulk", 5, {"json": {"transactions": [
+        {"product_id": "{product_id}", "quantity": 1, "price": 99, "type": "sale", "date_time": "{now}"},
+        {"product_id": "{product_id}", "quantity": 5, "price": 70, "type": "purchase", "date_time": "{now}"}
+    ]}}),
+    ("put", "/transactions/{transaction_id}", 3, {"json": {"quantity": 2}}),
+    ("post", "/inventory/adjust", 7, {"json": {"product_id": "{product_id}", "quantity_change": -1, "movement_type": "damage"}}),
+    ("post", "/inventory/stocktake", 5, {"json": {"counts": [{"product_id": "{product_id}", "counted_quantity": 40}]}}),
+    ("put", "/inventory/{product_id}/reorder-level", 5, {"json": {"reorder_level": 7}}),
+    ("post", "/inventory/snapshots", 2, {}),
+    ("post", "/inventory/reorder-levels/auto-tune", 4, {}),
+    ("post", "/inventory/reconcile?include_transactions=true", 3, {}),
+    ("put", "/shopkeepers/me", 2, {"json": {"shop_name": "Budget Shop"}}),
+    ("delete", "/transactions/{transaction_id}", 5, {}),
+    ("delete", "/products/{spare_product_id}", 5, {}),
+    ("post", "/products/{spare_product_id}/restore", 5, {}),
+]
+
+
+def _fill(value, ids):
+    if isinstance(value, str):
+        return value.format(**ids)
+    if isinstance(value, dict):
+        return {k: _fill(v, ids) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, ids) for v in value]
+    return value
+
+
+def seed(client, products, transactions):
+    """Register a shop and load a catalogue, sales and purchases through the API"""
+    client.post("/api/v1/shopkeepers/register", json={
+        "shop_name": "Budget Shop",
+        "shop_address": "Kathmandu",
+        "contact": "9800000001",
+        "email": "budget@example.com",
+        "password": "budget-secret"
+    })
+    token = client.post("/api/v1/shopkeepers/login", json={
+        "identifier": "9800000001",
+        "password": "budget-secret"
+    }).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    categories = ["Grain", "Snacks", "Dairy", "Beverages", "Hygiene", "Spices"]
+    lines = ["product_name,category,price,barcode,opening_stock,reorder_level"]
+    lines.append("Rice Basmati 5kg,Grain,850,8901000000001,60,10")
+    for i in range(1, products):
+        lines.append(f"Item {i},{categories[i % len(categories)]},{20 + i % 300},89010{i:08d},{i % 50},5")
+    client.post(
+        "/api/v1/products/import",
+        files={"file": ("catalog.csv", "\n".join(lines).encode(), "text/csv")},
+        headers=headers
+    )
+
+    listed = client.get("/api/v1/products/", params={"page_size": 100}, headers=headers).json()["products"]
+    product_ids = [p["product_id"] for p in listed]
+    rice = client.get("/api/v1/products/by-code/8901000000001", headers=headers).json()["product_id"]
+
+    now = datetime.utcnow()
+    batch = []
+    for i in range(transactions):
+        batch.append({
+            "product_id": product_ids[i % len(product_ids)],
+            "quantity": 1 + i % 3,
+            "price": 50,
+            "type": "purchase" if i % 10 == 0 else "sale",
+            "date_time": (now - timedelta(days=i % 30, minutes=i)).isoformat()
+        })
+        if len(batch) == 100:
+            client.post("/api/v1/transactions/bulk", json={"transactions": batch}, headers=headers)
+            batch = []
+    if batch:
+        client.post("/api/v1/transactions/bulk", json={"transactions": batch}, headers=headers)
+
+    transaction_id = client.get("/api/v1/transactions/", params={"page_size": 1}, headers=headers).json()["transactions"][0]["transaction_id"]
+    spare = client.post("/api/v1/products/", json={"product_name": "Spare", "price": 5}, headers=headers).json()["product_id"]
+
+    ids = {
+        "product_id": rice,
+        "spare_product_id": spare,
+        "transaction_id": transaction_id,
+        "barcode": "8901000000001",
+        "now": now.isoformat()
+    }
+    return headers, ids
+
+
+def _run(client, counter, method, url, headers, options, warm):
+    kwargs = {"headers": headers}
+    if "json" in options:
+        kwargs["json"] = options["json"]
+    if warm:
+        getattr(client, method)(url, **kwargs)
+    with counter.measure():
+        started = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        elapsed = time.perf_counter() - started
+    return response, counter.statements, counter.db_seconds, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enforce per-endpoint SQL query budgets")
+    parser.add_argument("--products", type=int, default=500, help="Catalogue size to seed")
+    parser.add_argument("--transactions", type=int, default=2000, help="Transactions to seed")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    client = TestClient(fastapi_app)
+    headers, ids = seed(client, args.products, args.transactions)
+    # With DB_ASYNC the routes run on the async engine's sync core
+    counter = QueryCounter(async_engine.sync_engine if async_engine is not None else engine)
+
+    results, failures = [], 0
+    for method, path, budget, options in BUDGETS:
+        url = "/api/v1" + _fill(path, ids)
+        options = _fill(options, ids)
+        warm = method == "get"
+
+        response, statements, db_seconds, elapsed = _run(client, counter, method, url, headers, options, warm)
+        problems = []
+        if response.status_code >= 400:
+            problems.append(f"HTTP {response.status_code}")
+        if statements > budget:
+            problems.append(f"{statements} statements > budget {budget}")
+
+        # The same page at two sizes must cost the same number of statements
+        scale = options.get("scale")
+        if scale:
+            sep = "&" if "?" in url else "?"
+            small = _run(client, counter, method, f"{url}{sep}{scale}=5", headers, options, warm)[1]
+            large = _run(client, counter, method, f"{url}{sep}{scale}=100", headers, options, warm)[1]
+            if small != large:
+                problems.append(f"scales with {scale}: {small} statements at 5, {large} at 100")
+
+        failures += bool(problems)
+        result = {
+            "endpoint": f"{method.upper()} {path}",
+            "status": response.status_code,
+            "statements": statements,
+            "budget": budget,
+            "db_ms": round(db_seconds * 1000, 2),
+            "total_ms": round(elapsed * 1000, 2),
+            "problems": problems
+        }
+        results.append(result)
+
+        if args.json:
+            print(json.dumps(result))
+        else:
+            mark = "FAIL" if problems else "ok"
+            print(
+                f"{mark:4} {result['endpoint']:<52} {statements:>3}/{budget:<3} "
+                f"db {result['db_ms']:>8.2f} ms  total {result['total_ms']:>8.2f} ms"
+                + (f"  <- {'; '.join(problems)}" if problems else "")
+            )
+
+    if not args.json:
+        print(f"\n{len(results) - failures}/{len(results)} endpoints within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
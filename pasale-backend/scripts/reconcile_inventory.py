@@ -0,0 +1,74 @@
+"""Reconcile inventory for every shop across a process pool.
+
+Usage:
+    python -m scripts.reconcile_inventory [--shop SHOP_ID ...] [--include-transactions] [--repair] [--workers N]
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal, engine
+import app.models
+import app.models.inventory
+from app.models.shopkeeper import Shopkeeper
+from app.crud.reconciliation import reconcile_shop_inventory
+
+
+def _init_worker():
+    # Connections inherited from the parent must not be shared with the child
+    engine.dispose(close=False)
+
+
+def _reconcile(shop_id, include_transactions, repair):
+    db = SessionLocal()
+    try:
+        return reconcile_shop_inventory(db, shop_id, include_transactions=include_transactions, repair=repair)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile inventory against movements and transactions")
+    parser.add_argument("--shop", action="append", dest="shops", help="Shop ID to reconcile (default: all shops)")
+    parser.add_argument("--include-transactions", action="store_true", help="Rebuild expected stock from transactions")
+    parser.add_argument("--repair", action="store_true", help="Write correcting movements and fix quantities")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    shop_ids = args.shops
+    if not shop_ids:
+        db = SessionLocal()
+        try:
+            shop_ids = [str(shop_id) for (shop_id,) in db.query(Shopkeeper.shop_id).all()]
+        finally:
+            db.close()
+    engine.dispose()
+
+    summary = {"shops": len(shop_ids), "shops_drifted": 0, "products_drifted": 0, "failed": []}
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+        futures = {
+            pool.submit(_reconcile, shop_id, args.include_transactions, args.repair): shop_id
+            for shop_id in shop_ids
+        }
+        for future in as_completed(futures):
+            shop_id = futures[future]
+            try:
+                report = future.result()
+            except Exception as e:
+                summary["failed"].append({"shop_id": shop_id, "error": str(e)})
+                continue
+            if report["products_drifted"]:
+                summary["shops_drifted"] += 1
+                summary["products_drifted"] += report["products_drifted"]
+                print(json.dumps(report, default=str))
+
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Suggest an ARGON2_TIME_COST for this host.
+
+Usage:
+    python -m scripts.tune_argon2 [--target-ms N] [--json]
+
+Times Argon2 at the configured memory cost and parallelism and prints the
+time cost that lands closest under the target (PASSWORD_HASH_TARGET_MS by
+default), clamped to ARGON2_MIN_TIME_COST..ARGON2_MAX_TIME_COST. Run it on
+the slowest host that will serve logins and pin the result in the shared
+configuration: every worker must hash with the same parameters, and stored
+hashes are only ever upgraded to a higher cost.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "tune-argon2")
+
+from app.config import settings
+from app.utils.password_pool import benchmark_hash_params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suggest an Argon2 time cost for this host")
+    parser.add_argument("--target-ms", type=int, default=settings.PASSWORD_HASH_TARGET_MS, help="Hash time to aim for")
+    parser.add_argument("--json", action="store_true", help="Print the parameters as JSON")
+    args = parser.parse_args()
+
+    settings.PASSWORD_HASH_TARGET_MS = args.target_ms
+    params = benchmark_hash_params()
+    if args.json:
+        print(json.dumps(params))
+        return 0
+
+    print(f"ARGON2_TIME_COST={params['time_cost']}  (target {args.target_ms} ms, currently {settings.ARGON2_TIME_COST})")
+    print(f"ARGON2_MEMORY_COST={params['memory_cost']}")
+    print(f"ARGON2_PARALLELISM={params['parallelism']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
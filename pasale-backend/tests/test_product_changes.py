@@ -0,0 +1,87 @@
+"""Delta catalog sync paging over bursts of writes landing in the same second.
+
+Run from pasale-backend with `python -m pytest tests`.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_product_changes.db')}")
+os.environ.setdefault("SECRET_KEY", "test-product-changes")
+os.environ.setdefault("STARTUP_WARMUP", "false")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app as fastapi_app
+from app.database import Base, engine
+import app.models
+import app.models.inventory
+
+
+@pytest.fixture(scope="module")
+def client():
+    Base.metadata.create_all(engine)
+    return TestClient(fastapi_app)
+
+
+@pytest.fixture(scope="module")
+def headers(client):
+    shop = {"shop_name": "Sync Shop", "shop_address": "Kathmandu", "contact": "9800000031", "password": "secret1"}
+    assert client.post("/api/v1/shopkeepers/register", json=shop).status_code in (200, 201)
+    login = client.post("/api/v1/shopkeepers/login", json={"identifier": shop["contact"], "password": shop["password"]})
+    return {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+def _sync(client, headers, since=None, limit=3):
+    """Page through the feed; returns (changed ids in order, deleted ids, final watermark)"""
+    changed, deleted, pages = [], [], 0
+    while True:
+        params = {"limit": limit}
+        if since:
+            params["since"] = since
+        response = client.get("/api/v1/products/changes", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        changed += [p["product_id"] for p in body["changed"]]
+        deleted += [t["product_id"] for t in body["deleted"]]
+        since = body["watermark"]
+        pages += 1
+        assert pages < 100, "feed never drained"
+        if not body["has_more"]:
+            return changed, deleted, since
+
+
+def test_import_burst_pages_completely(client, headers):
+    csv = "product_name,price\n" + "".join(f"Import {i},{10 + i}\n" for i in range(20))
+    response = client.post(
+        "/api/v1/products/import",
+        files={"file": ("products.csv", csv.encode(), "text/csv")},
+        headers=headers
+    )
+    assert response.json()["imported"] == 20
+
+    changed, deleted, _ = _sync(client, headers)
+    assert len(changed) == 20
+    assert len(set(changed)) == 20
+    assert deleted == []
+
+
+def test_same_second_updates_resume_from_watermark(client, headers):
+    changed, _, watermark = _sync(client, headers)
+
+    # Several writes inside one second, with the same updated_at on SQLite
+    updated, removed = changed[:7], changed[7]
+    for product_id in updated:
+        assert client.put(f"/api/v1/products/{product_id}", json={"price": 99}, headers=headers).status_code == 200
+    assert client.delete(f"/api/v1/products/{removed}", headers=headers).status_code in (200, 204)
+    created = client.post("/api/v1/products/", json={"product_name": "Late", "price": 5}, headers=headers).json()
+
+    changed, deleted, watermark = _sync(client, headers, since=watermark)
+    assert changed == updated + [created["product_id"]]
+    assert deleted == [removed]
+    assert _sync(client, headers, since=watermark)[:2] == ([], [])
+
+
+def test_rejects_garbage_watermark(client, headers):
+    response = client.get("/api/v1/products/changes", params={"since": "garbage"}, headers=headers)
+    assert response.status_code == 400